@@ -0,0 +1,109 @@
+"""
+End-to-end benchmark of NtripClient against the local stand-ins in
+caster_sim.py. Measures how long RTCM frames take from the caster socket
+to the receiver UART, the forwarding rate, how long the client takes to
+come back after the caster drops it, and how fast it fails over to a
+fallback caster when corrections stall.
+
+python bench_ntrip.py [--seconds 20] [--epoch-hz 1] [--frame-size 300]
+                      [--response ICY] [--drop-after 8] [--reconnects 3]
+                      [--rtcm-allow 1005,1077,1087] [--raw-rtcm] [--ubx]
+                      [--fallbacks 2 --stall-after 5 --max-correction-age 3]
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import rtk_coords
+from caster_sim import LocalCaster, FakeReceiver
+
+
+def run(args):
+    caster = LocalCaster(response=args.response, rtcm_file=args.rtcm_file, epoch_hz=args.epoch_hz,
+                         frame_size=args.frame_size, drop_after=args.drop_after,
+                         stall_after=args.stall_after)
+    # fallback casters answer a little slower each so the primary wins the first probe
+    fallbacks = [LocalCaster(response=args.response, epoch_hz=args.epoch_hz, frame_size=args.frame_size,
+                             handshake_delay=0.05 * (i + 1), seq_start=(i + 1) * 10 ** 8)
+                 for i in range(args.fallbacks)]
+    casters = [caster] + fallbacks
+    receiver = FakeReceiver(gga_hz=args.gga_hz, ubx=args.ubx)
+
+    rtk_coords.maxReconnect = args.reconnects
+    client = rtk_coords.NtripClient(caster=caster.host, port=caster.port, mountpoint=caster.mountpoint,
+                                    user="bench:none", serialPort=receiver.port, fixSocket=None,
+                                    buffer=args.buffer, verbose=args.verbose,
+                                    rtcmFilter=not args.raw_rtcm, rtcmAllow=args.rtcm_allow,
+                                    sources=[(c.host, c.port, c.mountpoint) for c in fallbacks],
+                                    maxCorrectionAge=args.max_correction_age,
+                                    ubx=args.ubx, navRate=args.gga_hz)
+    thread = threading.Thread(target=client.readData, daemon=True)
+    start = time.monotonic()
+    thread.start()
+    time.sleep(args.seconds)
+    elapsed = time.monotonic() - start
+
+    sent = {}
+    connections = []
+    disconnects = []
+    bytes_sent = 0
+    for i, c in enumerate(casters):
+        with c.lock:
+            sent.update(c.sent)
+            connections += [(t, i) for t in c.connections]
+            disconnects += [t for t in c.disconnects if t > start]
+            bytes_sent += c.bytes_sent
+        c.close()
+    with receiver.lock:
+        received = dict(receiver.received)
+        bytes_received = receiver.bytes_received
+    receiver.close()
+    connections.sort()
+
+    latencies = np.array([received[k] - sent[k] for k in received if k in sent]) * 1000.0
+    print("frames sent %i, forwarded %i (%.1f%%)" % (
+        len(sent), len(latencies), 100.0 * len(latencies) / max(len(sent), 1)))
+    if len(latencies):
+        print("latency ms: p50 %.2f  p95 %.2f  p99 %.2f  max %.2f" % (
+            np.percentile(latencies, 50), np.percentile(latencies, 95),
+            np.percentile(latencies, 99), latencies.max()))
+    arrivals = np.sort(np.array(list(received.values())))
+    if len(arrivals) > 1:
+        print("longest gap between corrections at the receiver: %.2f s" % np.diff(arrivals).max())
+    print("throughput: caster %.0f B/s, receiver %.0f B/s" % (bytes_sent / elapsed, bytes_received / elapsed))
+    if connections:
+        print("first handshake after %.3f s" % (connections[0][0] - start))
+    print("connections: %s" % ", ".join("caster %i at %.2f s" % (i, t - start) for t, i in connections))
+    # time from each drop to the next accepted handshake
+    gaps = [min(t for t, _ in connections if t > d) - d for d in disconnects if any(t > d for t, _ in connections)]
+    print("reconnect gaps s: %s" % (", ".join("%.2f" % g for g in gaps) or "-"))
+    print(client.engine.report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--epoch-hz', type=float, default=1.0, help="RTCM epochs per second")
+    parser.add_argument('--frame-size', type=int, default=300, help="payload bytes per synthetic frame")
+    parser.add_argument('--rtcm-file', default=None, help="replay a recorded RTCM 3 stream instead")
+    parser.add_argument('--response', default='ICY', choices=['ICY', 'HTTP/1.0', 'HTTP/1.1'])
+    parser.add_argument('--drop-after', type=float, default=None, help="caster drops the client after N s")
+    parser.add_argument('--stall-after', type=float, default=None,
+                        help="caster stops sending after N s but keeps the socket open")
+    parser.add_argument('--fallbacks', type=int, default=0, help="number of extra casters to fail over to")
+    parser.add_argument('--max-correction-age', type=float, default=10.0)
+    parser.add_argument('--reconnects', type=int, default=3)
+    parser.add_argument('--gga-hz', type=float, default=10.0)
+    parser.add_argument('--buffer', type=int, default=50, help="NtripClient recv size")
+    parser.add_argument('--rtcm-allow', type=lambda v: [int(t) for t in v.split(',')], default=None,
+                        help="comma separated message types the client forwards")
+    parser.add_argument('--raw-rtcm', action='store_true', help="forward caster data unframed")
+    parser.add_argument('--ubx', action='store_true', help="receiver sends UBX NAV-PVT instead of GGA")
+    parser.add_argument('--verbose', action='store_true')
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
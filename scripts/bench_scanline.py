@@ -0,0 +1,116 @@
+"""
+Benchmarks the NumPy scanline engine in scanline.py against the Shapely
+stripe loop generate_zigzag_path used before, on a corpus of lawn shapes
+(rectangles, L shapes, combs that split stripes, random star shaped
+yards, and any map files given), and checks both produce the same
+segments.
+
+python bench_scanline.py [--spacing 0.5] [--repeat 3] [../assets/maps/*.txt]
+"""
+import argparse
+import time
+
+import numpy as np
+from shapely.geometry import Polygon, LineString, MultiLineString
+
+from geodesy import LocalFrame
+from scanline import scanline_segments, stripe_positions
+
+
+def shapely_stripes(polygon, step):
+    """The pre-scanline loop from Pathing.generate_zigzag_path."""
+    minx, miny, maxx, maxy = polygon.bounds
+    lines = []
+    x = minx
+    direction = True
+    while x <= maxx:
+        line = LineString([(x, miny), (x, maxy)]) if direction else LineString([(x, maxy), (x, miny)])
+        clipped = line.intersection(polygon)
+        if not clipped.is_empty:
+            if isinstance(clipped, LineString):
+                lines.append(list(clipped.coords))
+            elif isinstance(clipped, MultiLineString):
+                for subline in clipped.geoms:
+                    lines.append(list(subline.coords))
+        x += step
+        direction = not direction
+    return lines
+
+
+def corpus(seed=1):
+    rng = np.random.default_rng(seed)
+    shapes = {
+        'rect 20x10': [(0, 0), (20, 0), (20, 10), (0, 10)],
+        'rect 300x200': [(0, 0), (300, 0), (300, 200), (0, 200)],
+        'L 60': [(0, 0), (60, 0), (60, 20), (20, 20), (20, 60), (0, 60)],
+    }
+    # comb: stripes across the teeth split into many pieces
+    comb = [(0, 0), (100, 0)]
+    for i in range(10):
+        x = 100 - 10 * i
+        comb += [(x, 40), (x - 5, 40), (x - 5, 5)]
+    comb[-1] = (0, 40)
+    shapes['comb 100'] = comb
+    for n, radius in ((40, 30), (200, 80), (1000, 150)):
+        angles = np.sort(rng.uniform(0, 2 * np.pi, n))
+        r = radius * rng.uniform(0.5, 1.0, n)
+        shapes['star %i pts r%i' % (n, radius)] = list(zip(r * np.cos(angles), r * np.sin(angles)))
+    return shapes
+
+
+def load_map(path):
+    points = np.loadtxt(path, delimiter=',')
+    return LocalFrame.from_points(points).to_local(points)
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def same_segments(lines, segments):
+    # Shapely splits a stripe that runs along an edge at the vertex, join those pieces first
+    joined = []
+    for line in lines:
+        start, end = tuple(line[0]), tuple(line[-1])
+        if joined and np.allclose(joined[-1][1], start, rtol=0, atol=1e-9):
+            joined[-1][1] = end
+        elif not np.allclose(start, end, rtol=0, atol=1e-9):
+            joined.append([start, end])
+    return len(joined) == len(segments) and np.allclose(np.array(joined), segments, atol=1e-6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('maps', nargs='*', help="lon,lat map files to add to the corpus")
+    parser.add_argument('--spacing', type=float, default=0.5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    shapes = corpus()
+    for path in args.maps:
+        shapes[path] = load_map(path)
+
+    total_old = total_new = 0.0
+    print("%-22s %7s %9s %9s %8s %s" % ("shape", "stripes", "shapely", "scanline", "speedup", "match"))
+    for name, coords in shapes.items():
+        coords = np.asarray(coords, dtype=float)
+        polygon = Polygon(coords)
+        minx, _, maxx, _ = polygon.bounds
+        xs = stripe_positions(minx, maxx, args.spacing)
+        lines, old = timed(lambda: shapely_stripes(polygon, args.spacing), args.repeat)
+        (segments, _), new = timed(lambda: scanline_segments([coords], xs), args.repeat)
+        total_old += old
+        total_new += new
+        print("%-22s %7i %8.1fms %8.2fms %7.1fx %s" % (
+            name, len(xs), old * 1000, new * 1000, old / new, "yes" if same_segments(lines, segments) else "NO"))
+    print("total: shapely %.1f ms, scanline %.1f ms, %.1fx" % (total_old * 1000, total_new * 1000, total_old / total_new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Compares the two ways rtk_coords.py can get fixes off the receiver UART:
+NMEA GGA text through pynmeagps, and binary UBX NAV-PVT through ubx.py.
+Both byte streams hold the same solutions and are fed in serial sized
+chunks, the way the engine's reader thread sees them.
+
+python bench_ubx.py [--fixes 20000] [--chunk 64]
+python bench_ubx.py --nmea recorded_gga.txt --ubx recorded_pvt.ubx
+"""
+import argparse
+import io
+import math
+import time
+
+import numpy as np
+from pynmeagps import NMEAReader
+
+from fix_bus import Fix, fix_from_nmea
+from nmea import fix_to_gga
+from ubx import UBXReader, build_nav_pvt
+
+
+def synthetic_fixes(n, hz=10.0):
+    """A mower going up and down a 20 m stripe at 0.5 m/s."""
+    fixes = []
+    for i in range(n):
+        t = 43200.0 + i / hz
+        s = (i / hz * 0.5) % 40.0
+        north = s if s < 20.0 else 40.0 - s
+        fixes.append(Fix(t, -74.4500123 + 1e-6 * (i % 7), 40.5006349 + north / 111320.0, 4, 14, 0.6, 30.0,
+                         0.5, 0.0 if s < 20.0 else 180.0))
+    return fixes
+
+
+def chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def bench_nmea(data, chunk):
+    # NMEAReader pulls from a stream, so feed it from memory the way serial would
+    reader = NMEAReader(io.BufferedReader(io.BytesIO(data), buffer_size=chunk))
+    fixes = []
+    start = time.perf_counter()
+    while True:
+        raw, parsed = reader.read()
+        if raw is None:
+            break
+        fix = fix_from_nmea(parsed)
+        if fix:
+            fixes.append(fix)
+    return fixes, time.perf_counter() - start
+
+
+def bench_ubx(data, chunk):
+    reader = UBXReader()
+    fixes = []
+    start = time.perf_counter()
+    for piece in chunks(data, chunk):
+        fixes.extend(reader.feed(piece))
+    return fixes, time.perf_counter() - start
+
+
+def report(name, data, fixes, elapsed):
+    n = max(len(fixes), 1)
+    print("%-5s %7i fixes  %6.1f B/fix  %7.1f us/fix  %9.0f fixes/s" % (
+        name, len(fixes), len(data) / n, elapsed / n * 1e6, len(fixes) / elapsed if elapsed else 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixes', type=int, default=20000)
+    parser.add_argument('--chunk', type=int, default=64, help="bytes per serial read")
+    parser.add_argument('--nmea', default=None, help="recorded NMEA stream")
+    parser.add_argument('--ubx', default=None, help="recorded UBX stream")
+    args = parser.parse_args()
+
+    if args.nmea or args.ubx:
+        nmea_data = open(args.nmea, 'rb').read() if args.nmea else b''
+        ubx_data = open(args.ubx, 'rb').read() if args.ubx else b''
+    else:
+        fixes = synthetic_fixes(args.fixes)
+        nmea_data = b''.join(fix_to_gga(f) for f in fixes)
+        ubx_data = b''.join(build_nav_pvt(f, i * 100) for i, f in enumerate(fixes))
+
+    if nmea_data:
+        nmea_fixes, nmea_time = bench_nmea(nmea_data, args.chunk)
+        report("nmea", nmea_data, nmea_fixes, nmea_time)
+    if ubx_data:
+        ubx_fixes, ubx_time = bench_ubx(ubx_data, args.chunk)
+        report("ubx", ubx_data, ubx_fixes, ubx_time)
+    if nmea_data and ubx_data and nmea_fixes and ubx_fixes:
+        n = min(len(nmea_fixes), len(ubx_fixes))
+        a = np.array([(f.lat, f.lon) for f in nmea_fixes[:n]])
+        b = np.array([(f.lat, f.lon) for f in ubx_fixes[:n]])
+        print("max position difference %.3f m over %i fixes" % (np.abs(a - b).max() * 111320.0, n))
+        print("speed/heading from ubx: %s" % ("yes" if not math.isnan(ubx_fixes[-1].speed) else "no"))
+        print("ubx is %.1fx faster per fix" % ((nmea_time / len(nmea_fixes)) / (ubx_time / len(ubx_fixes))))
+
+
+if __name__ == '__main__':
+    main()
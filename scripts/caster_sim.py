@@ -0,0 +1,222 @@
+"""
+Local stand-ins for the two ends of rtk_coords.py so NtripClient can be
+exercised on a plain Linux box without rtk2go.com or /dev/ttyAMA0.
+
+LocalCaster  - TCP server that answers the NTRIP handshake the way readData
+               expects (ICY 200 OK, HTTP/1.0 or HTTP/1.1), waits for the GGA
+               and then streams RTCM at a fixed rate.
+FakeReceiver - pty that looks like the GNSS receiver's UART: it emits GGA
+               sentences (or UBX NAV-PVT) and records every RTCM frame
+               written to it.
+
+Frames are matched between the two by their CRC so the end-to-end
+forwarding latency can be measured, see bench_ntrip.py.
+"""
+import os
+import pty
+import select
+import socket
+import struct
+import time
+import tty
+from threading import Thread, Lock
+
+from fix_bus import Fix
+from rtcm import build_frame, RTCMFramer, HEADER_LEN, CRC_LEN
+from ubx import build_nav_pvt
+
+RESPONSES = {
+    'ICY': b"ICY 200 OK\r\n\r\n",
+    'HTTP/1.0': b"HTTP/1.0 200 OK\r\nContent-Type: gnss/data\r\n\r\n",
+    'HTTP/1.1': b"HTTP/1.1 200 OK\r\nContent-Type: gnss/data\r\n\r\n",
+}
+SOURCETABLE = b"SOURCETABLE 200 OK\r\nContent-Type: text/plain\r\n\r\nENDSOURCETABLE\r\n"
+
+
+def load_rtcm_frames(path):
+    """Splits a recorded RTCM 3 stream into its valid frames."""
+    with open(path, 'rb') as f:
+        return RTCMFramer().feed(f.read())
+
+
+def synthetic_frames(types=(1005, 1077, 1087, 1097, 1127, 1230), size=300, seq=0):
+    """One epoch of frames with the given message types and a sequence number."""
+    while True:
+        epoch = []
+        for msg_type in types:
+            body = struct.pack('>I', seq) + bytes(max(size - 6, 0))
+            epoch.append(build_frame(msg_type, body))
+            seq += 1
+        yield epoch
+
+
+class LocalCaster:
+    def __init__(self, host='127.0.0.1', port=0, mountpoint='/TEST', response='ICY',
+                 rtcm_file=None, epoch_hz=1.0, types=(1005, 1077, 1087, 1097, 1127, 1230),
+                 frame_size=300, handshake_delay=0.0, drop_after=None, stall_after=None, seq_start=0):
+        self.mountpoint = mountpoint
+        self.response = RESPONSES[response]
+        self.epoch_hz = epoch_hz
+        self.handshake_delay = handshake_delay
+        self.drop_after = drop_after  # close each client after this many seconds
+        self.stall_after = stall_after  # stop sending (but keep the socket) after this many seconds
+        self.types = types
+        self.frame_size = frame_size
+        self.seq_start = seq_start
+        self.recorded = load_rtcm_frames(rtcm_file) if rtcm_file else None
+
+        self.lock = Lock()
+        self.sent = {}         # frame crc -> monotonic send time
+        self.bytes_sent = 0
+        self.connections = []  # monotonic time of every accepted handshake
+        self.disconnects = []  # monotonic time of every dropped client
+        self.running = True
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen(4)
+        self.host, self.port = self.server.getsockname()
+        self.thread = Thread(target=self._accept_loop, daemon=True)
+        self.thread.start()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _read_until(self, conn, marker):
+        data = b''
+        while marker not in data:
+            chunk = conn.recv(1024)
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def _serve(self, conn):
+        try:
+            request = self._read_until(conn, b"\r\n\r\n")
+            if request is None:
+                return
+            time.sleep(self.handshake_delay)
+            path = request.split(b' ')[1].decode('ascii', errors='replace')
+            if path != self.mountpoint:
+                conn.sendall(SOURCETABLE)
+                return
+            conn.sendall(self.response)
+            # readData sends its position once the header is accepted
+            if self._read_until(conn, b"\r\n") is None:
+                return
+            with self.lock:
+                self.connections.append(time.monotonic())
+            self._stream(conn)
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.disconnects.append(time.monotonic())
+            conn.close()
+
+    def _epochs(self, index):
+        # every connection gets its own stream, synthetic ones with their own sequence numbers
+        if self.recorded is not None:
+            n = len(self.types)
+            return (self.recorded[i:i + n] for i in range(0, len(self.recorded), n))
+        return synthetic_frames(self.types, self.frame_size, self.seq_start + index * 10 ** 6)
+
+    def _stream(self, conn):
+        with self.lock:
+            index = len(self.connections)
+        start = time.monotonic()
+        next_epoch = start
+        for epoch in self._epochs(index):
+            if not self.running:
+                return
+            if self.drop_after is not None and time.monotonic() - start >= self.drop_after:
+                return
+            if self.stall_after is not None and time.monotonic() - start >= self.stall_after:
+                while self.running:
+                    time.sleep(0.1)
+                return
+            for frame in epoch:
+                with self.lock:
+                    self.sent[frame[-CRC_LEN:] + frame[:HEADER_LEN]] = time.monotonic()
+                    self.bytes_sent += len(frame)
+                conn.sendall(frame)
+            next_epoch += 1.0 / self.epoch_hz
+            time.sleep(max(0.0, next_epoch - time.monotonic()))
+
+    def close(self):
+        self.running = False
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+
+
+class FakeReceiver:
+    def __init__(self, gga_hz=10.0, lat=4030.0381, lon=7427.0004, ubx=False):
+        self.gga_hz = gga_hz
+        self.ubx = ubx
+        self.lat = lat
+        self.lon = lon
+        self.master, slave = pty.openpty()
+        tty.setraw(slave)  # no newline translation on the fake UART
+        self.slave = slave
+        self.port = os.ttyname(slave)
+
+        self.lock = Lock()
+        self.received = {}  # frame crc -> monotonic receive time
+        self.bytes_received = 0
+        self.framer = RTCMFramer()
+        self.running = True
+        self.thread = Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def gga(self):
+        t = time.gmtime()
+        body = "GNGGA,%02i%02i%02i.00,%.5f,N,%.5f,W,4,12,0.7,30.0,M,-33.0,M,1.0,0000" % (
+            t.tm_hour, t.tm_min, t.tm_sec, self.lat, self.lon)
+        checksum = 0
+        for c in body.encode('ascii'):
+            checksum ^= c
+        return ("$%s*%02X\r\n" % (body, checksum)).encode('ascii')
+
+    def nav_pvt(self):
+        t = time.time() % 86400.0
+        lat = int(self.lat / 100) + self.lat % 100 / 60.0
+        lon = -(int(self.lon / 100) + self.lon % 100 / 60.0)
+        return build_nav_pvt(Fix(t, lon, lat, 4, 12, 0.7, 30.0, 0.0, 0.0), int(t * 1000))
+
+    def _loop(self):
+        next_gga = time.monotonic()
+        while self.running:
+            timeout = max(0.0, next_gga - time.monotonic())
+            readable, _, _ = select.select([self.master], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(self.master, 4096)
+                except OSError:
+                    return
+                self._receive(data)
+            if time.monotonic() >= next_gga:
+                os.write(self.master, self.nav_pvt() if self.ubx else self.gga())
+                next_gga += 1.0 / self.gga_hz
+
+    def _receive(self, data):
+        now = time.monotonic()
+        with self.lock:
+            self.bytes_received += len(data)
+            for frame in self.framer.feed(data):
+                self.received[frame[-CRC_LEN:] + frame[:HEADER_LEN]] = now
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=1)
+        os.close(self.master)
+        os.close(self.slave)
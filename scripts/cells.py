@@ -0,0 +1,57 @@
+import numpy as np
+
+from scanline import scanline_segments, stripe_positions
+from sweep_search import rotation
+
+
+def _overlaps(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def decompose(rings, angle, spacing):
+    """
+    Boustrophedon cell decomposition of the free space (rings in local
+    metres, holes included) at stripe resolution. Stripes step along
+    `angle` like in sweep_search; a cell is a run of consecutive stripe
+    pieces where each piece overlaps exactly one piece of the previous
+    stripe and the other way round, so a cell closes wherever an obstacle
+    or a notch splits or merges the stripes.
+
+    Returns a list of cells, each an (k, 2, 2) array of segments already in
+    zigzag order (consecutive stripes alternate direction).
+    """
+    r = rotation(angle)
+    rotated = [np.asarray(ring, dtype=float) @ r for ring in rings]
+    xs = np.concatenate([ring[:, 0] for ring in rotated])
+    segments, stripe = scanline_segments(rotated, stripe_positions(xs.min(), xs.max(), spacing), alternate=False)
+    if not len(segments):
+        return []
+
+    cells = []        # lists of segment indices
+    prev = []         # (interval, cell id) of the previous stripe's pieces
+    prev_stripe = None
+    bounds = np.flatnonzero(np.diff(stripe)) + 1
+    for idx in np.split(np.arange(len(stripe)), bounds):
+        pieces = [(segments[i, 0, 1], segments[i, 1, 1]) for i in idx]
+        if prev_stripe is None or stripe[idx[0]] != prev_stripe + 1:
+            prev = []  # an empty stripe in between ends every cell
+        links = [[j for j, (q, _) in enumerate(prev) if _overlaps(p, q)] for p in pieces]
+        back = [sum(1 for l in links if j in l) for j in range(len(prev))]
+        current = []
+        for i, p, l in zip(idx, pieces, links):
+            if len(l) == 1 and back[l[0]] == 1:
+                cell = prev[l[0]][1]
+                cells[cell].append(i)
+            else:
+                cell = len(cells)
+                cells.append([i])
+            current.append((p, cell))
+        prev = current
+        prev_stripe = stripe[idx[0]]
+
+    planned = []
+    for cell in cells:
+        zigzag = segments[cell].copy()
+        zigzag[1::2] = zigzag[1::2, ::-1]
+        planned.append(zigzag @ r.T)
+    return planned
@@ -0,0 +1,209 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from queue import Queue, Full, Empty
+from threading import Thread
+
+# histogram bin edges in milliseconds, the last bin is everything above
+HISTOGRAM_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, edges=HISTOGRAM_MS):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.worst = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.worst = max(self.worst, ms)
+        for i, edge in enumerate(self.edges):
+            if ms < edge:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def percentile(self, q):
+        """Upper bin edge (ms) below which q of the samples fall."""
+        total = sum(self.counts)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if total and seen >= q * total:
+                return self.edges[i] if i < len(self.edges) else self.worst
+        return 0.0
+
+    def __str__(self):
+        labels = ["<%g" % e for e in self.edges] + [">=%g" % self.edges[-1]]
+        return " ".join("%s:%i" % (label, count) for label, count in zip(labels, self.counts) if count)
+
+
+class Stage:
+    """Timing of one step of the control loop against its budget (seconds)."""
+    def __init__(self, name, budget):
+        self.name = name
+        self.budget = budget
+        self.count = 0
+        self.overruns = 0
+        self.histogram = Histogram()
+
+    def add(self, elapsed):
+        self.count += 1
+        self.histogram.add(elapsed)
+        if self.budget and elapsed > self.budget:
+            self.overruns += 1
+
+
+class ControlLoop:
+    """
+    Fixed rate scheduler on time.monotonic(). wait() sleeps until the next
+    tick and records how late it woke up (jitter); ticks that are already
+    over are skipped and counted instead of being run back to back. Every
+    step of a tick is timed with stage(name) against its budget, so the
+    report shows which stage overran and how often.
+    """
+    def __init__(self, rate_hz=10.0, budgets=None, report_interval=30.0, report=print):
+        self.period = 1.0 / rate_hz
+        self.budgets = budgets or {}
+        self.stages = {}
+        self.jitter = Histogram()
+        self.ticks = 0
+        self.missed = 0
+        self.overruns = 0  # ticks whose stages took longer than the period
+        self.report_interval = report_interval
+        self.report = report  # callable(str), hand it to a BackgroundWorker to keep printing off the loop
+        self.next_tick = None
+        self.tick_start = None
+        self.last_report = time.monotonic()
+
+    def wait(self):
+        now = time.monotonic()
+        if self.next_tick is None:
+            self.next_tick = now
+        else:
+            if now - self.tick_start > self.period:
+                self.overruns += 1
+            self.next_tick += self.period
+            if now > self.next_tick + self.period:
+                skipped = int((now - self.next_tick) / self.period)
+                self.missed += skipped
+                self.next_tick += skipped * self.period
+            if self.next_tick > now:
+                time.sleep(self.next_tick - now)
+            now = time.monotonic()
+        self.jitter.add(now - self.next_tick)
+        self.ticks += 1
+        self.tick_start = now
+        if self.report_interval and now - self.last_report >= self.report_interval:
+            self.last_report = now
+            self.report(self.summary())
+
+    @contextmanager
+    def stage(self, name):
+        if name not in self.stages:
+            self.stages[name] = Stage(name, self.budgets.get(name))
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages[name].add(time.monotonic() - start)
+
+    def summary(self):
+        lines = [f"Control loop: {self.ticks} ticks at {1 / self.period:.0f} Hz, {self.overruns} overran the period, "
+                 f"{self.missed} missed; jitter p99 {self.jitter.percentile(0.99):g} ms, "
+                 f"worst {self.jitter.worst:.1f} ms"]
+        for stage in self.stages.values():
+            budget = f"{stage.budget * 1000:g} ms" if stage.budget else "none"
+            lines.append(f"  {stage.name}: budget {budget}, {stage.overruns}/{stage.count} over, "
+                         f"p99 {stage.histogram.percentile(0.99):g} ms, worst {stage.histogram.worst:.1f} ms "
+                         f"[{stage.histogram}]")
+        return "\n".join(lines)
+
+
+class BackgroundWorker:
+    """
+    Runs slow side work (live map updates, printing) on its own thread. The
+    queue is bounded and submit() never blocks: when it is full the oldest
+    job is dropped and counted, the control loop always goes first.
+    """
+    def __init__(self, name="worker", size=256):
+        self.name = name
+        self.queue = Queue(maxsize=size)
+        self.dropped = 0
+        self.thread = Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, func, *args):
+        while True:
+            try:
+                self.queue.put_nowait((func, args))
+                return
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            func, args = self.queue.get()
+            if func is None:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"{self.name}: {e}")
+
+    def close(self, timeout=2.0):
+        self.submit(None)
+        self.thread.join(timeout)
+
+
+class Prefetch:
+    """
+    Iterates `iterable` on a background thread, up to size items ahead, so a
+    slow producer (like stream_waypoints planning its next chunk) does not
+    stall the loop consuming it. get() waits at most its timeout, iterating
+    blocks like the iterable itself. Errors of the producer are raised to
+    the consumer at the point they happened.
+    """
+    def __init__(self, iterable, size=1024):
+        self.queue = Queue(maxsize=size)
+        self.done = object()
+        self.errors = deque()
+        self.finished = False
+        Thread(target=self._produce, args=(iterable,), daemon=True).start()
+
+    def _produce(self, iterable):
+        try:
+            for item in iterable:
+                self.queue.put(item)
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self.queue.put(self.done)
+
+    def get(self, timeout=0.0):
+        """The next item, None if it is not ready within timeout seconds (None waits). StopIteration at the end."""
+        if self.finished:
+            raise StopIteration
+        try:
+            if timeout is None or timeout > 0:
+                item = self.queue.get(timeout=timeout)
+            else:
+                item = self.queue.get_nowait()
+        except Empty:
+            return None
+        if item is self.done:
+            self.finished = True
+            if self.errors:
+                raise self.errors[0]
+            raise StopIteration
+        return item
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.get(timeout=None)
@@ -0,0 +1,85 @@
+import os
+import time
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None  # not on every dev machine, fall back to polling
+
+if pyinotify is not None:
+    WATCH_MASK = pyinotify.IN_MODIFY | pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVE_SELF | pyinotify.IN_ATTRIB
+
+
+class FileTail:
+    """
+    Follows a growing text file (raw_gps.txt) like tail -f. lines() blocks
+    until the file changes, woken by inotify when pyinotify is installed,
+    otherwise by polling every poll_interval seconds, and then returns every
+    complete line written since the last call. A line still being written is
+    kept until its newline arrives, and the file being truncated or replaced
+    starts reading it again from the top.
+    """
+    def __init__(self, path, poll_interval=0.1, from_start=False):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.file = open(path, 'r')
+        if not from_start:
+            self.file.seek(0, os.SEEK_END)
+        self.partial = ''
+        self.mtime = float('nan')  # time.time() the file was last written when lines were read
+        self.notifier = None
+        if pyinotify is not None:
+            self.wm = pyinotify.WatchManager()
+            self.wd = self.wm.add_watch(path, WATCH_MASK)[path]
+            self.notifier = pyinotify.Notifier(self.wm, default_proc_fun=lambda event: None,
+                                               timeout=int(poll_interval * 1000))
+
+    def lines(self):
+        """Blocks until there are new complete lines and returns them (without newlines)."""
+        while True:
+            lines = self.read_available()
+            if lines:
+                return lines
+            self.wait()
+
+    def wait(self):
+        if self.notifier is not None:
+            # the timeout still catches a replaced file whose watch went with the old inode
+            if self.notifier.check_events():
+                self.notifier.read_events()
+                self.notifier.process_events()
+        else:
+            time.sleep(self.poll_interval)
+
+    def read_available(self):
+        self.check_rotated()
+        data = self.file.read()
+        if not data:
+            return []
+        self.mtime = os.fstat(self.file.fileno()).st_mtime
+        data = self.partial + data
+        lines = data.split('\n')
+        self.partial = lines.pop()
+        return [line.strip() for line in lines if line.strip()]
+
+    def check_rotated(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return  # between removing and recreating, keep the old one
+        if stat.st_ino != os.fstat(self.file.fileno()).st_ino:
+            self.file.close()
+            self.file = open(self.path, 'r')
+            self.partial = ''
+            if self.notifier is not None:
+                # a moved away file keeps its watch, drop it (quietly, a deleted one already lost it)
+                self.wm.rm_watch(self.wd, quiet=True)
+                self.wd = self.wm.add_watch(self.path, WATCH_MASK)[self.path]
+        elif stat.st_size < self.file.tell():
+            self.file.seek(0)  # truncated
+            self.partial = ''
+
+    def close(self):
+        if self.notifier is not None:
+            self.notifier.stop()
+        self.file.close()
@@ -0,0 +1,212 @@
+import os
+import socket
+import struct
+import time
+from collections import namedtuple
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+
+# Every GNSS fix is pushed by rtk_coords.py to any number of local subscribers
+# (mapper, pathing, UI) over this Unix socket. SOCK_SEQPACKET keeps one fix per
+# message so nobody has to re-split or re-parse text.
+FIX_SOCKET = '/tmp/greenkeeper_fix.sock'
+
+# time is UTC seconds of the day from the receiver, lon/lat in decimal degrees.
+# speed (m/s over ground) and heading (degrees of motion) only come with UBX
+# NAV-PVT, GGA based fixes leave them NaN. rx_time is time.monotonic() when
+# rtk_coords.py read the fix off the UART; CLOCK_MONOTONIC is system wide so
+# subscribers can tell how old a fix is.
+Fix = namedtuple('Fix', ['time', 'lon', 'lat', 'quality', 'satellites', 'hdop', 'altitude',
+                         'speed', 'heading', 'rx_time'],
+                 defaults=(float('nan'), float('nan'), float('nan')))
+
+FIX_STRUCT = struct.Struct('<dddBBffffd')
+# earlier layouts, newest first: before rx_time, before speed and heading (NAV-PVT);
+# they are prefixes of FIX_STRUCT so old records fill the fields they have
+OLD_FIX_STRUCTS = (struct.Struct('<dddBBffff'), struct.Struct('<dddBBff'))
+
+
+def pack_fix(fix):
+    return FIX_STRUCT.pack(*fix)
+
+
+def unpack_fix(data):
+    return Fix(*FIX_STRUCT.unpack(data))
+
+
+def fix_from_nmea(parsed):
+    """Builds a Fix from a pynmeagps GGA message, None if it has no position."""
+    try:
+        if parsed.lat == '' or parsed.lon == '':
+            return None
+        t = parsed.time
+        seconds = t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6 if t else 0.0
+        return Fix(seconds,
+                   float(parsed.lon),
+                   float(parsed.lat),
+                   int(parsed.quality or 0),
+                   int(parsed.numSV or 0),
+                   float(parsed.HDOP or 0),
+                   float(parsed.alt or 0))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class LagStats:
+    """Collects how far behind a consumer is (seconds) and summarises it."""
+    def __init__(self, size=1000):
+        self.size = size
+        self.samples = []
+        self.count = 0
+        self.worst = 0.0
+
+    def add(self, lag):
+        if lag != lag:
+            return  # NaN, fix without a receive time
+        self.count += 1
+        self.worst = max(self.worst, lag)
+        self.samples.append(lag)
+        if len(self.samples) > self.size:
+            del self.samples[:len(self.samples) - self.size]
+
+    def report(self):
+        if not self.samples:
+            return "lag: no samples"
+        recent = sorted(self.samples)
+        return "lag ms: p50 %.1f  p95 %.1f  max %.1f (%i fixes)" % (
+            recent[len(recent) // 2] * 1000, recent[int(len(recent) * 0.95)] * 1000, self.worst * 1000, self.count)
+
+
+class FixPublisher:
+    def __init__(self, path=FIX_SOCKET):
+        self.path = path
+        self.clients = []
+        self.lock = Lock()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left over from a previous run
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.server.bind(self.path)
+        self.server.listen(8)
+
+        self.thread = Thread(target=self._accept_loop, daemon=True)
+        self.thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return  # server socket closed
+            conn.setblocking(False)
+            with self.lock:
+                self.clients.append(conn)
+
+    def publish(self, fix):
+        msg = pack_fix(fix)
+        with self.lock:
+            for conn in list(self.clients):
+                try:
+                    conn.send(msg)
+                except BlockingIOError:
+                    pass  # subscriber is behind, it just misses this fix
+                except OSError:
+                    conn.close()
+                    self.clients.remove(conn)
+
+    def close(self):
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+        with self.lock:
+            for conn in self.clients:
+                conn.close()
+            self.clients = []
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class FixSubscriber:
+    """
+    Receives fixes from the FixPublisher in a background thread.
+    latest() returns the newest fix, get() returns every fix in order.
+    Keeps reconnecting so it can be started before rtk_coords.py is up.
+    A fix received more than max_age seconds ago is not the latest any
+    more, so a consumer stops instead of steering on a position that
+    froze when rtk_coords.py died.
+    """
+    def __init__(self, path=FIX_SOCKET, queue_size=256, retry_interval=0.5, max_age=2.0):
+        self.path = path
+        self.retry_interval = retry_interval
+        self.max_age = max_age
+        self.queue = Queue(maxsize=queue_size)
+        self.fix = None
+        self.received = float('-inf')  # time.monotonic() self.fix arrived
+        self.sock = None
+        self.running = True
+
+        self.thread = Thread(target=self._recv_loop, daemon=True)
+        self.thread.start()
+
+    def _recv_loop(self):
+        while self.running:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                time.sleep(self.retry_interval)
+                continue
+            self.sock = sock
+            while self.running:
+                try:
+                    msg = sock.recv(FIX_STRUCT.size)
+                except OSError:
+                    break
+                if not msg:
+                    break  # publisher went away
+                self._put(unpack_fix(msg))
+            sock.close()
+            self.sock = None
+
+    def _put(self, fix):
+        self.fix = fix
+        self.received = time.monotonic()
+        try:
+            self.queue.put_nowait(fix)
+        except Full:
+            # drop the oldest fix so a slow consumer always sees recent data
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                pass
+            self.queue.put_nowait(fix)
+
+    def latest(self):
+        """The newest fix, None if there is none or it is older than max_age."""
+        if time.monotonic() - self.received > self.max_age:
+            return None
+        return self.fix
+
+    def drain(self):
+        """Every fix that is queued right now, without waiting."""
+        fixes = []
+        while True:
+            try:
+                fixes.append(self.queue.get_nowait())
+            except Empty:
+                return fixes
+
+    def get(self, timeout=None):
+        """Blocks until the next fix arrives, raises queue.Empty on timeout."""
+        return self.queue.get(timeout=timeout)
+
+    def close(self):
+        self.running = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
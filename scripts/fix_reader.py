@@ -0,0 +1,102 @@
+import os
+import time
+
+
+class LatestFixReader:
+    """
+    Keeps track of the newest sentence in a growing GPS log (raw_gps.txt).
+    Only the bytes appended since the last call are read, and at most
+    tail_bytes of them, so the cost per call does not grow with the log.
+    The newest line parse() accepts is the fix, other sentences are
+    skipped. It is cached and only re-parsed when a new line shows up;
+    rx_time is time.monotonic() when that line was first seen. A log that
+    was truncated and has grown back past the read offset between two
+    calls is noticed by the bytes before the offset having changed.
+    """
+    def __init__(self, gps_file, parse, tail_bytes=1024):
+        self.gps_file = gps_file
+        self.parse = parse  # callable(line: str) -> parsed fix or None
+        self.tail_bytes = tail_bytes
+
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self.partial = b''
+        self.last_line = None
+        self.fix = None
+        self.rx_time = float('nan')
+        self.seen = b''  # the last bytes read, still right before offset if the log only grew
+
+    def _open(self):
+        try:
+            self.file = open(self.gps_file, 'rb')
+        except FileNotFoundError:
+            return False
+        self.inode = os.fstat(self.file.fileno()).st_ino
+        self._reset()
+        return True
+
+    def _reset(self):
+        self.offset = 0
+        self.partial = b''
+        self.last_line = None
+        self.fix = None
+        self.rx_time = float('nan')
+        self.seen = b''
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def read(self):
+        """Returns the most recent parsed fix (or None if there is none yet)."""
+        if self.file is None and not self._open():
+            return None
+
+        try:
+            st = os.stat(self.gps_file)
+        except FileNotFoundError:
+            return self.fix
+
+        # the log was replaced (rotated or recreated), start over on the new file
+        if st.st_ino != self.inode:
+            self.close()
+            if not self._open():
+                return None
+            st = os.fstat(self.file.fileno())
+
+        size = st.st_size
+        # the log was truncated (menu.py clears raw_gps.txt before each run), maybe written again since
+        if size < self.offset or (self.seen and
+                                  os.pread(self.file.fileno(), len(self.seen), self.offset - len(self.seen)) != self.seen):
+            self._reset()
+        if size == self.offset:
+            return self.fix
+
+        # only look at the tail if a lot was written since the last call
+        start = max(self.offset, size - self.tail_bytes)
+        skipped = start > self.offset
+        self.file.seek(start)
+        chunk = self.file.read(size - start)
+        self.offset = start + len(chunk)
+        self.seen = chunk[-32:]
+
+        lines = (chunk if skipped else self.partial + chunk).split(b'\n')
+        self.partial = lines.pop()  # incomplete line still being written
+        if skipped and lines:
+            lines.pop(0)  # started reading mid-line
+
+        for raw in reversed(lines):
+            line = raw.strip().decode('ascii', errors='replace')
+            if not line:
+                continue
+            if line == self.last_line:
+                break
+            fix = self.parse(line)
+            if fix is not None:
+                self.last_line = line
+                self.fix = fix
+                self.rx_time = time.monotonic()
+                break
+        return self.fix
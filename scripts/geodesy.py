@@ -0,0 +1,102 @@
+import numpy as np
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_EP2 = WGS84_E2 / (1 - WGS84_E2)
+
+
+def geodetic_to_ecef(lon, lat, alt=0.0):
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    sin_lat = np.sin(lat)
+    cos_lat = np.cos(lat)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * sin_lat ** 2)
+    x = (n + alt) * cos_lat * np.cos(lon)
+    y = (n + alt) * cos_lat * np.sin(lon)
+    z = (n * (1 - WGS84_E2) + alt) * sin_lat
+    return x, y, z
+
+
+def ecef_to_geodetic(x, y, z):
+    """Bowring's closed form, sub-millimetre for points near the surface."""
+    p = np.hypot(x, y)
+    theta = np.arctan2(z * WGS84_A, p * WGS84_B)
+    lat = np.arctan2(z + WGS84_EP2 * WGS84_B * np.sin(theta) ** 3,
+                     p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3)
+    lon = np.arctan2(y, x)
+    n = WGS84_A / np.sqrt(1 - WGS84_E2 * np.sin(lat) ** 2)
+    alt = p / np.cos(lat) - n
+    return np.degrees(lon), np.degrees(lat), alt
+
+
+class LocalFrame:
+    """
+    East/north/up tangent plane at a fixed origin, in metres. The origin's
+    ECEF position and rotation are worked out once, after that every
+    transform is a handful of array operations, so a whole map or path is
+    projected in one call. Points are (lon, lat) like everywhere else in
+    the scripts, local points are (east, north).
+    """
+    def __init__(self, lon0, lat0, alt0=0.0):
+        self.lon0 = lon0
+        self.lat0 = lat0
+        self.alt0 = alt0
+        self.origin = np.array(geodetic_to_ecef(lon0, lat0, alt0))
+        lam = np.radians(lon0)
+        phi = np.radians(lat0)
+        # rows are the east, north and up unit vectors in ECEF
+        self.rotation = np.array([
+            [-np.sin(lam), np.cos(lam), 0.0],
+            [-np.sin(phi) * np.cos(lam), -np.sin(phi) * np.sin(lam), np.cos(phi)],
+            [np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)],
+        ])
+
+    @classmethod
+    def from_points(cls, points):
+        """Frame centred on a set of (lon, lat) points, e.g. a map boundary."""
+        points = np.asarray(points, dtype=float)
+        return cls(points[:, 0].mean(), points[:, 1].mean())
+
+    def forward(self, lon, lat, alt=0.0):
+        """lon/lat (scalars or arrays) to east, north, up in metres."""
+        ecef = np.array(geodetic_to_ecef(lon, lat, alt), dtype=float)
+        d = ecef - self.origin.reshape((3,) + (1,) * (ecef.ndim - 1))
+        return np.tensordot(self.rotation, d, axes=1)
+
+    def inverse(self, east, north, up=0.0):
+        """east/north/up in metres back to lon, lat, alt."""
+        enu = np.array(np.broadcast_arrays(east, north, up), dtype=float)
+        ecef = np.tensordot(self.rotation.T, enu, axes=1) + self.origin.reshape((3,) + (1,) * (enu.ndim - 1))
+        return ecef_to_geodetic(*ecef)
+
+    def to_local(self, points):
+        """(N, 2) lon/lat array (or one point) to (N, 2) east/north."""
+        points = np.asarray(points, dtype=float)
+        east, north, _ = self.forward(points[..., 0], points[..., 1])
+        return np.stack([east, north], axis=-1)
+
+    def to_lonlat(self, xy):
+        """(N, 2) east/north array (or one point) to (N, 2) lon/lat."""
+        xy = np.asarray(xy, dtype=float)
+        lon, lat, _ = self.inverse(xy[..., 0], xy[..., 1])
+        return np.stack([lon, lat], axis=-1)
+
+
+def distance(a, b):
+    """Distance in metres between local points, broadcasts over (..., 2) arrays."""
+    d = np.asarray(b, dtype=float) - np.asarray(a, dtype=float)
+    return np.hypot(d[..., 0], d[..., 1])
+
+
+def bearing(a, b):
+    """Compass bearing in degrees (0 north, 90 east) from local point a to b."""
+    d = np.asarray(b, dtype=float) - np.asarray(a, dtype=float)
+    return np.degrees(np.arctan2(d[..., 0], d[..., 1])) % 360.0
+
+
+def path_length(xy):
+    xy = np.asarray(xy, dtype=float)
+    return float(distance(xy[:-1], xy[1:]).sum()) if len(xy) > 1 else 0.0
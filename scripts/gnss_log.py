@@ -0,0 +1,168 @@
+import os
+import struct
+import time
+from threading import Event, Lock, Thread
+
+from fix_bus import Fix, pack_fix, FIX_STRUCT, OLD_FIX_STRUCTS
+
+# binary logs start with this and the record size, so a changed Fix layout is still readable
+LOG_MAGIC = b'GKFX'
+LOG_HEADER = struct.Struct('<4sH')
+
+
+class GnssLogWriter:
+    """
+    Buffered GNSS log for rtk_coords.py. Sentences are collected in memory and
+    written in one call once the buffer is full or flush_interval has passed,
+    so the SD card sees a few large writes instead of one small write per fix.
+
+    fmt:      'text' writes the raw GGA sentences (same as raw_gps.txt),
+              'binary' writes fixed size fix records after a header with their
+              size (see read_binary_log); a file of another layout is moved
+              to .1 instead of being appended to
+    fsync:    'never', 'flush' (after every flush) or 'rotate' (on rotate/close)
+    max_bytes / rotate_interval: start a new file once the current one is that
+              big / that old (seconds), keeping `backups` old files as .1, .2, ...
+
+    A background thread also flushes every flush_interval, so the last fixes
+    reach the file when they stop coming. write() after close() is ignored.
+    """
+    def __init__(self, path, fmt='text', buffer_bytes=16384, flush_interval=5.0,
+                 fsync='rotate', max_bytes=None, rotate_interval=None, backups=5):
+        if fmt not in ('text', 'binary'):
+            raise ValueError("fmt must be 'text' or 'binary'")
+        if fsync not in ('never', 'flush', 'rotate'):
+            raise ValueError("fsync must be 'never', 'flush' or 'rotate'")
+        self.path = path
+        self.fmt = fmt
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backups = backups
+
+        self.buffer = []
+        self.buffered = 0
+        self.file = None
+        self.lock = Lock()  # write() runs on the serial thread, the timer and close() elsewhere
+        self._open()
+        self.closed = Event()
+        self.timer = Thread(target=self._flush_loop, daemon=True)
+        self.timer.start()
+
+    def _open(self):
+        if self.fmt == 'binary' and not self._same_layout():
+            self._shift_backups()  # records of another layout, don't append to them
+        self.file = open(self.path, 'ab', buffering=0)
+        if self.fmt == 'binary' and self.file.tell() == 0:
+            self.file.write(LOG_HEADER.pack(LOG_MAGIC, FIX_STRUCT.size))
+        self.size = self.file.tell()
+        self.header = LOG_HEADER.size if self.fmt == 'binary' else 0
+        self.opened = time.monotonic()
+        self.last_flush = self.opened
+
+    def write(self, raw_data, fix=None):
+        if self.fmt == 'binary':
+            if fix is None:
+                return
+            record = pack_fix(fix)
+        else:
+            record = raw_data
+        with self.lock:
+            if self.file is None:
+                return
+            self.buffer.append(record)
+            self.buffered += len(record)
+            if self.buffered >= self.buffer_bytes or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            with self.lock:
+                if self.file and time.monotonic() - self.last_flush >= self.flush_interval:
+                    self._flush()
+
+    def flush(self):
+        with self.lock:
+            if self.file:
+                self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            if self._should_rotate():
+                self.rotate()
+            data = b''.join(self.buffer)
+            self.file.write(data)
+            self.size += len(data)
+            self.buffer = []
+            self.buffered = 0
+            if self.fsync == 'flush':
+                os.fsync(self.file.fileno())
+        self.last_flush = time.monotonic()
+
+    def _should_rotate(self):
+        if self.size <= self.header:
+            return False
+        if self.max_bytes and self.size + self.buffered > self.max_bytes:
+            return True
+        if self.rotate_interval and time.monotonic() - self.opened >= self.rotate_interval:
+            return True
+        return False
+
+    def _same_layout(self):
+        try:
+            with open(self.path, 'rb') as f:
+                head = f.read(LOG_HEADER.size)
+        except FileNotFoundError:
+            return True
+        return not head or head == LOG_HEADER.pack(LOG_MAGIC, FIX_STRUCT.size)
+
+    def rotate(self):
+        self._close_file()
+        self._shift_backups()
+        self._open()
+
+    def _shift_backups(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = "%s.%i" % (self.path, i)
+            if os.path.exists(src):
+                os.replace(src, "%s.%i" % (self.path, i + 1))
+        if self.backups > 0:
+            os.replace(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+
+    def _close_file(self):
+        if self.fsync != 'never':
+            os.fsync(self.file.fileno())
+        self.file.close()
+
+    def close(self):
+        self.closed.set()
+        with self.lock:
+            if self.file:
+                self._flush()
+                self._close_file()
+                self.file = None
+
+
+def read_binary_log(path):
+    """
+    Returns the fixes stored in a binary GnssLogWriter file, fields an
+    older layout did not have are NaN. Logs from before the header are
+    read with the newest layout their size is a multiple of.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    layouts = {s.size: s for s in (FIX_STRUCT,) + OLD_FIX_STRUCTS}
+    if data[:len(LOG_MAGIC)] == LOG_MAGIC:
+        _, size = LOG_HEADER.unpack_from(data)
+        if size not in layouts:
+            raise ValueError(f"{path}: unknown fix record size {size}")
+        layout = layouts[size]
+        data = data[LOG_HEADER.size:]
+    else:
+        layout = next((s for s in layouts.values() if len(data) % s.size == 0), FIX_STRUCT)
+    usable = len(data) - len(data) % layout.size  # ignore a torn last record
+    return [Fix(*layout.unpack_from(data, i)) for i in range(0, usable, layout.size)]
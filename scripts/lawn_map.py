@@ -0,0 +1,110 @@
+from collections import namedtuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Point, Polygon
+from shapely.ops import unary_union
+from shapely.strtree import STRtree
+
+from roadmap import Roadmap
+
+# A map file is the lon,lat boundary the mapper records, optionally followed
+# by more rings, each starting with a section line:
+#   # hole      - part of the lawn that is not mowed (flower bed, tree, pool)
+#   # exclude   - no-go polygon, may overlap the boundary
+LawnMap = namedtuple('LawnMap', ['boundary', 'holes', 'exclusions'])
+
+SECTIONS = ('hole', 'exclude')
+
+# routes may stray this far (metres) outside the free space, stripe ends lie right on its edge
+ROUTE_TOLERANCE = 0.05
+
+
+def load_lawn_map(map_file):
+    """Reads a map file into lists of (lon, lat) points, see LawnMap."""
+    rings = {'boundary': [[]], 'hole': [], 'exclude': []}
+    current = rings['boundary'][0]
+    with open(map_file, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                kind = line[1:].strip().lower()
+                if kind in SECTIONS:
+                    current = []
+                    rings[kind].append(current)
+                continue
+            current.append(tuple(map(float, line.split(',')[:2])))
+    return LawnMap(rings['boundary'][0],
+                   [r for r in rings['hole'] if len(r) >= 3],
+                   [r for r in rings['exclude'] if len(r) >= 3])
+
+
+class LawnArea:
+    """
+    The mowable part of a lawn in local metres: the boundary minus its holes
+    and minus the exclusion polygons. Exclusions are kept in an STRtree so
+    point checks and the free space only look at the ones nearby. Moves
+    across it go round the holes and no-go zones, see route().
+    """
+    def __init__(self, boundary, holes=(), exclusions=()):
+        self.polygon = Polygon(boundary, [np.asarray(h) for h in holes]).buffer(0)
+        self.exclusions = [Polygon(e).buffer(0) for e in exclusions]
+        self.tree = STRtree(self.exclusions)
+        hits = self.tree.query(self.polygon, predicate='intersects')
+        if len(hits):
+            self.free = self.polygon.difference(unary_union([self.exclusions[i] for i in hits]))
+        else:
+            self.free = self.polygon
+        # holes and no-go zones as one geometry, the parts that are not lawn but inside or next to it
+        outline = unary_union([Polygon(p.exterior) for p in self._parts(self.polygon)])
+        self.obstacles = unary_union([outline.difference(self.polygon)] + self.exclusions)
+        self.roadmap = None  # built on the first route()
+        self.regions = None  # connected parts of the free space as route() sees them, see connected()
+
+    def contains(self, xy):
+        p = Point(xy)
+        if not self.polygon.covers(p):
+            return False
+        return not len(self.tree.query(p, predicate='intersects'))
+
+    def route(self, a, b):
+        """Points to drive through from a to b (b included) without crossing a hole or no-go zone."""
+        if self.roadmap is None:
+            self.roadmap = Roadmap(self.free, tolerance=ROUTE_TOLERANCE)
+        return self.roadmap.route(a, b)
+
+    def connected(self, xy, points):
+        """
+        Which of points (N, 2) route() can get to from xy: the ones in the
+        same part of the free space, not cut off by holes or no-go zones.
+        """
+        if self.regions is None:
+            self.regions = self._parts(self.free.buffer(ROUTE_TOLERANCE))
+        if not self.regions:
+            return np.zeros(len(points), dtype=bool)
+        start = Point(xy)
+        region = min(self.regions, key=lambda part: part.distance(start))
+        return shapely.covers(region, shapely.points(np.asarray(points)))
+
+    @staticmethod
+    def _parts(geometry):
+        if geometry.is_empty:
+            return []
+        return list(geometry.geoms) if hasattr(geometry, 'geoms') else [geometry]
+
+    def polygons(self):
+        return self._parts(self.free)
+
+    def rings(self):
+        """Every ring of the free space, exteriors and interiors, for the scanline engine."""
+        rings = []
+        for polygon in self.polygons():
+            rings.append(np.asarray(polygon.exterior.coords))
+            rings += [np.asarray(interior.coords) for interior in polygon.interiors]
+        return rings
+
+    @property
+    def area(self):
+        return self.free.area
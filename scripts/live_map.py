@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import time
+import webbrowser
+from collections import deque
+from threading import Condition, Thread
+
+from flask import Flask, Response, abort, jsonify, request, send_file, send_from_directory
+from werkzeug.serving import make_server
+
+from tile_cache import TileCache, LEAFLET_FILES, vendor_asset
+from track_store import TrackStore
+
+LIVE_MAP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets", "live_map")
+LIVE_MAP_PORT = 8765
+TRACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets", "tracks")
+
+
+def track_file_path(map_file):
+    """Where a session on a map keeps its full resolution track, read back with TrackStore.read()."""
+    name = os.path.splitext(os.path.basename(map_file))[0]
+    return os.path.join(TRACK_DIR, "%s-%s.track" % (name, time.strftime("%Y%m%d-%H%M%S")))
+
+
+class LiveMap:
+    """
+    Live Leaflet map served from a local HTTP server. The page
+    (assets/live_map/index.html) is loaded once and then follows
+    Server-Sent Events from /events?zoom=<z>: a snapshot of everything on
+    connect, after that only the new path points and positions. The path
+    comes from a TrackStore, so the browser only gets the track simplified
+    for its zoom level and reconnects when that changes.
+
+    The update methods only touch memory and never block on a browser, so
+    they can be called from the control loops; the server runs in its own
+    thread. A browser that falls further behind than `history` events gets
+    a fresh snapshot instead.
+
+    Leaflet and the map tiles are served from the local caches in
+    tile_cache.py too, so the page makes no outside requests; whatever is
+    missing is fetched once when there is a connection.
+    """
+    def __init__(self, title="Live Lawn Mower Map", port=LIVE_MAP_PORT, host="127.0.0.1", history=1000,
+                 tiles=None, track_file=None):
+        self.title = title
+        self.tiles = tiles
+        self.host = host
+        self.port = port
+        self.cond = Condition()
+        self.boundary = []  # [lat, lon] like Leaflet
+        self.track = TrackStore(track_file)
+        self.position = None
+        self.seq = 0
+        self.events = deque(maxlen=history)
+        self.server = None
+
+    def set_boundary(self, lonlat):
+        boundary = [[lat, lon] for lon, lat in lonlat]
+        with self.cond:
+            self.boundary = boundary
+            self._push('boundary', boundary)
+
+    def extend_path(self, lons, lats):
+        """Appends points to the track, the last one becomes the current position."""
+        if not len(lons):
+            return
+        with self.cond:
+            for zoom, (points, reset) in self.track.append(lons, lats).items():
+                self._push('reset' if reset else 'path', points, zoom)
+            self.position = [lats[-1], lons[-1]]
+            self._push('position', self.position)
+
+    def set_position(self, lon, lat):
+        with self.cond:
+            self.position = [lat, lon]
+            self._push('position', self.position)
+
+    def _push(self, kind, data, zoom=None):
+        # zoom is the track level a path event belongs to, None for everyone
+        self.seq += 1
+        self.events.append((self.seq, kind, data, zoom))
+        self.cond.notify_all()
+
+    def snapshot(self, zoom=18):
+        with self.cond:
+            return {'title': self.title, 'seq': self.seq, 'boundary': self.boundary,
+                    'path': self.track.points(zoom), 'position': self.position}
+
+    def stream(self, zoom=18, keepalive=15.0):
+        """SSE messages for one browser looking at a zoom level, until it goes away."""
+        level = self.track.level_for(zoom)
+        snapshot = self.snapshot(zoom)
+        seq = snapshot['seq']
+        yield "event: snapshot\ndata: %s\n\n" % json.dumps(snapshot)
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.seq > seq, timeout=keepalive)
+                idle = self.seq == seq
+                missed = not idle and (not self.events or self.events[0][0] > seq + 1)  # no longer kept
+                pending = [e for e in self.events if e[0] > seq and e[3] in (None, level)]
+                seq = self.seq
+            if idle:
+                yield ": keepalive\n\n"  # also how a closed browser is noticed
+            elif missed:
+                snapshot = self.snapshot(zoom)
+                seq = snapshot['seq']
+                yield "event: snapshot\ndata: %s\n\n" % json.dumps(snapshot)
+            elif pending:
+                yield "".join("event: %s\ndata: %s\n\n" % (kind, json.dumps(data)) for _, kind, data, _ in pending)
+
+    def create_app(self):
+        app = Flask(__name__)
+
+        @app.route("/")
+        def index():
+            return send_from_directory(LIVE_MAP_DIR, "index.html")
+
+        @app.route("/vendor/leaflet/<path:name>")
+        def vendor(name):
+            if name not in LEAFLET_FILES:
+                abort(404)
+            try:
+                return send_file(os.path.realpath(vendor_asset(name)), max_age=86400)
+            except OSError:
+                abort(404)  # not bundled yet and offline
+
+        @app.route("/tiles/<int:z>/<int:x>/<int:y>.png")
+        def tile(z, x, y):
+            data = self.tiles.get(z, x, y)
+            if data is None:
+                abort(404)
+            return Response(data, mimetype="image/png", headers={'Cache-Control': 'max-age=86400'})
+
+        @app.route("/snapshot")
+        def snapshot():
+            return jsonify(self.snapshot(request.args.get('zoom', 18, type=int)))
+
+        @app.route("/events")
+        def events():
+            zoom = request.args.get('zoom', 18, type=int)
+            return Response(self.stream(zoom), mimetype="text/event-stream",
+                            headers={'Cache-Control': 'no-cache'})
+
+        return app
+
+    def start(self, open_browser=True):
+        """Starts serving in a background thread, returns the page URL (None if the port is taken)."""
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no line per request
+        if self.tiles is None:
+            self.tiles = TileCache()
+        try:
+            self.server = make_server(self.host, self.port, self.create_app(), threaded=True)
+        except OSError as e:
+            print(f"Live map disabled: {e}")
+            return None
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        url = "http://%s:%i/" % (self.host, self.port)
+        print(f"Live map at {url}")
+        if open_browser:
+            webbrowser.open(url)
+        return url
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+        self.track.close()
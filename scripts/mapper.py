@@ -1,126 +1,212 @@
 import numpy as np
 import time
 import sys
-import webbrowser
 import os
+import signal
+from fix_bus import FixSubscriber, LagStats, FIX_SOCKET
+from file_watch import FileTail
+from nmea import nmea_to_decimal, load_gga_log
+from geodesy import LocalFrame, distance, path_length
+from boundary_simplify import OnlineSimplifier
+from live_map import LiveMap, track_file_path
+
+# menu.py starts a new ring with these, see start_section()
+SECTION_SIGNALS = {signal.SIGUSR1: 'hole', signal.SIGUSR2: 'exclude'}
 
 class LawnMowerMapping:
-    def __init__(self, out_file_path, gps_file_path='../assets/raw_gps.txt', update_interval=0.1):
-        # dir to open raw_gps.txt file
+    def __init__(self, out_file_path, gps_file_path=None, update_interval=0.1, fix_socket=FIX_SOCKET):
+        # fixes are pushed by rtk_coords.py, a raw_gps.txt file is only tailed when given
         self.gps_file_path = gps_file_path
+        self.fix_sub = None if gps_file_path else FixSubscriber(fix_socket)
 
         self.path = []
         self.latitudes = []
         self.longitudes = []
         self.paused = False
+        # metric tangent plane anchored at the first point, for distances while mapping
+        self.frame = None
+        self.last_xy = None
+        self.track_length = 0.0
 
         # file to write to 
         self.out_file_path = out_file_path  
+        # the map file only gets simplified vertices, finish() replaces this session's part
+        # of it with the closed, repaired rings
+        self.file_start = os.path.getsize(out_file_path) if os.path.exists(out_file_path) else 0
+        self.rings = [('boundary', OnlineSimplifier())]
+        # asked for from a signal handler, started with the next batch of fixes
+        self.next_section = None
+        # only used when there is no inotify to wake up on raw_gps.txt changes
         self.update_interval = update_interval
+        # how far ingest is behind the receiver, printed every lag_report_interval seconds
+        self.lag = LagStats()
+        self.lag_report_interval = 10.0
+        self.last_lag_report = time.monotonic()
         
-        # Plot initialization code
-        self.html_file = "../assets/live_map/live_map.html"
-        self.generate_map()
+        # the walked path is pushed to the browser as it grows, see live_map.py;
+        # every fix is also kept in a track file under assets/tracks
+        self.live_map = LiveMap("Live Lawn Mower Map", track_file=track_file_path(out_file_path))
 
 
     # keep reading gps coordinates until program stops
     def read_gps_coordinates(self):
-        with open(self.gps_file_path, 'r') as file:
-            file.seek(0, os.SEEK_END)
+        if self.gps_file_path:
+            self.read_gps_file()
+            return
+        while True:
+            # block for the next fix, then take everything that queued up behind it
+            fixes = [self.fix_sub.get()] + self.fix_sub.drain()
+            if self.paused:
+                continue
+            now = time.monotonic()
+            for fix in fixes:
+                self.lag.add(now - fix.rx_time)
+            self.add_points(np.round([f.lon for f in fixes], 7), np.round([f.lat for f in fixes], 7))
+            self.report_lag()
+
+    def read_gps_file(self):
+        tail = FileTail(self.gps_file_path, poll_interval=self.update_interval)
+        try:
             while True:
-                if not self.paused:
-                    line = file.readline().strip()
-                    if not line:
-                        time.sleep(self.update_interval)
-                        continue
+                lines = tail.lines()
+                if self.paused:
+                    continue
+                lons, lats = [], []
+                for line in lines:
                     parts = line.split(',')
                     if len(parts) > 6 and parts[0] == '$GNGGA':
                         try:
-                            print(f"\nReceived GPS data\n{parts}")
-                            lon, lat = self.nmea_to_decimal(parts[2], parts[3], parts[4], parts[5])
-                            if lon == '' or lat == '':
-                                continue
-                            print(f"New point:\nLatitude: {lat}, Longitude: {lon}")
-                            self.path.append((lon, lat))
-                            self.latitudes.append(lat)
-                            self.longitudes.append(lon)
-                            # save lon,lat to map file used for lawn mower pathing
-                            with open(self.out_file_path, 'a') as out_file:
-                                out_file.write(f"{lon},{lat}\n")
-                            self.generate_map()
-                        except:
-                            continue
-                time.sleep(self.update_interval)
-
-
-    def nmea_to_decimal(self, lat_deg, lat_dir, lon_deg, lon_dir):
-        """Converts NMEA format to decimal degrees."""
-        lat_conv = float(lat_deg[:2]) + float(lat_deg[2:]) / 60.0
-        lon_conv = float(lon_deg[:3]) + float(lon_deg[3:]) / 60.0
-        
-        if lat_dir == 'S':
-            lat_conv = -lat_conv
-        if lon_dir == 'W':
-            lon_conv = -lon_conv
-        return round(lon_conv, 7), round(lat_conv, 7)
-    
-    def generate_map(self):
-        if not self.path:
+                            lon, lat = nmea_to_decimal(parts[2], parts[3], parts[4], parts[5])
+                        except ValueError:
+                            continue  # empty fields while there is no fix
+                        lons.append(lon)
+                        lats.append(lat)
+                self.add_points(lons, lats)
+                # the file has no receive times, the age of its last write is the nearest thing
+                self.lag.add(time.time() - tail.mtime)
+                self.report_lag()
+        finally:
+            tail.close()
+
+    def add_point(self, lon, lat):
+        self.add_points([lon], [lat])
+
+    def add_points(self, lons, lats):
+        """Adds a batch of fixes: one map file write and one map refresh for all of them."""
+        if not len(lons):
+            return
+        if self.next_section:
+            self.start_section(self.next_section)
+            self.next_section = None
+        print(f"{len(lons)} new point(s), latest: Latitude: {lats[-1]}, Longitude: {lons[-1]}")
+        self.path.extend(zip(lons, lats))
+        self.latitudes.extend(lats)
+        self.longitudes.extend(lons)
+        simplifier = self.rings[-1][1]
+        vertices = []
+        for xy in self.track(lons, lats):
+            # save lon,lat to map file used for lawn mower pathing, only once the simplifier keeps it
+            vertices += simplifier.add(xy)
+        self.write_vertices(vertices)
+        self.live_map.extend_path(lons, lats)
+
+    def report_lag(self):
+        if time.monotonic() - self.last_lag_report >= self.lag_report_interval:
+            print(self.lag.report())
+            self.last_lag_report = time.monotonic()
+
+    def write_vertices(self, vertices):
+        if not len(vertices):
+            return
+        lonlat = np.round(self.frame.to_lonlat(np.asarray(vertices)), 7)
+        with open(self.out_file_path, 'a') as out_file:
+            out_file.writelines(f"{lon},{lat}\n" for lon, lat in lonlat.tolist())
+
+    def finish(self):
+        """Closes and repairs every recorded ring and rewrites this session's part of the map file."""
+        if self.frame is None:
             return
-        center_lon, center_lat = self.path[-1]  # current/latest location
-        path = ",".join(f"[{lat},{lon}]" for lon, lat in self.path)
-
-        html = f"""<!DOCTYPE html>
-    <html>
-    <head>
-        <title>Live Lawn Mower Map</title>
-        <meta charset="utf-8" />
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <meta http-equiv="refresh" content="3">
-        <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
-        <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-    </head>
-    <body>
-        <div id="map" style="height: 100vh;"></div>
-        <script>
-            var map = L.map('map').setView([{center_lat}, {center_lon}], 18);
-            L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{
-                maxZoom: 22,
-                attribution: '© OpenStreetMap contributors'
-            }}).addTo(map);
-            
-            var path = L.polyline([{path}], {{color: 'red'}}).addTo(map);
-            var currentMarker = L.circleMarker([{center_lat}, {center_lon}], {{
-                color: 'blue',
-                radius: 8,
-                fillColor: '#00f',
-                fillOpacity: 0.8
-            }}).addTo(map).bindPopup("Current Location");
-            
-            map.fitBounds(path.getBounds());
-        </script>
-    </body>
-    </html>"""
-
-        with open(self.html_file, 'w') as f:
-            f.write(html)
-
-        if not hasattr(self, 'browser_opened'):
-            webbrowser.open('file://' + os.path.realpath(self.html_file))
-            self.browser_opened = True
+        lines = []
+        for kind, simplifier in self.rings:
+            ring = simplifier.finish()
+            if len(ring) < 3:
+                print(f"Dropped {kind} ring with {len(ring)} points")
+                continue
+            if kind != 'boundary':
+                lines.append(f"# {kind}\n")
+            lonlat = np.round(self.frame.to_lonlat(ring), 7)
+            lines += [f"{lon},{lat}\n" for lon, lat in lonlat.tolist()]
+            print(f"{kind}: {simplifier.raw} fixes -> {len(ring)} points ({simplifier.ratio():.1f}x smaller)")
+        with open(self.out_file_path, 'r+' if os.path.exists(self.out_file_path) else 'w') as out_file:
+            out_file.seek(self.file_start)
+            out_file.truncate()
+            out_file.writelines(lines)
+
+
+    def start_section(self, kind):
+        """Points recorded after this outline a 'hole' or an 'exclude' zone instead of the boundary."""
+        with open(self.out_file_path, 'a') as out_file:
+            out_file.write(f"# {kind}\n")
+        self.rings.append((kind, OnlineSimplifier()))
+        print(f"Recording {kind} polygon")
+
+    def replay_gps_log(self, gps_log):
+        """Builds the map from a recorded GGA log in one pass instead of fix by fix."""
+        batch = load_gga_log(gps_log)
+        if batch.bad:
+            print(f"Skipped {batch.bad} malformed GGA lines")
+        has_fix = (batch.quality > 0) & ~np.isnan(batch.lat) & ~np.isnan(batch.lon)
+        lons = np.round(batch.lon[has_fix], 7)
+        lats = np.round(batch.lat[has_fix], 7)
+        self.path.extend(zip(lons.tolist(), lats.tolist()))
+        self.latitudes.extend(lats.tolist())
+        self.longitudes.extend(lons.tolist())
+        simplifier = self.rings[-1][1]
+        for xy in self.track(lons, lats):
+            simplifier.add(xy)
+        self.finish()
+        print(f"Replayed {len(lons)} points from {gps_log}, {self.track_length:.1f} m walked")
+
+    def track(self, lons, lats):
+        """Adds new points to the walked distance, returns them in local metres."""
+        if not len(lons):
+            return np.empty((0, 2))
+        if self.frame is None:
+            self.frame = LocalFrame(lons[0], lats[0])
+        xy = self.frame.to_local(np.column_stack((lons, lats)))
+        if self.last_xy is not None:
+            self.track_length += float(distance(self.last_xy, xy[0]))
+        self.track_length += path_length(xy)
+        self.last_xy = xy[-1]
+        return xy
 
 
 def main():
     out_file_path = sys.argv[1]
     out_file_path = "../assets/maps/" + out_file_path + ".txt"
+    if len(sys.argv) > 2:
+        # rebuild a map from a recorded raw_gps.txt instead of live fixes
+        mapper_inst = LawnMowerMapping(out_file_path=out_file_path, gps_file_path=sys.argv[2])
+        mapper_inst.replay_gps_log(sys.argv[2])
+        return
     mapper_inst = LawnMowerMapping(out_file_path=out_file_path)
-    mapper_inst.read_gps_coordinates()
+    mapper_inst.live_map.start()
+    for signum in SECTION_SIGNALS:
+        signal.signal(signum, lambda signum, frame: setattr(mapper_inst, 'next_section', SECTION_SIGNALS[signum]))
+    print(f"Walk the boundary. kill -USR1 {os.getpid()} starts a hole, kill -USR2 {os.getpid()} a no-go zone")
+    # menu.py stops the mapper with SIGTERM, close the boundary properly on the way out
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        mapper_inst.read_gps_coordinates()
+    finally:
+        mapper_inst.finish()
+        mapper_inst.live_map.stop()
 
 
 if __name__ == "__main__":
     # if no args are passed, use default path
     if len(sys.argv) < 2:
-        print("Usage: python mapper.py <output_file_path>")
+        print("Usage: python mapper.py <output_file_path> [recorded_gps_log]")
         sys.exit(1)
     
     # start the mapping process
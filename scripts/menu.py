@@ -10,6 +10,7 @@ import subprocess
 import atexit
 import threading
 import os
+import signal
 from pathing import Pathing
 
 
@@ -80,6 +81,8 @@ button_pathing = Button("Choose a map", 200, 310, 240, 50, PINK)
 button_quit = Button("QUIT", 400, 590, 240, 50, (255, 0, 0), YELLOW) 
 button_delete_map = Button("Cancel & Delete", 170, 170, 350, 50, (255,0,0), YELLOW)
 button_save_map = Button("Stop & Save", 200, 240, 240, 50, GREEN2, YELLOW)
+button_record_hole = Button("Record hole", 200, 310, 240, 50, PINK)
+button_record_nogo = Button("Record no-go", 200, 380, 240, 50, PINK)
 button_enter_mapname = Button("Click here to enter map name: ",200, 240, 290, 50, PINK)
 button_increase_speed = Button("+", 70, 490, 40, 40, PINK)  # Increase button
 button_decrease_speed = Button("-", 30, 490, 40, 40, PINK) # 
@@ -98,6 +101,8 @@ def launch_rtk_loop():
         "python", "rtk_coords.py", 
         "-u", email, 
         "-p", "none", 
+        "--gpsLog", "../assets/raw_gps.txt",
+        "-r", "10",
         "rtk2go.com", 
         "2101", 
         "VIAM_BASE2"
@@ -510,6 +515,11 @@ def mapping_mode():
                     
                     pygame.event.clear()
                     running = False
+                elif button_record_hole.is_clicked(mouse_pos, True) or button_record_nogo.is_clicked(mouse_pos, True):
+                    # the mapper closes the current ring and records the next one from here
+                    kind = signal.SIGUSR1 if button_record_hole.is_clicked(mouse_pos, True) else signal.SIGUSR2
+                    if mapper_thread and mapper_thread.is_alive():
+                        mapper_process.send_signal(kind)
                 elif button_increase_speed.is_clicked(mouse_pos, True):
                     speed = min(speed + 0.1, 1.0)
                     print("Speed Increased!")
@@ -519,6 +529,8 @@ def mapping_mode():
         
         button_delete_map.draw(screen)
         button_save_map.draw(screen)
+        button_record_hole.draw(screen)
+        button_record_nogo.draw(screen)
         button_increase_speed.draw(screen)
         button_decrease_speed.draw(screen)
         button_back.draw(screen)
@@ -0,0 +1,152 @@
+import numpy as np
+from collections import namedtuple
+
+# Columns of a parsed GGA log. time is UTC seconds of the day, lat/lon are
+# decimal degrees. bad is the number of GGA lines that were malformed and
+# bad_lines holds their line numbers in the input.
+GGABatch = namedtuple('GGABatch', ['time', 'lat', 'lon', 'quality', 'satellites', 'hdop',
+                                   'altitude', 'bad', 'bad_lines'])
+
+GGA_FIELDS = 15  # $xxGGA + 13 data fields + checksum field
+
+
+def nmea_to_decimal(lat_deg, lat_dir, lon_deg, lon_dir):
+    """Converts NMEA format to decimal degrees."""
+    lat_conv = float(lat_deg[:2]) + float(lat_deg[2:]) / 60.0
+    lon_conv = float(lon_deg[:3]) + float(lon_deg[3:]) / 60.0
+
+    if lat_dir == 'S':
+        lat_conv = -lat_conv
+    if lon_dir == 'W':
+        lon_conv = -lon_conv
+    return round(lon_conv, 7), round(lat_conv, 7)
+
+
+def nmea_checksum(body):
+    checksum = 0
+    for c in body.encode('ascii'):
+        checksum ^= c
+    return checksum
+
+
+def fix_to_gga(fix):
+    """Formats a Fix as a GNGGA sentence (bytes), e.g. for the caster when the receiver only sends UBX."""
+    t = int(fix.time * 100) % 8640000 / 100.0  # truncate so 59.999 s never prints as 60.00
+    hours = int(t // 3600)
+    minutes = int(t % 3600 // 60)
+    lat = abs(fix.lat)
+    lon = abs(fix.lon)
+    body = "GNGGA,%02i%02i%05.2f,%02i%010.7f,%s,%03i%010.7f,%s,%i,%02i,%.1f,%.3f,M,0.0,M,," % (
+        hours, minutes, t % 60,
+        int(lat), (lat - int(lat)) * 60.0, 'S' if fix.lat < 0 else 'N',
+        int(lon), (lon - int(lon)) * 60.0, 'W' if fix.lon < 0 else 'E',
+        fix.quality, fix.satellites, fix.hdop, fix.altitude)
+    return ("$%s*%02X\r\n" % (body, nmea_checksum(body))).encode('ascii')
+
+
+# field index: max width in bytes
+GGA_WIDTHS = {1: 12, 2: 16, 4: 16, 6: 2, 7: 3, 8: 8, 9: 12}
+
+
+def _field(flat, row_starts, starts, ends, k, width):
+    """Cuts field k out of every row as a NUL padded (rows, width) block."""
+    idx = (row_starts + starts[:, k])[:, None] + np.arange(width)
+    inside = np.arange(width) < (ends[:, k] - starts[:, k])[:, None]
+    block = np.take(flat, idx, mode='clip')
+    block[~inside] = 0
+    return block, ends[:, k] - starts[:, k] > width
+
+
+def _numeric(block, too_long, valid):
+    """Converts a padded field block to float, flagging rows with non numeric text."""
+    digit = (block >= ord('0')) & (block <= ord('9'))
+    dot = block == ord('.')
+    minus = block == ord('-')
+    empty = block[:, 0] == 0
+    ok = ((digit | dot | minus | (block == 0)).all(axis=1)
+          & ~too_long
+          & (dot.sum(axis=1) <= 1)
+          & ~minus[:, 1:].any(axis=1)
+          & digit.any(axis=1))
+    valid &= ok | empty
+    strings = block.view('S%i' % block.shape[1]).ravel()
+    values = np.full(len(block), np.nan)
+    values[ok] = strings[ok].astype(np.float64)
+    return values
+
+
+def _degrees(ddmm):
+    deg = np.floor(ddmm / 100.0)
+    return deg + (ddmm - deg * 100.0) / 60.0
+
+
+def _parse_chunk(lines):
+    """Parses GGA lines that all have the right number of fields."""
+    n = len(lines)
+    chars = lines.view(np.uint8).reshape(n, lines.itemsize)
+    lengths = np.char.str_len(lines)
+    commas = np.flatnonzero(chars.ravel() == ord(',')) % lines.itemsize
+    commas = commas.reshape(n, GGA_FIELDS - 1)
+    starts = np.concatenate([np.zeros((n, 1), dtype=commas.dtype), commas + 1], axis=1)
+    ends = np.concatenate([commas, lengths[:, None]], axis=1)
+
+    flat = chars.ravel()
+    row_starts = np.arange(n) * lines.itemsize
+    valid = np.ones(n, dtype=bool)
+    columns = {}
+    for k, width in GGA_WIDTHS.items():
+        block, too_long = _field(flat, row_starts, starts, ends, k, width)
+        columns[k] = _numeric(block, too_long, valid)
+
+    south = np.take(flat, row_starts + starts[:, 3], mode='clip') == ord('S')
+    west = np.take(flat, row_starts + starts[:, 5], mode='clip') == ord('W')
+
+    t = columns[1]
+    hours = np.floor(t / 10000.0)
+    minutes = np.floor((t - hours * 10000.0) / 100.0)
+    seconds = hours * 3600.0 + minutes * 60.0 + (t - hours * 10000.0 - minutes * 100.0)
+    lat = np.where(south, -1.0, 1.0) * _degrees(columns[2])
+    lon = np.where(west, -1.0, 1.0) * _degrees(columns[4])
+    return valid, (seconds, lat, lon, columns[6], columns[7], columns[8], columns[9])
+
+
+def parse_gga_batch(data, chunk_lines=200000):
+    """
+    Parses a whole GGA log (bytes) into NumPy columns without a Python loop
+    over the lines. Lines that are not GGA sentences are skipped, GGA lines
+    with the wrong field count or non numeric values are counted as bad
+    instead of raising. Works on chunks of chunk_lines to bound memory.
+    """
+    lines = np.char.strip(np.array(data.split(b'\n')))
+    is_gga = np.char.startswith(lines, b'$GNGGA') | np.char.startswith(lines, b'$GPGGA')
+    gga_index = np.flatnonzero(is_gga)
+    gga = lines[gga_index]
+    del lines
+
+    shaped = np.char.count(gga, b',') == GGA_FIELDS - 1
+    good_index = gga_index[shaped]
+    good = gga[shaped]
+
+    valid = np.ones(len(good), dtype=bool)
+    parts = []
+    for i in range(0, len(good), chunk_lines):
+        chunk = good[i:i + chunk_lines]
+        chunk = chunk.astype('S%i' % max(np.char.str_len(chunk).max(), 1))
+        chunk_valid, cols = _parse_chunk(chunk)
+        valid[i:i + chunk_lines] = chunk_valid
+        parts.append([c[chunk_valid] for c in cols])
+    cols = [np.concatenate(c) if parts else np.empty(0) for c in zip(*parts)] if parts else [np.empty(0)] * 7
+    seconds, lat, lon, quality, satellites, hdop, altitude = cols
+
+    bad_lines = np.sort(np.concatenate([gga_index[~shaped], good_index[~valid]]))
+    return GGABatch(seconds, lat, lon,
+                    np.nan_to_num(quality).astype(np.uint8),
+                    np.nan_to_num(satellites).astype(np.uint8),
+                    hdop, altitude,
+                    len(bad_lines), bad_lines)
+
+
+def load_gga_log(path):
+    """Parses a raw_gps.txt style log file, see parse_gga_batch."""
+    with open(path, 'rb') as f:
+        return parse_gga_batch(f.read())
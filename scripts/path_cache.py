@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# bump when the planner output changes so old entries are not reused
+CACHE_VERSION = 2
+
+
+def map_hash(map_file):
+    """Hash of the map file contents."""
+    with open(map_file, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def map_key(map_file, **params):
+    """Hash of the map file contents plus the planner parameters."""
+    h = hashlib.sha256()
+    h.update(map_hash(map_file).encode('ascii'))
+    h.update(json.dumps(dict(params, version=CACHE_VERSION), sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+class PathCache:
+    """
+    Planned coverage paths stored as .npz files in a directory next to the
+    maps. Entries are content addressed (see map_key), so an edited map or
+    different planner settings simply miss. When a map is re-planned the
+    entries of its older versions (a different map_hash) are removed,
+    entries for other spacings or planners stay, and the least recently used
+    entries are evicted once there are more than max_entries or they take
+    more than max_bytes.
+    """
+    def __init__(self, directory, max_entries=32, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name, key):
+        return os.path.join(self.directory, "%s-%s.npz" % (name, key[:16]))
+
+    def get(self, name, key):
+        """Returns the stored arrays as a dict, None on a miss."""
+        path = self._path(name, key)
+        try:
+            with np.load(path) as data:
+                if str(data['key']) != key:
+                    return None
+                arrays = {k: data[k] for k in data.files if k not in ('key', 'map')}
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(path)  # mark as recently used
+        return arrays
+
+    def put(self, name, key, map_hash='', **arrays):
+        """Stores arrays under key; map_hash (see map_hash()) tells outdated entries of the map apart."""
+        path = self._path(name, key)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, key=np.array(key), map=np.array(map_hash), **arrays)
+        os.replace(tmp, path)  # readers never see half a file
+        self.invalidate(name, map_hash)
+        self.evict()
+
+    def invalidate(self, name, map_hash=None):
+        """Removes the entries of a map made from other contents than map_hash (all of them for None)."""
+        for entry in self.entries():
+            if os.path.basename(entry).rsplit('-', 1)[0] != name:
+                continue
+            if map_hash is not None:
+                try:
+                    with np.load(entry) as data:
+                        if 'map' in data.files and str(data['map']) == map_hash:
+                            continue
+                except (OSError, ValueError):
+                    pass
+            os.remove(entry)
+
+    def entries(self):
+        return [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith('.npz')]
+
+    def evict(self):
+        entries = sorted(self.entries(), key=os.path.getmtime, reverse=True)
+        total = 0
+        for i, entry in enumerate(entries):
+            total += os.path.getsize(entry)
+            if i >= self.max_entries or (self.max_bytes and total > self.max_bytes):
+                os.remove(entry)
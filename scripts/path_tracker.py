@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from geodesy import bearing, distance
+from turns import resample, velocity_profile
+
+
+def normalize_angle(angle):
+    return (angle + 180) % 360 - 180
+
+
+class PathTracker:
+    """
+    Pure pursuit over a path in local metres. The robot steers towards the
+    point `lookahead` metres further along the path than the closest point
+    to it, so it drives through waypoints instead of stopping at each one.
+
+    The path can be extended while driving (stream_waypoints). Every
+    extension is sampled every `sample` metres into its own cKDTree; the
+    closest point is only searched between `search_back` behind and
+    `search_ahead` in front of the progress so far, so the neighbouring
+    stripe half a metre away is never mistaken for the current one.
+    Wheel duties follow the arc through the lookahead point, scaled by the
+    velocity profile of the path (base duty is max_speed). Headings are
+    compass bearings like geodesy.bearing, degrees clockwise from north;
+    the right wheel faster turns the robot left, as in MotorDriver.turn_left.
+    """
+    def __init__(self, lookahead=0.75, base=0.3, track_width=0.4, sample=0.1,
+                 search_back=0.5, search_ahead=2.0, max_speed=0.5, max_accel=0.3, min_speed=0.1):
+        self.lookahead = lookahead
+        self.base = base
+        self.max_speed = max_speed
+        self.max_accel = max_accel
+        self.min_speed = min_speed
+        self.track_width = track_width
+        self.sample = sample
+        self.search_back = search_back
+        self.search_ahead = search_ahead
+        self.points = np.empty((0, 2))
+        self.s = np.empty(0)  # arc length at every vertex
+        self.speeds = np.empty(0)  # planned speed at every vertex, m/s
+        self.chunks = []  # (tree, arc length of every sample, first, last)
+        self.progress = 0.0
+        self.cross_track = 0.0
+
+    @property
+    def length(self):
+        return float(self.s[-1]) if len(self.s) else 0.0
+
+    def remaining(self):
+        return self.length - self.progress
+
+    def extend(self, points, final=False):
+        """Appends waypoints; final when they are the end of the path, where the robot stops."""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(self.points):
+            points = np.vstack((self.points[-1:], points))
+        # vertices every 0.25 m at most so the speed ramps have somewhere to live
+        points = resample(points, 0.25)
+        steps = np.hypot(*np.diff(points, axis=0).T)
+        keep = np.concatenate(([True], steps > 1e-6))  # repeated waypoints (stripe ends) are one vertex
+        points, steps = points[keep], steps[keep[1:]]
+        s0 = self.length
+        s = s0 + np.concatenate(([0.0], np.cumsum(steps)))
+        if len(self.points):
+            self.points = np.vstack((self.points, points[1:]))
+            self.s = np.concatenate((self.s, s[1:]))
+        else:
+            self.points, self.s = points, s
+        if s[-1] > s0 or not self.chunks:
+            samples = np.arange(s0, s[-1] + self.sample, self.sample)
+            samples[-1] = min(samples[-1], s[-1])
+            self.chunks.append((cKDTree(self.point_at(samples)), samples, s0, float(s[-1])))
+        self.plan_speeds(0.0 if final else self.max_speed)
+
+    def finish(self):
+        """No more waypoints are coming, slow down to stop at the last one."""
+        self.plan_speeds(0.0)
+
+    def plan_speeds(self, end_speed):
+        # only the path ahead is re-planned, starting from the speed planned for where the robot is
+        i = int(np.clip(np.searchsorted(self.s, self.progress) - 1, 0, max(len(self.s) - 1, 0)))
+        start = self.speeds[i] if i < len(self.speeds) else 0.0
+        speeds = velocity_profile(self.points[i:], self.max_speed, self.min_speed, self.max_accel,
+                                  start_speed=start, end_speed=end_speed)
+        self.speeds = np.concatenate((self.speeds[:i], speeds))
+
+    def speed_at(self, s):
+        return float(np.interp(s, self.s, self.speeds))
+
+    def point_at(self, s):
+        return np.column_stack((np.interp(s, self.s, self.points[:, 0]), np.interp(s, self.s, self.points[:, 1])))
+
+    def locate(self, xy):
+        """Arc length of the closest point on the path near the progress so far, advances the progress."""
+        lo, hi = self.progress - self.search_back, self.progress + self.search_ahead
+        # progress only grows, chunks left behind are not needed any more
+        while len(self.chunks) > 1 and self.chunks[0][3] < lo:
+            self.chunks.pop(0)
+        best, best_s = math.inf, None
+        for tree, samples, first, last in self.chunks:
+            if last < lo or first > hi:
+                continue
+            dist, idx = tree.query(xy, k=min(16, len(samples)))
+            dist, idx = np.atleast_1d(dist), np.atleast_1d(idx)
+            ok = (samples[idx] >= lo) & (samples[idx] <= hi)
+            if ok.any():
+                i = np.argmin(np.where(ok, dist, np.inf))
+                if dist[i] < best:
+                    best, best_s = dist[i], samples[idx[i]]
+        if best_s is None:
+            best_s = self.progress  # far off the path, keep pursuing from where we were
+        # exact projection onto the segment around the best sample
+        i = int(np.clip(np.searchsorted(self.s, best_s) - 1, 0, max(len(self.s) - 2, 0)))
+        if len(self.s) > 1:
+            a, b = self.points[i], self.points[i + 1]
+            ab = b - a
+            t = np.clip((xy - a) @ ab / max(ab @ ab, 1e-12), 0.0, 1.0)
+            best_s = self.s[i] + t * (self.s[i + 1] - self.s[i])
+            self.cross_track = float(distance(xy, a + t * ab))
+        self.progress = max(self.progress, float(best_s))
+        return self.progress
+
+    def steer(self, xy, heading):
+        """
+        Wheel duties (left, right) for the robot at xy (local metres) facing
+        heading, a compass bearing in degrees clockwise from north. Not the
+        raw MotorDriver.read_imu yaw, that starts at 0 wherever the robot
+        pointed at power on and grows counter-clockwise; see YawAlignment.
+        """
+        s = self.locate(np.asarray(xy, dtype=float))
+        goal = self.point_at(min(s + self.lookahead, self.length))[0]
+        ld = float(distance(xy, goal))
+        if ld < 1e-3:
+            return self.base, self.base
+        alpha = math.radians(normalize_angle(float(bearing(xy, goal)) - heading))
+        if abs(alpha) > math.pi / 2:
+            turn = math.copysign(1.0, alpha)  # lookahead behind us (stripe end), pivot on one wheel
+        else:
+            curvature = 2 * math.sin(alpha) / ld
+            turn = curvature * self.track_width / 2
+        # never quite 0, corners planned as stops are crept through while pivoting
+        duty = self.base * max(self.speed_at(s), self.min_speed) / self.max_speed
+        # alpha > 0 is a goal to the right (clockwise), the left wheel speeds up
+        left, right = duty * (1 + turn), duty * (1 - turn)
+        return min(max(left, 0), 1), min(max(right, 0), 1)
+
+    def done(self, xy, tolerance=0.25):
+        return len(self.points) > 0 and self.remaining() < tolerance and distance(xy, self.points[-1]) < tolerance
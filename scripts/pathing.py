@@ -1,77 +1,164 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import time
-from shapely.geometry import Point, Polygon, LineString, MultiLineString
+from shapely.geometry import Point, Polygon
 from sklearn.decomposition import PCA
-import math
 import sys
 from motor_driver import MotorDriver
-import webbrowser
 import os
+from fix_reader import LatestFixReader
+from fix_bus import FixSubscriber, LagStats, FIX_SOCKET
+from nmea import nmea_to_decimal
+from geodesy import LocalFrame, distance, bearing, path_length
+from scanline import scanline_segments, stripe_positions
+from path_cache import PathCache, map_key, map_hash
+from stripe_order import order_segments, order_tour
+from lawn_map import load_lawn_map, LawnArea
+from roadmap import NoRoute
+from cells import decompose
+from sweep_search import search_sweep_angles, pca_angle, rotation
+from live_map import LiveMap, track_file_path
+from control_loop import ControlLoop, BackgroundWorker, Prefetch
+from path_tracker import PathTracker
+from turns import stripe_turns
+from pose_predictor import PosePredictor, YawAlignment
+
+# time budget per control loop stage in seconds, overruns are counted in the loop report
+CONTROL_BUDGETS = {'path': 0.01, 'gps': 0.005, 'imu': 0.01, 'predict': 0.002, 'steer': 0.002, 'motors': 0.005}
 
 class Pathing:
-    def __init__(self, map_file, gps_file='../assets/raw_gps.txt'):
+    def __init__(self, map_file, gps_file=None, fix_socket=FIX_SOCKET, cache_dir=None, planner='pca',
+                 planning_budget=5.0, control_rate=10.0, lookahead=0.75, min_turn_radius=None,
+                 max_speed=0.5, max_accel=0.3, predict_pose=True, imu_sign=-1, max_creep=5.0):
         # Robot properties
         self.map_file = map_file
+        # fixes are pushed by rtk_coords.py, a gps log file is only used when given
         self.gps_file = gps_file
+        if self.gps_file:
+            self.fix_reader = LatestFixReader(self.gps_file, self.parse_gps_line)
+            self.fix_sub = None
+        else:
+            self.fix_reader = None
+            self.fix_sub = FixSubscriber(fix_socket)
         self.blade_val = 0
         self.motors = MotorDriver()
         self.boundary = self.load_map_data(self.map_file)
         self.start_gps = None # position will be of the form (lon, lat)
-        self.boundary_polygon = Polygon(self.boundary)
+        # all geometry is done in metres on a tangent plane centred on the map
+        self.frame = LocalFrame.from_points(self.boundary) if self.boundary else None
+        self.boundary_xy = self.frame.to_local(self.boundary) if self.boundary else None
+        # mowable area: boundary minus holes and no-go zones (see lawn_map.py)
+        self.area = LawnArea(self.boundary_xy,
+                             [self.frame.to_local(h) for h in self.holes],
+                             [self.frame.to_local(e) for e in self.exclusions]) if self.boundary else None
+        self.boundary_polygon = self.area.polygon if self.boundary else None
+
+        # planned stripes are kept next to the maps so repeat mows skip the planner
+        self.path_cache = self.open_path_cache(cache_dir)
+        # 'pca' sweeps along the boundary's first principal axis, 'sweep' searches for the
+        # fastest sweep angle on all cores within planning_budget seconds, 'cells' splits the
+        # lawn into boustrophedon cells around obstacles and mows them one by one
+        self.planner = planner
+        self.planning_budget = planning_budget
+        # follow_path steers at this fixed rate (Hz), see control_loop.py
+        self.control_rate = control_rate
+        # pure pursuit lookahead in metres, see path_tracker.py
+        self.lookahead = lookahead
+        # stripe ends are joined by turns no tighter than this (metres, None for half the
+        # stripe spacing) and driven at most max_speed (m/s, the speed at base duty) with
+        # speed changes of at most max_accel (m/s2), see turns.py
+        self.min_turn_radius = min_turn_radius
+        self.max_speed = max_speed
+        self.max_accel = max_accel
+        # steer from where the robot is now rather than where the last fix saw it, dead
+        # reckoned over the fix's age from IMU yaw and the wheel commands (pose_predictor.py)
+        self.predict_pose = predict_pose
+        # read_imu yaw is 0 at power on and grows counter-clockwise (imu_sign -1, None to fit it as
+        # well), it is lined up with the GNSS course before steering; until then the robot creeps
+        # straight ahead, or backs up if that runs into the lawn's edge, for at most max_creep metres
+        self.imu_sign = imu_sign
+        self.max_creep = max_creep
+        self.fix_time = float('nan')  # time.monotonic() the last fix was received
+        # the receiver's heading of motion with the last fix (NAV-PVT only, NaN when slower than
+        # min_course_speed m/s where it is noise), lines the IMU yaw up with the compass
+        self.fix_course = float('nan')
+        self.min_course_speed = 0.2
+        self.last_warning = {}  # message -> time.monotonic() it was last printed, see warn()
+
+        # boundary and the driven track in the browser, updates only touch memory (see live_map.py)
+        self.live_map = LiveMap("Live Pathing Map", track_file=track_file_path(map_file))
+        if self.boundary:
+            self.live_map.set_boundary(self.boundary)
 
         # Create zigzag path based on the loaded boundary
         self.path = None
+        self.path_xy = None  # same path in local metres
 
     def create_path(self, spacing_meters=0.5):
         self.path = self.generate_zigzag_path(spacing_meters)
+        self.path_xy = self.frame.to_local(self.path) if self.path else None
+
+    def open_path_cache(self, cache_dir):
+        cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(self.map_file)), ".path_cache")
+        try:
+            return PathCache(cache_dir)
+        except OSError as e:
+            print(f"Path cache disabled: {e}")
+            return None
 
     def load_map_data(self, map_file):
-        # map_file contains all lon,lat points
-        with open(map_file, 'r') as file:
-            lines = file.readlines()
-            # list of tuples (lon, lat)
-            points = []
-            for line in lines:
-                points.append(tuple(map(float, line.strip().split(','))))
-            if len(points) < 5:
-                return None
-            return points
+        # map_file contains all lon,lat points, optionally followed by hole / exclude rings
+        lawn = load_lawn_map(map_file)
+        self.holes = lawn.holes
+        self.exclusions = lawn.exclusions
+        # list of tuples (lon, lat)
+        points = lawn.boundary
+        if len(points) < 3:
+            return None
+        return points
 
 
     def get_current_gps(self):
-        with open(self.gps_file, 'r') as file:
-            # get the last line of the file which should be the most recent GPS data
-            lines = file.readlines()
-            if not lines:
-                print("No GPS data found in the file.")
-                return None
-            last_line = lines[-1].strip()
-            try:
-                parts = last_line.split(',')
-                if len(parts) > 6 and parts[0] == '$GNGGA':
-                    lon, lat = self.nmea_to_decimal(parts[2], parts[3], parts[4], parts[5])
-                    return (lon, lat)
-                else:
-                    print("Invalid GPS data format.")
-                    return None
-            except ValueError:
-                print("Error parsing GPS data.")
+        if self.fix_sub:
+            fix = self.fix_sub.latest()
+            if not fix:
+                self.warn("No recent GPS fix.")
                 return None
+            self.fix_time = fix.rx_time
+            self.fix_course = fix.heading if fix.speed >= self.min_course_speed else float('nan')
+            return (fix.lon, fix.lat)
+
+        # only the newest line of the file is read, and it is parsed once
+        current = self.fix_reader.read()
+        self.fix_time = self.fix_reader.rx_time
+        if self.fix_reader.last_line is None:
+            self.warn("No GPS data found in the file.")
+        return current
+
+    def warn(self, message, interval=5.0):
+        # called from the control loop every tick, printing each time would cost more than the tick
+        now = time.monotonic()
+        if now - self.last_warning.get(message, -interval) >= interval:
+            self.last_warning[message] = now
+            print(message)
+
+    def parse_gps_line(self, line):
+        # the log has every sentence the receiver sends, anything but GGA is skipped quietly
+        parts = line.split(',')
+        if parts[0] != '$GNGGA':
+            return None
+        if len(parts) <= 6:
+            self.warn("Invalid GPS data format.")
+            return None
+        try:
+            return nmea_to_decimal(parts[2], parts[3], parts[4], parts[5])
+        except ValueError:
+            self.warn("Error parsing GPS data.")
+            return None
 
-    def nmea_to_decimal(self, lat_deg, lat_dir, lon_deg, lon_dir):
-        """Converts NMEA format to decimal degrees."""
-        lat_conv = float(lat_deg[:2]) + float(lat_deg[2:]) / 60.0
-        lon_conv = float(lon_deg[:3]) + float(lon_deg[3:]) / 60.0
-        
-        if lat_dir == 'S':
-            lat_conv = -lat_conv
-        if lon_dir == 'W':
-            lon_conv = -lon_conv
-        return round(lon_conv, 7), round(lat_conv, 7)
-            
     def is_inside_boundary(self, point):
-        return self.boundary_polygon.contains(Point(point)) or self.boundary_polygon.touches(Point(point))
+        # outside holes and no-go zones too
+        return self.area.contains(self.frame.to_local(point))
 
 
     def generate_zigzag_path(self, spacing_meters=0.5):
@@ -79,6 +166,20 @@ class Pathing:
             print("No boundary data loaded, cannot generate a path.")
             return []
         
+        self.wait_for_start()
+        segments, cells = self.plan_stripes(spacing_meters)
+        segments = self.order_stripes(segments, self.frame.to_local(self.start_gps), cells)
+        if not len(segments):
+            print("Boundary is too small for the stripe spacing.")
+            return []
+        path = self.frame.to_lonlat(self.join_stripes(segments, spacing_meters))
+        path = [tuple(pt) for pt in path.tolist()]
+
+        print(f"Generated zigzag path with {len(path)} points.")
+        return path
+
+
+    def wait_for_start(self):
         # wait until robot is inside the boundary
         while True:
             pos = self.get_current_gps()
@@ -88,75 +189,308 @@ class Pathing:
                 break
             print("Waiting for robot to be inside the boundary...")
             time.sleep(1)  # wait for a second before checking again
-    
-
-        # meters to degrees conversion factors
-        avg_lat = np.mean([p[1] for p in self.boundary])
-        meter_to_deg_lon = 1 / (40075000 * np.cos(np.radians(avg_lat)) / 360)
-        
-
-        coords = np.array(self.boundary)
-        pca = PCA(n_components=2)
-        pca.fit(coords)
-        rotated = pca.transform(coords)
-        polygon_rotated = Polygon(rotated)
-
-        # Transform the start GPS to PCA space
-        start_point_rotated = pca.transform([self.start_gps])[0]
-        start_x = start_point_rotated[0]
-
-
-        minx, miny, maxx, maxy = polygon_rotated.bounds
-        step = spacing_meters * np.linalg.norm(pca.components_[0]) * meter_to_deg_lon  # convert meters to PCA space step size
-
-        x = minx
-        while x + step < start_x:
-            x += step
-
-
-        lines = []
-        x = minx
-        direction = True
-        while x <= maxx:
-            line = LineString([(x, miny), (x, maxy)]) if direction else LineString([(x, maxy), (x, miny)])
-            clipped = line.intersection(polygon_rotated)
-            if not clipped.is_empty:
-                if isinstance(clipped, LineString):
-                    lines.append(list(clipped.coords))
-                elif isinstance(clipped, MultiLineString):
-                    for subline in clipped.geoms:
-                        lines.append(list(subline.coords))
-            # move to the next step
-            x += step
-            direction = not direction
-        
-        # inverse transform the coordinates back to original space
-        rotated_path = [pt for segment in lines for pt in segment]
-        path = pca.inverse_transform(rotated_path)
-        path = [tuple(pt) for pt in path]
-
-        print(f"Generated zigzag path with {len(path)} points.")
-        return path
 
+    def turn_radius(self, spacing_meters):
+        # by default a half circle from one stripe onto the next
+        return self.min_turn_radius or spacing_meters / 2
+
+    def join_stripes(self, segments, spacing_meters):
+        # turns may hang over the lawn's edge but stay out of holes and no-go zones,
+        # moves between cells or across a hole go round them (see lawn_map.py)
+        return stripe_turns(segments, self.turn_radius(spacing_meters), spacing_meters, self.area.free,
+                            obstacles=self.area.obstacles, route=self.area.route)
+
+    def stream_waypoints(self, spacing_meters=0.5, chunk_stripes=16):
+        """
+        Generator of waypoints (local metres) in driving order, planned a
+        few stripes at a time so the robot can start as soon as the first
+        stripes are clipped. Starts at the stripe under the robot, mows
+        towards the nearer side of the lawn, then crosses over and mows the
+        rest. Only one chunk of stripes is clipped at a time; when the
+        stream ends the stripes are cached like plan_stripes would, so the
+        next mow of the same map orders the whole plan at once. A cached
+        plan, or the 'cells' planner, is planned in full first; 'sweep'
+        searches the angle first, which holds up the first waypoint for up
+        to planning_budget seconds. Stripes in parts of the lawn the robot
+        can't get to (cut off by holes or no-go zones) are skipped with a
+        warning, the rest is still mowed.
+        """
+        if not self.boundary:
+            print("No boundary data loaded, cannot generate a path.")
+            return
+        self.wait_for_start()
+        start_xy = self.frame.to_local(self.start_gps)
+
+        cached = self.cached_stripes(spacing_meters)
+        if cached or self.planner == 'cells':
+            segments, cells = cached or self.plan_stripes(spacing_meters)
+            reachable = self.reachable_stripes(segments, start_xy)
+            segments, cells = segments[reachable], (cells[reachable] if cells is not None else None)
+            try:
+                path = self.join_stripes(self.order_stripes(segments, start_xy, cells), spacing_meters)
+                lead = self.area.route(start_xy, path[0])[:-1] if len(path) else []
+            except NoRoute as e:
+                print(f"Can't plan the mow: {e}")
+                return
+            yield from lead
+            yield from path
+            return
 
-    def follow_path(self, align_threshold=5, distance_threshold=0.25):
-        for i in range(len(self.path) - 1):
-            target = self.path[i + 1]
+        rings = self.area.rings()
+        if self.planner == 'sweep':
+            angle = search_sweep_angles(rings, spacing_meters, time_budget=self.planning_budget).angle
+        else:
+            angle = pca_angle(self.boundary_xy)
+        r = rotation(angle)
+        rotated = [ring @ r for ring in rings]
+        u = np.concatenate([ring[:, 0] for ring in rotated])
+        xs = stripe_positions(u.min(), u.max(), spacing_meters)
+        first = int(np.clip(np.searchsorted(xs, (start_xy @ r)[0]), 0, len(xs) - 1))
+        # nearer side first, its stripes in order away from the robot
+        up = np.arange(first, len(xs))
+        down = np.arange(first - 1, -1, -1)
+        sides = (down, up) if len(down) < len(up) else (up, down)
+
+        pos = start_xy
+        last = None  # the previous chunk's last stripe, its end is held back until the turn after it is known
+        for side in sides:
+            for i in range(0, len(side), chunk_stripes):
+                segments, _ = scanline_segments(rotated, xs[side[i:i + chunk_stripes]])
+                segments = segments @ r.T if len(segments) else segments
+                segments = segments[self.reachable_stripes(segments, start_xy)]
+                if not len(segments):
+                    continue
+                ordered, _, _ = order_segments(segments, pos, time_budget=0.05)
+                try:
+                    if last is None:
+                        path = self.join_stripes(ordered, spacing_meters)
+                        # round any hole between the robot and its first stripe
+                        path = np.vstack((self.area.route(start_xy, path[0])[:-1], path[:-1]))
+                    else:
+                        path = self.join_stripes(np.concatenate(([last], ordered)), spacing_meters)[1:-1]
+                except NoRoute as e:
+                    print(f"Skipping {len(ordered)} stripes: {e}")
+                    continue
+                yield from path
+                pos = ordered[-1, 1]
+                last = ordered[-1]
+        if last is not None:
+            yield last[1]
+        if last is not None:
+            # all stripes again, in plan_stripes' boustrophedon order rather than the order driven
+            self.cache_stripes(spacing_meters, scanline_segments(rotated, xs)[0] @ r.T)
+
+    def reachable_stripes(self, segments, start_xy):
+        """Mask of the stripes the robot at start_xy can drive to, warns about the others."""
+        if not len(segments):
+            return np.ones(0, dtype=bool)
+        reachable = self.area.connected(start_xy, segments.mean(axis=1))
+        if not reachable.all():
+            skipped = segments[~reachable]
+            self.warn(f"Skipping {len(skipped)} stripes ({np.hypot(*(skipped[:, 1] - skipped[:, 0]).T).sum():.0f} m) "
+                      f"the robot can't get to, holes or no-go zones cut them off")
+        return reachable
+
+    def plan_stripes(self, spacing_meters=0.5):
+        """
+        Start independent part of the plan: the clipped stripes in local
+        metres as an (M, 2, 2) array of start/end points, in boustrophedon
+        order, and for the 'cells' planner the cell number of every stripe
+        (None otherwise). Cached per map contents, spacing and planner settings.
+        """
+        cached = self.cached_stripes(spacing_meters)
+        if cached:
+            return cached
+
+        rings = self.area.rings()
+        cells = None
+        if self.planner in ('sweep', 'cells'):
+            best = search_sweep_angles(rings, spacing_meters, time_budget=self.planning_budget)
+            segments = best.segments
+            if self.planner == 'cells':
+                planned = decompose(rings, best.angle, spacing_meters)
+                print(f"Split the lawn into {len(planned)} cells ({self.area.area:.0f} m2 mowable).")
+                segments = np.concatenate(planned) if planned else np.empty((0, 2, 2))
+                cells = np.repeat(np.arange(len(planned)), [len(c) for c in planned])
+        else:
+            # PCA on metres, the rotated space is metres too so the stripe step is just the spacing
+            coords = self.boundary_xy
+            pca = PCA(n_components=2)
+            pca.fit(coords)
+            rotated = [pca.transform(ring) for ring in rings]
+            polygon_rotated = Polygon(pca.transform(coords))
+
+            minx, miny, maxx, maxy = polygon_rotated.bounds
+            step = spacing_meters
+
+            # every stripe is clipped against every polygon edge (holes too) in one NumPy pass
+            segments, _ = scanline_segments(rotated, stripe_positions(minx, maxx, step))
+
+            # inverse transform the coordinates back to original space
+            if len(segments):
+                segments = pca.inverse_transform(segments.reshape(-1, 2)).reshape(-1, 2, 2)
+        self.cache_stripes(spacing_meters, segments, cells)
+        return segments, cells
+
+    def stripes_key(self, spacing_meters):
+        # the searched angle depends on how long the search may run, the PCA one does not
+        budget = self.planning_budget if self.planner in ('sweep', 'cells') else None
+        key = map_key(self.map_file, spacing=spacing_meters, planner=self.planner, planning_budget=budget)
+        return os.path.splitext(os.path.basename(self.map_file))[0], key
+
+    def cached_stripes(self, spacing_meters):
+        """(segments, cells) as plan_stripes returns them if they are cached, else None."""
+        if not self.path_cache:
+            return None
+        cached = self.path_cache.get(*self.stripes_key(spacing_meters))
+        if cached is None:
+            return None
+        print("Loaded planned stripes from cache.")
+        return cached['segments'], cached.get('cells')
+
+    def cache_stripes(self, spacing_meters, segments, cells=None):
+        if self.path_cache:
+            extra = {'cells': cells} if cells is not None else {}
+            self.path_cache.put(*self.stripes_key(spacing_meters), map_hash(self.map_file), segments=segments, **extra)
+
+    def order_stripes(self, segments, start_xy, cells=None):
+        """
+        Start dependent part of the plan: orders the stripe segments from the
+        robot's position so little time is spent driving between them, which
+        matters when stripes are split by notches in the lawn. With cells
+        the zigzag inside each cell is kept and only the cells are ordered.
+        """
+        if cells is not None and len(segments):
+            ordered, before, after = self.order_cells(segments, start_xy, cells)
+            print(f"Transit between cells: {before:.1f} m -> {after:.1f} m ({before - after:.1f} m saved)")
+            return ordered
+        if len(segments) and distance(start_xy, segments[-1, 1]) < distance(start_xy, segments[0, 0]):
+            segments = segments[::-1, ::-1]  # plain zigzag from the nearer end
+        ordered, before, after = order_segments(segments, start_xy)
+        print(f"Transit between stripes: {before:.1f} m -> {after:.1f} m ({before - after:.1f} m saved)")
+        return ordered
+
+    def order_cells(self, segments, start_xy, cells):
+        # every cell is entered at its first stripe and left at its last, or run backwards
+        groups = np.split(segments, np.flatnonzero(np.diff(cells)) + 1)
+        ends = np.array([[g[0, 0], g[-1, 1]] for g in groups])
+        order, flipped, before, after = order_tour(ends, start_xy)
+        ordered = [groups[i][::-1, ::-1] if flip else groups[i] for i, flip in zip(order, flipped)]
+        return np.concatenate(ordered), before, after
+
+    def follow_path(self, align_threshold=5, distance_threshold=0.25, waypoints=None, horizon=10.0):
+        # waypoints (local metres) can be any iterable, e.g. stream_waypoints() which plans as it goes;
+        # it runs on its own thread so planning the next chunk does not hold up steering, and the
+        # loop only takes the waypoints that are ready within the path stage's budget
+        if waypoints is None:
+            waypoints = self.path_xy[1:]
+        waypoints = Prefetch(waypoints)
+        tracker = PathTracker(lookahead=self.lookahead, max_speed=self.max_speed, max_accel=self.max_accel)
+        # the predictor also keeps the yaw history the compass alignment is fitted from
+        predictor = PosePredictor(self.max_speed, tracker.base, alignment=YawAlignment(self.imu_sign))
+        edges = self.area.free.boundary
+        # creeping: [direction (1 ahead, -1 back, 0 done), where it started, its distance to the edge]
+        creep = None
+        crept = 0.0  # metres crept before the current direction
+        fix_age = LagStats()
+        exhausted = False
+        starved = 0  # ticks stopped waiting for the planner
+        drawn_fix = None  # rx time (or position) of the last fix sent to the live map
+        # the live map and the loop reports run on a worker, the loop itself only steers
+        worker = BackgroundWorker("live map")
+        loop = ControlLoop(self.control_rate, CONTROL_BUDGETS, report=lambda text: worker.submit(print, text))
+        try:
             while True:
-                current = self.get_current_gps()
+                loop.wait()
+                # keep at least horizon metres of path ahead of the tracker, extended in chunks
+                if not exhausted and tracker.remaining() < horizon / 2:
+                    with loop.stage('path'):
+                        deadline = time.monotonic() + CONTROL_BUDGETS['path'] / 2
+                        chunk = []
+                        while not exhausted and (tracker.remaining() + path_length(chunk) < horizon or len(chunk) < 2):
+                            try:
+                                waypoint = waypoints.get(timeout=deadline - time.monotonic())
+                            except StopIteration:
+                                exhausted = True
+                                continue
+                            if waypoint is None:
+                                break  # the planner is behind, steer with what there is
+                            chunk.append(waypoint)
+                        if chunk:
+                            tracker.extend(chunk, final=exhausted)
+                        elif exhausted:
+                            tracker.finish()
+                with loop.stage('gps'):
+                    current = self.get_current_gps()
                 if not current:
-                    continue
-                self.generate_map()
-                dist = self.calculate_distance(current, target)
-                if dist < distance_threshold:
+                    # no fix yet or it went stale (rtk_coords.py gone), don't drive blind
                     self.motors.set_motor(0, 0)
+                    predictor.command(time.monotonic(), 0, 0)
+                    continue
+                # only new fixes, the loop runs faster than they come and each one goes to the track file;
+                # without a receive time (NaN) a fix is only told apart by its position
+                fix_key = self.fix_time if self.fix_time == self.fix_time else current
+                if fix_key != drawn_fix:
+                    drawn_fix = fix_key
+                    worker.submit(self.live_map.extend_path, [current[0]], [current[1]])
+                current = self.frame.to_local(current)
+                with loop.stage('imu'):
+                    yaw = self.motors.read_imu()
+                now = time.monotonic()
+                fix_age.add(now - self.fix_time)
+                with loop.stage('predict'):
+                    predictor.heading(now, yaw)
+                    predictor.observe(current, self.fix_time, self.fix_course, reverse=bool(creep and creep[0] < 0))
+                    if self.predict_pose:
+                        current = predictor.predict(current, self.fix_time, now)
+                heading = predictor.alignment.to_compass(yaw)
+                if exhausted and tracker.done(current, distance_threshold):
                     break
-                yaw = self.motors.read_imu()
-                bearing = self.calculate_bearing(current, target)
-                l_speed, r_speed = self.heading_correction(yaw, bearing)
-                self.motors.set_motor(l_speed, r_speed)
-                time.sleep(0.1)
-
+                if not exhausted and tracker.remaining() < distance_threshold:
+                    # out of path before the planner caught up, wait for it standing still
+                    starved += 1
+                    self.motors.set_motor(0, 0)
+                    predictor.command(time.monotonic(), 0, 0)
+                    continue
+                with loop.stage('steer'):
+                    if heading is not None:
+                        if creep and creep[0]:
+                            crept += float(distance(creep[1], current))
+                            if creep[0] < 0:
+                                predictor.alignment.restart()  # done backing up, the next course is forwards
+                            creep[0] = 0
+                        l_speed, r_speed = tracker.steer(current, heading)
+                    else:
+                        # no compass yet, creep straight so the GNSS course can line the yaw up
+                        edge = edges.distance(Point(current))
+                        if creep is None:
+                            creep = [1, current, edge]
+                        # closer than 0.3 m to the edge and getting closer (beyond fix noise and lag)
+                        blocked = edge < min(0.3, creep[2] - 0.1)
+                        if blocked and creep[0] > 0:
+                            crept += float(distance(creep[1], current))
+                            creep = [-1, current, edge]
+                            predictor.alignment.restart()  # no course across the change of direction
+                        elif blocked or crept + distance(creep[1], current) > self.max_creep:
+                            print("Could not line the IMU yaw up with the GNSS course, stopping.")
+                            break
+                        l_speed = r_speed = creep[0] * tracker.base * tracker.min_speed / tracker.max_speed
+                with loop.stage('motors'):
+                    self.motors.set_motor(l_speed, r_speed)
+                predictor.command(time.monotonic(), l_speed, r_speed)
+        finally:
+            self.motors.set_motor(0, 0)
+            print(loop.summary())
+            print(f"Drove {tracker.progress:.1f} m of {tracker.length:.1f} m planned, "
+                  f"last cross track error {tracker.cross_track:.2f} m")
+            print(f"Fix age when steering, {fix_age.report()}")
+            if creep:
+                print(f"Crept {crept:.1f} m to line up the IMU yaw with the GNSS course")
+            if starved:
+                print(f"Stopped {starved / self.control_rate:.1f} s waiting for the planner")
+            if worker.dropped:
+                print(f"Live map fell behind, {worker.dropped} updates dropped")
+            worker.close()
 
     def heading_correction(self, current, target, base=0.3, max_corr=0.1):
         diff = self.normalize_angle(target - current)
@@ -166,91 +500,32 @@ class Pathing:
         return max(min(left, 1), 0), max(min(right, 1), 0)
 
     def calculate_bearing(self, point1, point2):
-        lon1, lat1 = map(math.radians, point1)
-        lon2, lat2 = map(math.radians, point2)
-        dlon = lon2 - lon1
-        x = math.sin(dlon) * math.cos(lat2)
-        y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
-        return (math.degrees(math.atan2(x, y)) + 360) % 360
+        # (lon, lat) points, compass degrees
+        return float(bearing(self.frame.to_local(point1), self.frame.to_local(point2)))
 
     def normalize_angle(self, angle):
         angle = (angle + 180) % 360 - 180
         return angle
     
     def calculate_distance(self, point1, point2):
-        lat1, lon1 = point1[1], point1[0]
-        lat2, lon2 = point2[1], point2[0]
-        r = 6371000
-        phi1, phi2 = math.radians(lat1), math.radians(lat2)
-        dphi = math.radians(lat2 - lat1)
-        dlambda = math.radians(lon2 - lon1)
-        a = math.sin(dphi / 2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return r * c
+        # (lon, lat) points, metres
+        return float(distance(self.frame.to_local(point1), self.frame.to_local(point2)))
         
-    def generate_map(self):
-        if not self.boundary:
-            return
-
-        current_gps = self.get_current_gps()
-        if not current_gps:
-            return
-
-        boundary_js = ",".join(f"[{lat},{lon}]" for lon, lat in self.boundary)
-        current_lat, current_lon = current_gps[1], current_gps[0]
-
-        html = f"""<!DOCTYPE html>
-    <html>
-    <head>
-        <title>Live Pathing Map</title>
-        <meta charset="utf-8" />
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <meta http-equiv="refresh" content="3">
-        <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css"/>
-        <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-    </head>
-    <body>
-        <div id="map" style="height: 100vh;"></div>
-        <script>
-            var map = L.map('map').setView([{current_lat}, {current_lon}], 18);
-            L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{
-                maxZoom: 22,
-                attribution: '© OpenStreetMap contributors'
-            }}).addTo(map);
-
-            var boundary = L.polygon([{boundary_js}], {{color: 'green'}}).addTo(map).bindPopup("Boundary");
-            var marker = L.circleMarker([{current_lat}, {current_lon}], {{
-                color: 'blue',
-                radius: 8,
-                fillColor: '#00f',
-                fillOpacity: 0.8
-            }}).addTo(map).bindPopup("Current Location");
-        </script>
-    </body>
-    </html>"""
-
-        html_path = "../assets/live_map/pathing_map.html"
-        with open(html_path, 'w') as f:
-            f.write(html)
-
-        # Open in browser once
-        if not hasattr(self, 'browser_opened'):
-            webbrowser.open('file://' + os.path.realpath(html_path))
-            self.browser_opened = True
-            
 
 def main():
     map_file = sys.argv[1]
-    pathing_inst = Pathing(map_file=map_file)
-    pathing_inst.create_path()
-    pathing_inst.follow_path()
+    planner = sys.argv[2] if len(sys.argv) > 2 else 'pca'
+    pathing_inst = Pathing(map_file=map_file, planner=planner)
+    pathing_inst.live_map.start()
+    # start driving on the first stripes while the rest is still being planned
+    pathing_inst.follow_path(waypoints=pathing_inst.stream_waypoints())
     
 
 
 if __name__ == "__main__":
     # if no args are passed, use default path
     if len(sys.argv) < 2:
-        print("Usage: python pathing.py <output_file_path>")
+        print("Usage: python pathing.py <output_file_path> [pca|sweep|cells]")
         sys.exit(1)
     
     # start the mapping process
@@ -0,0 +1,168 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from geodesy import distance, bearing
+
+
+class YawAlignment:
+    """
+    Turns the IMU's yaw into a compass bearing. MotorDriver.read_imu only
+    integrates the gyro: 0 wherever the robot pointed at power on and
+    counter-clockwise positive, so bearing = offset + sign * yaw, fitted
+    to the GNSS course over ground. The course is the receiver's heading of
+    motion (NAV-PVT) when it has one, otherwise the bearing between fixes
+    min_distance apart with the yaw steady in between. The fit is only
+    trusted once `samples` courses agree to within about max_error
+    degrees; until then to_compass() is None. With a known sign (-1 for
+    MotorDriver) a short straight drive is enough, with sign None it is
+    fitted too and the yaw also has to have swung min_spread degrees.
+    """
+    def __init__(self, sign=None, min_distance=0.3, max_turn=5.0, samples=8, min_spread=45.0, max_error=10.0,
+                 size=200):
+        self.known_sign = sign
+        self.min_distance = min_distance
+        self.max_turn = max_turn
+        self.samples = samples
+        self.min_spread = min_spread
+        self.max_error = max_error
+        self.pairs = deque(maxlen=size)  # (yaw, course) in degrees
+        self.last = None  # (xy, yaw) the next bearing between fixes starts from
+        self.offset = None
+        self.sign = None
+
+    def add(self, xy, yaw, course=float('nan'), reverse=False):
+        """
+        A new fix at xy (local metres), the yaw when it was taken and the
+        receiver's course if known; reverse when the robot is backing up,
+        its course is then opposite to where it points.
+        """
+        if course == course:
+            self.pairs.append((yaw, (course + 180 * reverse) % 360))
+            self.last = None
+        elif self.last is None:
+            self.last = (xy, yaw)
+            return
+        else:
+            start, start_yaw = self.last
+            if distance(start, xy) < self.min_distance:
+                return
+            turned = (yaw - start_yaw + 180) % 360 - 180
+            if abs(turned) <= self.max_turn:
+                self.pairs.append((start_yaw + turned / 2, (float(bearing(start, xy)) + 180 * reverse) % 360))
+            self.last = (xy, yaw)
+        self.fit()
+
+    def restart(self):
+        """The robot changed direction, the next bearing between fixes starts from the next fix."""
+        self.last = None
+
+    def fit(self):
+        if len(self.pairs) < self.samples:
+            return
+        yaw, course = np.radians(np.array(self.pairs)).T
+        signs = (self.known_sign,) if self.known_sign else (1, -1)
+        if len(signs) > 1 and abs(np.exp(1j * yaw).mean()) > math.cos(math.radians(self.min_spread / 2)):
+            return  # all in one direction, the sign can't be told yet
+        # the sign whose offsets agree best, agreement as the length of their mean unit vector
+        sign, mean = max(((sign, np.exp(1j * (course - sign * yaw)).mean()) for sign in signs),
+                         key=lambda fit: abs(fit[1]))
+        if abs(mean) < math.cos(math.radians(self.max_error)):
+            return
+        self.sign = sign
+        self.offset = math.degrees(np.angle(mean)) % 360
+
+    def to_compass(self, yaw):
+        if self.offset is None:
+            return None
+        return (self.offset + self.sign * np.asarray(yaw)) % 360
+
+
+class PosePredictor:
+    """
+    Dead reckons the robot from its last GPS fix to now. A fix is already
+    some time old when the control loop gets it (receiver, UART,
+    rtk_coords.py, the fix socket); its rx_time says how old. From then on
+    the robot drove at the commanded wheel speeds with the heading the IMU
+    reported, so both are kept for the last `history` seconds and
+    integrated over the fix's age. Ages over max_age are only predicted
+    up to max_age, a stale fix is not worth betting on. IMU yaw is not a
+    compass bearing: observe() hands every new fix to a YawAlignment, the
+    one steering uses too, and nothing is predicted until it has a fit.
+    """
+    def __init__(self, max_speed=0.5, base=0.3, history=2.0, max_age=1.0, alignment=None):
+        self.speed_per_duty = max_speed / base  # m/s per unit of motor duty
+        self.history = history
+        self.max_age = max_age
+        self.commands = deque()  # (time, left, right), each holds until the next one
+        self.headings = deque()  # (time, IMU yaw degrees)
+        self.alignment = alignment or YawAlignment()
+        self.last_fix = None  # rx time (or position) of the last fix observed
+
+    def command(self, t, left, right):
+        self.commands.append((t, left, right))
+        self._trim(self.commands, t)
+
+    def heading(self, t, yaw):
+        self.headings.append((t, yaw))
+        self._trim(self.headings, t)
+
+    def _trim(self, samples, now):
+        # keep one sample older than the window, it is still in force at its start
+        while len(samples) > 1 and samples[1][0] < now - self.history:
+            samples.popleft()
+
+    def yaw_at(self, times):
+        t, yaw = np.array(self.headings).T
+        unwrapped = np.degrees(np.unwrap(np.radians(yaw)))
+        return np.interp(times, t, unwrapped) % 360
+
+    def heading_at(self, times):
+        """Compass bearings at times, None before the yaw is aligned."""
+        return self.alignment.to_compass(self.yaw_at(times))
+
+    def observe(self, xy, fix_time, course=float('nan'), reverse=False):
+        """
+        Hands a fix at xy (local metres) to the alignment, once, with the
+        yaw when it was taken (the newest one without a receive time).
+        course is its heading of motion from the receiver, NaN if none.
+        """
+        if not self.headings:
+            return
+        known_time = fix_time == fix_time
+        key = fix_time if known_time else tuple(xy)
+        if key == self.last_fix:
+            return
+        self.last_fix = key
+        yaw = self.yaw_at(fix_time) if known_time else self.headings[-1][1]
+        self.alignment.add(np.asarray(xy, dtype=float), float(yaw), course, reverse)
+
+    def predict(self, xy, fix_time, now):
+        """Where the robot at xy (local metres) at fix_time is at now."""
+        xy = np.asarray(xy, dtype=float)
+        if fix_time != fix_time or not self.commands or not self.headings or self.alignment.offset is None:
+            return xy  # no receive time, nothing to go on or no compass yet
+        start = max(fix_time, now - self.max_age)
+        if now <= start:
+            return xy
+        # split [start, now] where the commanded speeds change, then into ~20 ms steps for the heading
+        edges = [start] + [t for t, _, _ in self.commands if start < t < now] + [now]
+        pos = xy.copy()
+        for a, b in zip(edges[:-1], edges[1:]):
+            speed = self._speed(a)
+            if speed == 0:
+                continue
+            n = max(int(math.ceil((b - a) / 0.02)), 1)
+            dt = (b - a) / n
+            headings = np.radians(self.heading_at(a + (np.arange(n) + 0.5) * dt))
+            pos += speed * dt * np.array([np.sin(headings).sum(), np.cos(headings).sum()])
+        return pos
+
+    def _speed(self, t):
+        left = right = 0.0
+        for when, l, r in self.commands:
+            if when > t:
+                break
+            left, right = l, r
+        return (left + right) / 2 * self.speed_per_duty
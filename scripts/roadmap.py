@@ -0,0 +1,109 @@
+import numpy as np
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+from shapely.geometry.polygon import orient
+
+from geodesy import distance
+
+
+class NoRoute(ValueError):
+    """The target can't be reached inside the area, e.g. a part of the lawn cut off by no-go zones."""
+
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+
+def _unit(d):
+    return d / np.maximum(np.hypot(d[:, 0], d[:, 1]), 1e-12)[:, None]
+
+
+def _left(d):
+    """Unit normals to the left of the directions d."""
+    return _unit(np.column_stack((-d[:, 1], d[:, 0])))
+
+
+class Roadmap:
+    """
+    Shortest routes inside a polygon (the free space of a lawn, local
+    metres) that never cross its holes or no-go zones. A shortest route
+    only bends at reflex corners, and only along lines that touch both
+    corners without cutting in (bitangents), so those corners, pushed
+    `clearance` metres into the free space, are the nodes of a visibility
+    graph whose all-pairs shortest paths are worked out once. A query then
+    only checks which nodes its two ends can see. Lines may stray
+    `tolerance` metres outside the polygon, stripe ends lie right on its
+    edge.
+    """
+    def __init__(self, area, clearance=0.2, tolerance=0.05):
+        self.allowed = area.buffer(tolerance)
+        shapely.prepare(self.allowed)
+        corners, neighbours = [], []
+        for polygon in getattr(area, 'geoms', [area]):
+            if polygon.is_empty:
+                continue
+            # oriented so the free space is on the left of every ring, a right turn is a reflex corner
+            polygon = orient(polygon, 1.0)
+            for ring in [polygon.exterior, *polygon.interiors]:
+                xy = np.asarray(ring.coords)[:-1]
+                prev, nxt = np.roll(xy, 1, axis=0), np.roll(xy, -1, axis=0)
+                reflex = _cross(xy - prev, nxt - xy) < 0
+                corners.append(xy[reflex])
+                neighbours.append(np.stack((prev[reflex], nxt[reflex]), axis=1))
+        corners = np.vstack(corners) if corners else np.empty((0, 2))
+        neighbours = np.vstack(neighbours) if neighbours else np.empty((0, 2, 2))
+        # every corner moved into the free space along its bisector, by less where it is too narrow
+        inward = _unit(_left(corners - neighbours[:, 0]) + _left(neighbours[:, 1] - corners))
+        self.nodes = corners + clearance * inward
+        cramped = ~shapely.covers(area, shapely.points(self.nodes))
+        self.nodes[cramped] = corners[cramped] + 0.01 * inward[cramped]
+        self.corners, self.neighbours = corners, neighbours
+        n = len(self.nodes)
+        i, j = np.triu_indices(n, 1)
+        tangent = self.tangent(corners[j], i) & self.tangent(corners[i], j)
+        i, j = i[tangent], j[tangent]
+        seen = self.visible(self.nodes[i], self.nodes[j])
+        i, j = i[seen], j[seen]
+        graph = csr_matrix((distance(self.nodes[i], self.nodes[j]), (i, j)), shape=(n, n))
+        self.dist, self.pred = shortest_path(graph, directed=False, return_predecessors=True)
+
+    def tangent(self, points, k):
+        """
+        Whether the lines from points to the corners of nodes k only touch
+        them (both neighbours on one side), cheap to check before the geometry. A
+        neighbour within about 0.06 degrees of the line counts as on it.
+        """
+        d = _unit(self.corners[k] - points)
+        sides = [_cross(d, _unit(self.neighbours[k, m] - self.corners[k])) for m in (0, 1)]
+        sides = [np.where(np.abs(side) < 1e-3, 0.0, side) for side in sides]
+        return sides[0] * sides[1] >= 0
+
+    def _reachable(self, point):
+        """Nodes a shortest route from point can start with, and their distances."""
+        k = np.flatnonzero(self.tangent(point[None], np.arange(len(self.nodes))))
+        k = k[self.visible(np.repeat(point[None], len(k), axis=0), self.nodes[k])]
+        return k, distance(point, self.nodes[k])
+
+    def visible(self, a, b):
+        """Whether the lines a[k] -> b[k] stay inside, for (N, 2) arrays."""
+        return shapely.covers(self.allowed, shapely.linestrings(np.stack((a, b), axis=1)))
+
+    def route(self, a, b):
+        """The points to drive through from a to b, b included. Raises NoRoute if b can't be reached."""
+        a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        if self.visible(a[None], b[None])[0]:
+            return b[None]
+        if len(self.nodes):
+            ka, da = self._reachable(a)
+            kb, db = self._reachable(b)
+            if len(ka) and len(kb):
+                total = da[:, None] + self.dist[np.ix_(ka, kb)] + db[None, :]
+                best = np.unravel_index(np.argmin(total), total.shape)
+                if np.isfinite(total[best]):
+                    i, j = ka[best[0]], kb[best[1]]
+                    path = [j]
+                    while path[-1] != i:
+                        path.append(self.pred[i, path[-1]])
+                    return np.vstack((self.nodes[path[::-1]], b))
+        raise NoRoute(f"No route from {a.round(2).tolist()} to {b.round(2).tolist()} inside the mowable area")
@@ -0,0 +1,109 @@
+import struct
+
+# RTCM 3 frame: 0xD3 | 6 reserved bits + 10 bit length | payload | CRC-24Q
+PREAMBLE = 0xD3
+HEADER_LEN = 3
+CRC_LEN = 3
+
+_CRC24Q_POLY = 0x1864CFB
+
+
+def _crc24q_table():
+    table = []
+    for i in range(256):
+        crc = i << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= _CRC24Q_POLY
+        table.append(crc & 0xFFFFFF)
+    return table
+
+
+CRC24Q_TABLE = _crc24q_table()
+
+
+def crc24q(data):
+    crc = 0
+    for b in data:
+        crc = ((crc << 8) & 0xFFFFFF) ^ CRC24Q_TABLE[(crc >> 16) ^ b]
+    return crc
+
+
+def build_frame(msg_type, body=b''):
+    """Builds an RTCM 3 frame whose payload starts with the 12 bit message type."""
+    payload = struct.pack('>H', msg_type << 4) + body
+    header = struct.pack('>BH', PREAMBLE, len(payload) & 0x3FF)
+    crc = crc24q(header + payload)
+    return header + payload + crc.to_bytes(3, 'big')
+
+
+def message_type(frame):
+    return (frame[3] << 4) | (frame[4] >> 4) if len(frame) >= HEADER_LEN + 2 + CRC_LEN else 0
+
+
+class RTCMFramer:
+    """
+    Cuts a caster byte stream into whole RTCM 3 frames. Frames with a bad
+    CRC are dropped (and the framer resyncs on the next preamble), and when
+    an allow list of message types is given only those types are returned.
+    Keeps per-type counters so it is visible what the caster actually sends.
+    """
+    def __init__(self, allow=None):
+        self.allow = set(allow) if allow else None
+        self.buffer = bytearray()
+        self.counts = {}     # message type -> frames seen
+        self.forwarded = 0
+        self.filtered = 0
+        self.crc_errors = 0
+        self.skipped_bytes = 0
+
+    def reset(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Adds bytes from the caster, returns the complete wanted frames."""
+        self.buffer += data
+        buf = self.buffer
+        frames = []
+        i = 0
+        while True:
+            j = buf.find(PREAMBLE, i)
+            if j < 0:
+                self.skipped_bytes += len(buf) - i
+                i = len(buf)
+                break
+            self.skipped_bytes += j - i
+            i = j
+            if len(buf) - i < HEADER_LEN:
+                break
+            if buf[i + 1] & 0xFC:
+                # reserved bits are always zero, this 0xD3 is not a frame start
+                i += 1
+                self.skipped_bytes += 1
+                continue
+            length = ((buf[i + 1] & 0x03) << 8) | buf[i + 2]
+            end = i + HEADER_LEN + length + CRC_LEN
+            if end > len(buf):
+                break
+            frame = bytes(buf[i:end])
+            if crc24q(frame[:-CRC_LEN]) != int.from_bytes(frame[-CRC_LEN:], 'big'):
+                self.crc_errors += 1
+                i += 1
+                self.skipped_bytes += 1
+                continue
+            msg_type = message_type(frame)
+            self.counts[msg_type] = self.counts.get(msg_type, 0) + 1
+            if self.allow is None or msg_type in self.allow:
+                frames.append(frame)
+                self.forwarded += 1
+            else:
+                self.filtered += 1
+            i = end
+        del buf[:i]
+        return frames
+
+    def report(self):
+        types = " ".join("%i:%i" % (t, n) for t, n in sorted(self.counts.items()))
+        return "rtcm frames %i forwarded, %i filtered, %i crc errors, %i bytes skipped | types %s" % (
+            self.forwarded, self.filtered, self.crc_errors, self.skipped_bytes, types or "-")
@@ -27,11 +27,18 @@ import sys
 import datetime
 import base64
 import time
+import threading
 #import ssl
 from optparse import OptionParser
 
 import serial
 from pynmeagps import NMEAReader
+from fix_bus import FixPublisher, FIX_SOCKET, fix_from_nmea
+from rtk_io import NtripIOEngine
+from rtcm import RTCMFramer
+from gnss_log import GnssLogWriter
+from nmea import fix_to_gga
+from ubx import UBXReader, NAV_PVT, cfg_rate_message, cfg_msg_message
 
 version=0.2
 useragent="NTRIP JCMBsoftPythonClient/%.1f" % version
@@ -45,6 +52,28 @@ sleepTime=1 # So the first one is 1 second
 
 
 
+class NtripSource(object):
+    def __init__(self, caster, port, mountpoint, user):
+        self.caster=caster
+        self.port=port
+        if mountpoint[0:1] != "/":
+            mountpoint = "/"+mountpoint
+        self.mountpoint=mountpoint
+        self.user=user  # base64 "user:password"
+        self.handshakeLatency=None
+        self.dataLatency=None
+        self.failures=0
+        self.retryAt=0
+
+    def latency(self):
+        if self.handshakeLatency is None or self.dataLatency is None:
+            return float("inf")
+        return self.handshakeLatency + self.dataLatency
+
+    def __str__(self):
+        return "%s:%i%s" % (self.caster, self.port, self.mountpoint)
+
+
 class NtripClient(object):
     def __init__(self,
                  buffer=50,
@@ -63,7 +92,25 @@ class NtripClient(object):
                  V2=False,
                  headerFile=sys.stderr,
                  headerOutput=False,
-                 maxConnectTime=0
+                 maxConnectTime=0,
+                 fixSocket=FIX_SOCKET,
+                 gpsLog=None,
+                 logFormat='text',
+                 logFlushInterval=5.0,
+                 logMaxBytes=None,
+                 logRotateTime=None,
+                 serialPort='/dev/ttyAMA0',
+                 baudrate=115200,
+                 rtcmFilter=True,
+                 rtcmAllow=None,
+                 sources=None,
+                 maxCorrectionAge=10,
+                 probeTimeout=5,
+                 sourceCooldown=30,
+                 maxSourceCooldown=600,
+                 refusedCooldown=300,
+                 ubx=False,
+                 navRate=10
                  ):
         self.buffer=buffer
         self.user=base64.b64encode(bytes(user,'utf-8')).decode("utf-8")
@@ -72,6 +119,21 @@ class NtripClient(object):
         self.port=port
         self.caster=caster
         self.mountpoint=mountpoint
+        # extra (caster, port, mountpoint[, user]) tuples to fail over to
+        self.sources=[NtripSource(caster, port, mountpoint, self.user)]
+        for extra in sources or []:
+            extraUser=base64.b64encode(bytes(extra[3],'utf-8')).decode("utf-8") if len(extra) > 3 else self.user
+            self.sources.append(NtripSource(extra[0], int(extra[1]), extra[2], extraUser))
+        self.source=None
+        self.maxCorrectionAge=maxCorrectionAge
+        self.probeTimeout=probeTimeout
+        # a failed source is left alone for sourceCooldown, doubling with every failure in a
+        # row up to maxSourceCooldown; one that refused the request (bad mountpoint or login)
+        # for refusedCooldown
+        self.sourceCooldown=sourceCooldown
+        self.maxSourceCooldown=maxSourceCooldown
+        self.refusedCooldown=refusedCooldown
+        self.probeLock=threading.Lock()
         self.setPosition(lat, lon)
         self.height=height
         self.verbose=verbose
@@ -83,8 +145,24 @@ class NtripClient(object):
         self.headerOutput=headerOutput
         self.maxConnectTime=maxConnectTime
         self.socket=None
-        self.stream = serial.Serial('/dev/ttyAMA0', 115200, timeout=3)
+        self.stream = serial.Serial(serialPort, baudrate, timeout=3)
         self.nmr = NMEAReader(self.stream)
+        # UBX mode reads binary NAV-PVT at navRate Hz instead of parsing GGA text
+        self.ubx = UBXReader() if ubx else None
+        if self.ubx:
+            self.stream.write(cfg_rate_message(navRate))
+            self.stream.write(cfg_msg_message(*NAV_PVT))
+        # parsed fixes go straight to local subscribers, the text log is optional
+        self.publisher = FixPublisher(fixSocket) if fixSocket else None
+        self.gpsLog = GnssLogWriter(gpsLog, fmt=logFormat, flush_interval=logFlushInterval,
+                                    max_bytes=logMaxBytes, rotate_interval=logRotateTime) if gpsLog else None
+        # RTCM forwarding and NMEA reading run on their own threads
+        # only whole RTCM frames with a valid CRC (and an allowed type) go to the UART
+        self.framer = RTCMFramer(rtcmAllow) if rtcmFilter else None
+        self.engine = NtripIOEngine(self.stream, self.nmr, self.handleFix, buffer=self.buffer,
+                                    verbose=self.verbose, framer=self.framer,
+                                    ubx=self.ubx, on_pvt=self.handlePvt)
+        self.statsInterval = 10
         
 
         if UDP_Port:
@@ -117,11 +195,12 @@ class NtripClient(object):
         self.lonMin=(lon-self.lonDeg)*60
         self.latMin=(lat-self.latDeg)*60
 
-    def getMountPointBytes(self):
-        mountPointString = "GET %s HTTP/1.1\r\nUser-Agent: %s\r\nAuthorization: Basic %s\r\n" % (self.mountpoint, useragent, self.user)
+    def getMountPointBytes(self, source=None):
+        source = source or self.sources[0]
+        mountPointString = "GET %s HTTP/1.1\r\nUser-Agent: %s\r\nAuthorization: Basic %s\r\n" % (source.mountpoint, useragent, source.user)
 #        mountPointString = "GET %s HTTP/1.1\r\nUser-Agent: %s\r\n" % (self.mountpoint, useragent)
         if self.host or self.V2:
-           hostString = "Host: %s:%i\r\n" % (self.caster,self.port)
+           hostString = "Host: %s:%i\r\n" % (source.caster,source.port)
            mountPointString+=hostString
         if self.V2:
            mountPointString+="Ntrip-Version: Ntrip/2.0\r\n"
@@ -131,147 +210,256 @@ class NtripClient(object):
         return bytes(mountPointString,'ascii')
 
     def getGGABytes(self):
-        while True:
-            (raw_data, parsed_data) = self.nmr.read()
-            if bytes("GNGGA",'ascii') in raw_data :
-                # print(parsed_data)
-                return raw_data
-
-    def readData(self):
-        reconnectTry=1
-        sleepTime=1
-        reconnectTime=0
-        if self.maxConnectTime > 0 :
-            EndConnect=datetime.timedelta(seconds=maxConnectTime)
+        # the engine's NMEA thread owns the serial reader, take its latest GGA;
+        # None when the receiver has had no fix for probeTimeout
+        return self.engine.wait_gga(self.probeTimeout)
+
+    def handleFix(self, raw_data, parsed_data, rxTime=float('nan')):
+        fix = fix_from_nmea(parsed_data)
+        if fix:
+            fix = fix._replace(rx_time=rxTime)
+        if self.publisher and fix:
+            self.publisher.publish(fix)
+        if self.gpsLog:
+            self.gpsLog.write(raw_data, fix)
+
+    def handlePvt(self, fix):
+        if self.publisher:
+            self.publisher.publish(fix)
+        if self.gpsLog:
+            # the text log stays GGA so the file readers keep working
+            self.gpsLog.write(fix_to_gga(fix) if self.gpsLog.fmt == 'text' else None, fix)
+
+    def refuse(self, source, message, code):
+        # with a single caster a refused request ends the program like it always did,
+        # with several the source is just left alone for a while
+        sys.stderr.write(message)
+        if len(self.sources) == 1:
+            sys.exit(code)
+        return self.sourceFailed(source, self.refusedCooldown)
+
+    def sourceFailed(self, source, cooldown=None):
+        """Counts a failed probe or connection and backs off from the source, returns None."""
+        source.failures += 1
+        if cooldown is None:
+            cooldown=min(self.sourceCooldown * factor ** (source.failures - 1), self.maxSourceCooldown)
+        source.retryAt = time.monotonic() + cooldown
+        return None
+
+    def openSource(self, source):
+        """Connects and does the NTRIP handshake, returns (socket, data after the header) or None."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.ssl:
+            sock=ssl.wrap_socket(sock)
+        sock.settimeout(self.probeTimeout)
+        start=time.monotonic()
+        error_indicator = sock.connect_ex((source.caster, source.port))
+        if error_indicator!=0:
+            if self.verbose:
+                print ("Error indicator: ", error_indicator, source)
+            sock.close()
+            return self.sourceFailed(source)
+
+        found_header=False
+        extra=b""
         try:
-            while reconnectTry<=maxReconnect:
-                found_header=False
-                if self.verbose:
-                    sys.stderr.write('Connection {0} of {1}\n'.format(reconnectTry,maxReconnect))
-
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                if self.ssl:
-                    self.socket=ssl.wrap_socket(self.socket)
-
-                error_indicator = self.socket.connect_ex((self.caster, self.port))
-                if error_indicator==0:
-                    sleepTime = 1
-                    connectTime=datetime.datetime.now()
-
-                    self.socket.settimeout(10)
-                    self.socket.sendall(self.getMountPointBytes())
-                    while not found_header:
-                        casterResponse=self.socket.recv(4096) #All the data
-                        # print(casterResponse)
-                        header_lines = casterResponse.decode('utf-8').split("\r\n")
-                        
-# header_lines empty, request fail,exit while loop
-                        for line in header_lines:
-                            if line=="":
-                                if not found_header:
-                                    found_header=True
-                                    if self.verbose:
-                                        sys.stderr.write("End Of Header"+"\n")
-                            else:
-                                if self.verbose:
-                                    sys.stderr.write("Header: " + line+"\n")
-                            if self.headerOutput:
-                                self.headerFile.write(line+"\n")
-
+            sock.sendall(self.getMountPointBytes(source))
+            while not found_header:
+                casterResponse=sock.recv(4096) #All the data
+                if not casterResponse:
+                    sock.close()
+                    return self.sourceFailed(source)
+                # anything after the blank line is already correction data
+                header, sep, extra = casterResponse.partition(b"\r\n\r\n")
+                header_lines = header.decode('utf-8', errors='replace').split("\r\n")
+                if sep:
+                    header_lines.append("")
 
+# header_lines empty, request fail,exit while loop
+                for line in header_lines:
+                    if line=="":
+                        if not found_header:
+                            found_header=True
+                            if self.verbose:
+                                sys.stderr.write("End Of Header"+"\n")
+                    else:
+                        if self.verbose:
+                            sys.stderr.write("Header: " + line+"\n")
+                    if self.headerOutput:
+                        self.headerFile.write(line+"\n")
 
 #header_lines has content
-                        for line in header_lines:
-                            if line.find("SOURCETABLE")>=0:
-                                sys.stderr.write("Mount point does not exist")
-                                sys.exit(1)
-                            elif line.find("401 Unauthorized")>=0:
-                                sys.stderr.write("Unauthorized request\n")
-                                sys.exit(1)
-                            elif line.find("404 Not Found")>=0:
-                                sys.stderr.write("Mount Point does not exist\n")
-                                sys.exit(2)
-                            elif line.find("ICY 200 OK")>=0:
-                                #Request was valid
-                                self.socket.sendall(self.getGGABytes())
-                            elif line.find("HTTP/1.0 200 OK")>=0:
-                                #Request was valid
-                                self.socket.sendall(self.getGGABytes())
-                            elif line.find("HTTP/1.1 200 OK")>=0:
-                                #Request was valid
-                                self.socket.sendall(self.getGGABytes())
-
-
-
-                    data = "Initial data"
-                    while data:
-                        try:
-                            data=self.socket.recv(self.buffer)
-                            # self.out.buffer.write(data)
-                            self.stream.write(data)
-                            (raw_data, parsed_data) = self.nmr.read()
-                            if bytes("GNGGA",'ascii') in raw_data :
-                                print(raw_data)
-                                with open('../assets/raw_gps.txt', 'a') as out_file:
-                                    out_file.write(raw_data.decode('utf-8'))
-
-
-                            if self.UDP_socket:
-                                self.UDP_socket.sendto(data, ('<broadcast>', self.UDP_Port))
-#                            print datetime.datetime.now()-connectTime
-                            if maxConnectTime :
-                                if datetime.datetime.now() > connectTime+EndConnect:
-                                    if self.verbose:
-                                        sys.stderr.write("Connection Timed exceeded\n")
-                                    sys.exit(0)
-#                            self.socket.sendall(self.getGGAString())
-
-
-
-                        except socket.timeout:
-                            if self.verbose:
-                                sys.stderr.write('Connection TimedOut\n')
-                            data=False
-                        except socket.error:
+                for line in header_lines:
+                    if line.find("SOURCETABLE")>=0:
+                        sock.close()
+                        return self.refuse(source, "Mount point does not exist\n", 1)
+                    elif line.find("401 Unauthorized")>=0:
+                        sock.close()
+                        return self.refuse(source, "Unauthorized request\n", 1)
+                    elif line.find("404 Not Found")>=0:
+                        sock.close()
+                        return self.refuse(source, "Mount Point does not exist\n", 2)
+                    elif line.find("ICY 200 OK")>=0 or line.find("HTTP/1.0 200 OK")>=0 or line.find("HTTP/1.1 200 OK")>=0:
+                        #Request was valid
+                        gga=self.getGGABytes()
+                        if gga is None:
                             if self.verbose:
-                                sys.stderr.write('Connection Error\n')
-                            data=False
-
-                    if self.verbose:
-                        sys.stderr.write('Closing Connection\n')
-                    self.socket.close()
-                    self.socket=None
+                                sys.stderr.write("No GGA to send to %s, receiver has no fix\n" % source)
+                            sock.close()
+                            return self.sourceFailed(source)
+                        sock.sendall(gga)
+        except socket.error:
+            sock.close()
+            return self.sourceFailed(source)
+        source.handshakeLatency=time.monotonic()-start
+        return sock, extra
+
+    def probeSource(self, source, results):
+        """Opens a source and waits for its first correction bytes, timing both."""
+        opened = self.openSource(source)
+        if not opened:
+            return
+        sock, extra = opened
+        start=time.monotonic()
+        try:
+            if not extra:
+                extra = sock.recv(self.buffer)
+        except socket.error:
+            extra = b""
+        if not extra:
+            sock.close()
+            self.sourceFailed(source)
+            return
+        source.dataLatency=time.monotonic()-start
+        source.failures=0
+        with self.probeLock:
+            if results and results[-1] is None:
+                sock.close()  # selectSource gave up waiting for this one
+                return
+            results.append((source, sock, extra))
+
+    def selectSource(self, exclude=None):
+        """
+        Probes every usable source at the same time and keeps the connection of
+        the one with the lowest handshake + first data latency open.
+        """
+        now=time.monotonic()
+        candidates=[s for s in self.sources if s is not exclude and s.retryAt <= now]
+        if not candidates and exclude is None:
+            candidates=list(self.sources)
+        results=[]
+        threads=[threading.Thread(target=self.probeSource, args=(s, results), daemon=True) for s in candidates]
+        for t in threads:
+            t.start()
+        # connect, header, GGA and first data each wait at most probeTimeout
+        deadline=time.monotonic() + 4 * self.probeTimeout
+        for t in threads:
+            t.join(max(deadline - time.monotonic(), 0))
+        with self.probeLock:
+            results, late=list(results), results
+            late.append(None)  # probes still running close their socket when they finish
+        if not results:
+            return None
+        results.sort(key=lambda r: r[0].latency())
+        for source, sock, extra in results[1:]:
+            sock.close()
+        if self.verbose:
+            for source, sock, extra in results:
+                sys.stderr.write("Source %s: handshake %.3f s, first data %.3f s\n" % (source, source.handshakeLatency, source.dataLatency))
+        return results[0]
 
-                    if reconnectTry < maxReconnect :
-                        sys.stderr.write( "%s No Connection to NtripCaster.  Trying again in %i seconds\n" % (datetime.datetime.now(), sleepTime))
-                        time.sleep(sleepTime)
-                        sleepTime *= factor
+    def correctionAge(self, connectStart):
+        last=self.engine.rtcm_out.last
+        if last is None or last < connectStart:
+            last=connectStart
+        return time.monotonic()-last
 
-                        if sleepTime>maxReconnectTime:
-                            sleepTime=maxReconnectTime
-                    else:
+    def readData(self):
+        reconnectTry=1
+        sleepTime=1
+        reconnectTime=0
+        if self.maxConnectTime > 0 :
+            EndConnect=datetime.timedelta(seconds=self.maxConnectTime)
+        self.engine.start_nmea()
+        try:
+            if self.verbose:
+                sys.stderr.write('Connection {0} of {1}\n'.format(reconnectTry,maxReconnect))
+            current=self.selectSource()
+            while True:
+                if current is None:
+                    if reconnectTry >= maxReconnect:
                         sys.exit(1)
-
-
+                    sys.stderr.write( "%s No Connection to NtripCaster.  Trying again in %i seconds\n" % (datetime.datetime.now(), sleepTime))
+                    time.sleep(sleepTime)
+                    sleepTime *= factor
+                    if sleepTime>maxReconnectTime:
+                        sleepTime=maxReconnectTime
                     reconnectTry += 1
-                else:
-                    self.socket=None
                     if self.verbose:
-                        print ("Error indicator: ", error_indicator)
-
-                    if reconnectTry < maxReconnect :
-                        sys.stderr.write( "%s No Connection to NtripCaster.  Trying again in %i seconds\n" % (datetime.datetime.now(), sleepTime))
-                        time.sleep(sleepTime)
-                        sleepTime *= factor
-                        if sleepTime>maxReconnectTime:
-                            sleepTime=maxReconnectTime
-                    reconnectTry += 1
+                        sys.stderr.write('Connection {0} of {1}\n'.format(reconnectTry,maxReconnect))
+                    current=self.selectSource()
+                    continue
+
+                sleepTime = 1
+                source, self.socket, extra = current
+                self.source = source
+                if self.verbose:
+                    sys.stderr.write("Using %s\n" % source)
+                connectTime=datetime.datetime.now()
+                connectStart=time.monotonic()
+                self.socket.settimeout(10)
+                self.engine.start_corrections(self.socket, self.UDP_socket, self.UDP_Port, extra)
+
+                switchTo=None
+                lastStats=time.monotonic()
+                while not self.engine.corrections_done.wait(1):
+                    if self.verbose and time.monotonic()-lastStats >= self.statsInterval:
+                        sys.stderr.write(self.engine.report()+"\n")
+                        lastStats=time.monotonic()
+                    if self.maxConnectTime :
+                        if datetime.datetime.now() > connectTime+EndConnect:
+                            if self.verbose:
+                                sys.stderr.write("Connection Timed exceeded\n")
+                            sys.exit(0)
+                    if len(self.sources) > 1 and self.correctionAge(connectStart) > self.maxCorrectionAge:
+                        # corrections went stale, only let go once another source is streaming
+                        switchTo=self.selectSource(exclude=source)
+                        if switchTo:
+                            sys.stderr.write("Corrections from %s are %.1f s old, switching to %s\n" % (source, self.correctionAge(connectStart), switchTo[0]))
+                            break
+                self.engine.stop_corrections()
+                if self.verbose:
+                    sys.stderr.write(self.engine.report()+"\n")
+                    sys.stderr.write('Closing Connection\n')
+                self.socket.close()
+                self.socket=None
+
+                if switchTo:
+                    self.sourceFailed(source)
+                    current=switchTo
+                    continue
+
+                if len(self.sources) > 1:
+                    # another source may still be good, try them before backing off
+                    self.sourceFailed(source)
+                    current=self.selectSource(exclude=source)
+                    if current:
+                        continue
+                if reconnectTry >= maxReconnect:
+                    sys.exit(1)
+                current=None
 
         except KeyboardInterrupt:
             if self.socket:
                 self.socket.close()
             self.stream.close()
             sys.exit()
+        finally:
+            self.engine.stop()
+            if self.gpsLog:
+                self.gpsLog.close()
+            if self.publisher:
+                self.publisher.close()
 
 if __name__ == '__main__':
     usage="NtripClient.py [options] [caster] [port] mountpoint"
@@ -292,6 +480,20 @@ if __name__ == '__main__':
     parser.add_option("-f", "--outputFile", type="string", dest="outputFile", default=None, help="Write to this file, instead of stdout")
     parser.add_option("-m", "--maxtime", type="int", dest="maxConnectTime", default=None, help="Maximum length of the connection, in seconds")
     
+    parser.add_option("-F", "--fixSocket", type="string", dest="fixSocket", default=FIX_SOCKET, help="Publish parsed fixes on this Unix socket.  Default: %default")
+    parser.add_option("-l", "--gpsLog", type="string", dest="gpsLog", default=None, help="Also append GGA sentences to this text file")
+    parser.add_option("--serial", type="string", dest="serialPort", default="/dev/ttyAMA0", help="Serial port of the GNSS receiver.  Default: %default")
+    parser.add_option("--baud", type="int", dest="baudrate", default=115200, help="Baud rate of the GNSS receiver.  Default: %default")
+    parser.add_option("--source", type="string", action="append", dest="sources", default=[], help="Extra caster:port/mountpoint to fail over to, can be repeated")
+    parser.add_option("--maxCorrectionAge", type="float", dest="maxCorrectionAge", default=10, help="Switch source when corrections are older than this (s).  Default: %default")
+    parser.add_option("--rtcmAllow", type="string", dest="rtcmAllow", default=None, help="Comma separated RTCM message types to forward, all others are dropped")
+    parser.add_option("--rawRtcm", action="store_true", dest="rawRtcm", default=False, help="Forward caster data unframed and unchecked")
+    parser.add_option("--ubx", action="store_true", dest="ubx", default=False, help="Read UBX NAV-PVT from the receiver instead of NMEA GGA")
+    parser.add_option("--navRate", type="float", dest="navRate", default=10, help="Navigation rate in Hz for --ubx.  Default: %default")
+    parser.add_option("--logFormat", type="choice", choices=["text", "binary"], dest="logFormat", default="text", help="Format of the GGA log, text or binary.  Default: %default")
+    parser.add_option("--logFlush", type="float", dest="logFlushInterval", default=5.0, help="Seconds between GGA log flushes.  Default: %default")
+    parser.add_option("--logMaxBytes", type="int", dest="logMaxBytes", default=None, help="Rotate the GGA log once it reaches this size")
+    parser.add_option("--logRotateTime", type="float", dest="logRotateTime", default=None, help="Rotate the GGA log after this many seconds")
     parser.add_option("--Header", action="store_true", dest="headerOutput", default=False, help="Write headers to stderr")
     parser.add_option("--HeaderFile", type="string", dest="headerFile", default=None, help="Write headers to this file, instead of stderr.")
     (options, args) = parser.parse_args()
@@ -345,6 +547,26 @@ if __name__ == '__main__':
 
     ntripArgs['verbose']=options.verbose
     ntripArgs['headerOutput']=options.headerOutput
+    ntripArgs['fixSocket']=options.fixSocket
+    ntripArgs['maxConnectTime']=options.maxConnectTime or 0
+    ntripArgs['gpsLog']=options.gpsLog
+    ntripArgs['sources']=[]
+    for extra in options.sources:
+        address, extraMount = extra.split("/", 1)
+        extraCaster, extraPort = address.rsplit(":", 1)
+        ntripArgs['sources'].append((extraCaster, int(extraPort), extraMount))
+    ntripArgs['maxCorrectionAge']=options.maxCorrectionAge
+    ntripArgs['rtcmFilter']=not options.rawRtcm
+    if options.rtcmAllow:
+        ntripArgs['rtcmAllow']=[int(t) for t in options.rtcmAllow.split(",")]
+    ntripArgs['serialPort']=options.serialPort
+    ntripArgs['baudrate']=options.baudrate
+    ntripArgs['ubx']=options.ubx
+    ntripArgs['navRate']=options.navRate
+    ntripArgs['logFormat']=options.logFormat
+    ntripArgs['logFlushInterval']=options.logFlushInterval
+    ntripArgs['logMaxBytes']=options.logMaxBytes
+    ntripArgs['logRotateTime']=options.logRotateTime
 
     if options.UDP:
          ntripArgs['UDP_Port']=int(options.UDP)
@@ -357,6 +579,8 @@ if __name__ == '__main__':
         print ("Port: " + str(ntripArgs['port']))
         print ("User: " + ntripArgs['user'])
         print ("mountpoint: " +ntripArgs['mountpoint'])
+        for extra in ntripArgs['sources']:
+            print ("Fallback: %s:%i/%s" % extra)
         print ("Reconnects: " + str(maxReconnect))
         print ("Max Connect Time: " + str (maxConnectTime))
         if ntripArgs['V2']:
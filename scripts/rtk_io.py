@@ -0,0 +1,265 @@
+import socket
+import sys
+import time
+from collections import deque
+from queue import Queue, Empty, Full
+from threading import Thread, Event, Lock
+
+from nmea import fix_to_gga
+from ubx import NAV_PVT_FRAME_LEN
+
+
+class DirectionStats:
+    """
+    Byte/message counters for one direction of the RTK link. rate() is
+    over the last `window` seconds only, so a stalled stream shows up as
+    one instead of living off its lifetime average.
+    """
+    def __init__(self, window=10.0):
+        self.lock = Lock()
+        self.bytes = 0
+        self.messages = 0
+        self.dropped = 0
+        self.window = window
+        self.start = time.monotonic()
+        self.last = None  # monotonic time of the last message
+        self.recent = deque()  # (monotonic time, bytes) within the window
+        self.recent_bytes = 0
+
+    def add(self, n):
+        with self.lock:
+            now = time.monotonic()
+            self.bytes += n
+            self.messages += 1
+            self.last = now
+            self.recent.append((now, n))
+            self.recent_bytes += n
+            self._expire(now)
+
+    def _expire(self, now):
+        while self.recent and self.recent[0][0] < now - self.window:
+            self.recent_bytes -= self.recent.popleft()[1]
+
+    def drop(self):
+        with self.lock:
+            self.dropped += 1
+
+    def rate(self):
+        with self.lock:
+            now = time.monotonic()
+            self._expire(now)
+            elapsed = min(now - self.start, self.window)
+            return self.recent_bytes / elapsed if elapsed > 0 else 0.0
+
+    def age(self):
+        return time.monotonic() - self.last if self.last else None
+
+
+class NtripIOEngine:
+    """
+    Runs the two directions of the RTK link independently:
+
+      caster -> serial : a socket reader thread queues RTCM frames (or raw
+                         chunks without a framer) and a writer thread
+                         drains them to the receiver UART
+      serial -> NMEA   : a reader thread parses NMEA and hands GGA on
+                         (or, with a UBXReader, decodes NAV-PVT fixes)
+
+    so a slow or stalled serial read never holds back corrections, and the
+    caster socket never holds back fixes. The NMEA side runs for the whole
+    process, the correction side is started again for every connection,
+    with a queue of its own: a writer of the last connection still stuck in
+    a serial write can't take the new connection's frames (or leave it its
+    end marker), and only one writer at a time is on the UART.
+    """
+    def __init__(self, stream, nmr, on_fix, buffer=50, queue_size=256, verbose=False,
+                 framer=None, ubx=None, on_pvt=None):
+        self.stream = stream
+        self.nmr = nmr
+        self.on_fix = on_fix  # callable(raw_data, parsed_data, rx_time) for every GGA
+        self.buffer = buffer
+        self.verbose = verbose
+        # with a framer only whole, valid, wanted RTCM frames reach the receiver
+        self.framer = framer
+        # in UBX mode the serial side is binary NAV-PVT, on_pvt(fix) gets every solution
+        self.ubx = ubx
+        self.on_pvt = on_pvt
+
+        self.queue_size = queue_size
+        self.rtcm_queue = Queue(maxsize=queue_size)  # the current connection's
+        self.write_lock = Lock()
+        self.max_queue_depth = 0
+        self.rtcm_in = DirectionStats()   # bytes received from the caster
+        self.rtcm_out = DirectionStats()  # bytes written to the receiver
+        self.nmea = DirectionStats()      # sentences read from the receiver
+
+        self.latest_gga = None
+        self.latest_pvt = None
+        self.gga_ready = Event()
+
+        self.running = True
+        self.socket = None
+        self.corrections_done = Event()
+        self.corrections_done.set()
+        self.nmea_thread = None
+        self.recv_thread = None
+        self.write_thread = None
+
+    def start_nmea(self):
+        if self.nmea_thread is None:
+            self.nmea_thread = Thread(target=self._ubx_loop if self.ubx else self._nmea_loop, daemon=True)
+            self.nmea_thread.start()
+
+    def start_corrections(self, sock, udp_socket=None, udp_port=None, initial=b''):
+        """initial holds correction bytes that were already read with the handshake."""
+        self.socket = sock
+        if self.framer:
+            self.framer.reset()  # a partial frame from the last connection is useless
+        self.corrections_done.clear()
+        self.rtcm_queue = queue = Queue(maxsize=self.queue_size)
+        self.recv_thread = Thread(target=self._recv_loop, args=(queue, sock, udp_socket, udp_port, initial),
+                                  daemon=True)
+        self.write_thread = Thread(target=self._write_loop, args=(queue,), daemon=True)
+        self.write_thread.start()
+        self.recv_thread.start()
+
+    def stop_corrections(self):
+        if self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.recv_thread:
+            self.recv_thread.join(timeout=2)
+        # a writer stuck on the UART gets to its end marker without sending the stale frames first
+        self._clear(self.rtcm_queue)
+        self._queue_rtcm(self.rtcm_queue, None)
+        if self.write_thread:
+            self.write_thread.join(timeout=2)
+        self.recv_thread = None
+        self.write_thread = None
+        self.socket = None
+
+    def stop(self, timeout=4):
+        """Stops both sides; the serial reader is joined so nothing logs a fix after this returns."""
+        self.running = False
+        self.stop_corrections()
+        if self.nmea_thread:
+            # a blocked serial read returns within the port timeout (3 s in rtk_coords.py)
+            self.nmea_thread.join(timeout)
+            self.nmea_thread = None
+
+    def wait_gga(self, timeout=None):
+        """Returns the latest raw GGA sentence, waiting for the first one if needed."""
+        self.gga_ready.wait(timeout)
+        if self.ubx and self.latest_pvt:
+            return fix_to_gga(self.latest_pvt)  # only the caster needs GGA text, build it on demand
+        return self.latest_gga
+
+    def _queue_rtcm(self, queue, data):
+        try:
+            queue.put_nowait(data)
+        except Full:
+            # serial link is behind, old corrections are worth less than new ones
+            try:
+                queue.get_nowait()
+                self.rtcm_out.drop()
+            except Empty:
+                pass
+            queue.put_nowait(data)
+        self.max_queue_depth = max(self.max_queue_depth, queue.qsize())
+
+    def _clear(self, queue):
+        while True:
+            try:
+                if queue.get_nowait() is not None:
+                    self.rtcm_out.drop()
+            except Empty:
+                return
+
+    def _recv_loop(self, queue, sock, udp_socket, udp_port, initial):
+        try:
+            data = initial
+            while self.running:
+                if data:
+                    self.rtcm_in.add(len(data))
+                    if self.framer:
+                        for frame in self.framer.feed(data):
+                            self._queue_rtcm(queue, frame)
+                    else:
+                        self._queue_rtcm(queue, data)
+                    if udp_socket:
+                        udp_socket.sendto(data, ('<broadcast>', udp_port))
+                data = sock.recv(self.buffer)
+                if not data:
+                    break
+        except socket.timeout:
+            if self.verbose:
+                sys.stderr.write('Connection TimedOut\n')
+        except socket.error:
+            if self.verbose:
+                sys.stderr.write('Connection Error\n')
+        finally:
+            self._queue_rtcm(queue, None)  # tells the writer to finish
+            self.corrections_done.set()
+
+    def _write_loop(self, queue):
+        while True:
+            data = queue.get()
+            if data is None:
+                return
+            with self.write_lock:
+                self.stream.write(data)
+            self.rtcm_out.add(len(data))
+
+    def _nmea_loop(self):
+        while self.running:
+            try:
+                (raw_data, parsed_data) = self.nmr.read()
+                rx_time = time.monotonic()
+            except Exception as e:
+                if self.verbose:
+                    sys.stderr.write("NMEA read error: %s\n" % e)
+                time.sleep(0.1)  # don't spin if the port went away
+                continue
+            if raw_data is None:
+                continue  # serial timeout
+            self.nmea.add(len(raw_data))
+            if bytes("GNGGA", 'ascii') in raw_data:
+                self.latest_gga = raw_data
+                self.gga_ready.set()
+                self.on_fix(raw_data, parsed_data, rx_time)
+
+    def _ubx_loop(self):
+        while self.running:
+            try:
+                data = self.stream.read(self.stream.in_waiting or 1)
+            except Exception as e:
+                if self.verbose:
+                    sys.stderr.write("UBX read error: %s\n" % e)
+                time.sleep(0.1)
+                continue
+            if not data:
+                continue  # serial timeout
+            rx_time = time.monotonic()
+            for fix in self.ubx.feed(data):
+                fix = fix._replace(rx_time=rx_time)
+                self.nmea.add(NAV_PVT_FRAME_LEN)
+                if fix.quality == 0:
+                    continue
+                self.latest_pvt = fix
+                self.gga_ready.set()
+                self.on_pvt(fix)
+
+    def report(self):
+        if self.framer:
+            return self._report() + "\n" + self.framer.report()
+        return self._report()
+
+    def _report(self):
+        return ("caster->serial: %.0f B/s in, %.0f B/s out, queue %i (max %i), dropped %i | "
+                "serial->%s: %.0f B/s, %i %s" % (
+                    self.rtcm_in.rate(), self.rtcm_out.rate(),
+                    self.rtcm_queue.qsize(), self.max_queue_depth, self.rtcm_out.dropped,
+                    'ubx' if self.ubx else 'nmea', self.nmea.rate(), self.nmea.messages,
+                    'solutions' if self.ubx else 'sentences'))
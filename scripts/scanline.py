@@ -0,0 +1,111 @@
+import numpy as np
+
+
+def polygon_edges(rings):
+    """
+    All edges of one or more rings (outer boundary and holes) as an (E, 4)
+    array of x1, y1, x2, y2. Rings are (N, 2) point arrays, closed or not.
+    """
+    edges = []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)
+        if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+            ring = ring[:-1]
+        if len(ring) < 3:
+            continue
+        edges.append(np.hstack([ring, np.roll(ring, -1, axis=0)]))
+    return np.vstack(edges) if edges else np.empty((0, 4))
+
+
+def stripe_positions(minx, maxx, step):
+    """Same x values as stepping x from minx by step while x <= maxx."""
+    n = int(np.floor((maxx - minx) / step + 1e-9)) + 1
+    return minx + step * np.arange(max(n, 0))
+
+
+def _intervals(x, x1, y1, slope, crosses):
+    """Inside intervals of every stripe in x for the given edge crossings."""
+    y = np.where(crosses, y1 + (x - x1) * slope, np.inf)
+    y.sort(axis=1)
+    # even-odd rule: consecutive crossings pair up into inside intervals
+    pairs = crosses.sum(axis=1) // 2
+    row = np.repeat(np.arange(len(x)), pairs)
+    k = np.arange(pairs.sum()) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+    return row, y[row, 2 * k], y[row, 2 * k + 1]
+
+
+def _merge(row, lo, hi):
+    """Sorts intervals by stripe and y and merges the ones that overlap or touch."""
+    keep = hi - lo > 1e-9
+    row, lo, hi = row[keep], lo[keep], hi[keep]
+    if not len(row):
+        return row, lo, hi
+    order = np.lexsort((lo, row))
+    row, lo, hi = row[order], lo[order], hi[order]
+    # running max of hi within each stripe, offset per stripe so one accumulate covers all
+    span = hi.max() - lo.min() + 1.0
+    run = np.maximum.accumulate(hi + row * span) - row * span
+    new = np.ones(len(row), dtype=bool)
+    new[1:] = (row[1:] != row[:-1]) | (lo[1:] > run[:-1])
+    starts = np.flatnonzero(new)
+    return row[starts], lo[starts], np.maximum.reduceat(hi, starts)
+
+
+def scanline_segments(rings, xs, alternate=True, max_cells=4000000):
+    """
+    Intersects the vertical lines x = xs with the polygon given by rings in
+    one batched NumPy operation (stripes are processed in chunks of
+    max_cells stripe/edge pairs to bound memory).
+
+    Returns (segments, stripe): segments is an (M, 2, 2) array of start and
+    end points, stripe the index into xs each segment came from. Segments
+    come out stripe by stripe; with alternate the odd stripes run top to
+    bottom like the boustrophedon in pathing.py, and a stripe that the
+    polygon cuts into several pieces yields them in travel order.
+    """
+    edges = polygon_edges(rings)
+    xs = np.asarray(xs, dtype=float)
+    if not len(edges) or not len(xs):
+        return np.empty((0, 2, 2)), np.empty(0, dtype=int)
+
+    x1, y1, x2, y2 = edges.T
+    dx = x2 - x1
+    slope = np.divide(y2 - y1, dx, out=np.zeros_like(dx), where=dx != 0)
+
+    segments = []
+    stripes = []
+    rows = max(1, max_cells // len(edges))
+    for start in range(0, len(xs), rows):
+        x = xs[start:start + rows, None]
+        # half open so a stripe through a vertex counts the crossing once
+        row, lo, hi = _intervals(x, x1, y1, slope, (x1 <= x) & (x < x2) | (x2 <= x) & (x < x1))
+        on_vertex = np.flatnonzero((x == x1).any(axis=1))
+        if len(on_vertex):
+            # a stripe running along a vertical edge on the right side of the lawn is
+            # only seen by the mirrored rule, take the union of both
+            xv = x[on_vertex]
+            row_v, lo_v, hi_v = _intervals(xv, x1, y1, slope, (x1 < xv) & (xv <= x2) | (x2 < xv) & (xv <= x1))
+            row = np.concatenate([row, on_vertex[row_v]])
+            lo = np.concatenate([lo, lo_v])
+            hi = np.concatenate([hi, hi_v])
+        row, lo, hi = _merge(row, lo, hi)
+        if not len(row):
+            continue
+        k = np.arange(len(row)) - np.searchsorted(row, row)  # piece number within the stripe
+        index = start + row
+        seg = np.empty((len(row), 2, 2))
+        seg[:, :, 0] = xs[index][:, None]
+        seg[:, 0, 1] = lo
+        seg[:, 1, 1] = hi
+        if alternate:
+            down = index % 2 == 1
+            seg[down] = seg[down, ::-1]
+            # pieces of a downward stripe are visited from the top
+            order = np.lexsort((np.where(down, -k, k), index))
+            seg, index = seg[order], index[order]
+        segments.append(seg)
+        stripes.append(index)
+
+    if not segments:
+        return np.empty((0, 2, 2)), np.empty(0, dtype=int)
+    return np.concatenate(segments), np.concatenate(stripes)
@@ -1,72 +1,67 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from shapely.geometry import Polygon, LineString, MultiLineString
+from shapely.geometry import LineString, Polygon
 from sklearn.decomposition import PCA
-import math
-
-def meters_to_degrees(center_lat):
-    meter_to_deg_lat = 1 / 111320
-    meter_to_deg_lon = 1 / (40075000 * np.cos(np.radians(center_lat)) / 360)
-    return meter_to_deg_lat, meter_to_deg_lon
+from geodesy import LocalFrame
+from scanline import scanline_segments, stripe_positions
+from turns import stripe_turns, resample, velocity_profile, drive_time
 
 def generate_custom_polygon(center_lat, center_lon):
     # Creates a non-convex polygon to simulate an irregular lawn shape
-    meter_to_deg_lat, meter_to_deg_lon = meters_to_degrees(center_lat)
-    lat_offset = meter_to_deg_lat * np.array([0, 5, 10, 10, 5, 0, 0])
-    lon_offset = meter_to_deg_lon * np.array([0, 0, 2, 8, 10, 10, 0])
-    lats = center_lat + lat_offset
-    lons = center_lon + lon_offset
-    return np.column_stack((lons, lats))
+    frame = LocalFrame(center_lon, center_lat)
+    north = np.array([0, 5, 10, 10, 5, 0, 0])
+    east = np.array([0, 0, 2, 8, 10, 10, 0])
+    return frame.to_lonlat(np.column_stack((east, north)))
 
 center_lat = 40.5216
 center_lon = -74.4604
 boundary = generate_custom_polygon(center_lat, center_lon)
 
+# Work in metres on the lawn's tangent plane, like pathing.py
+frame = LocalFrame.from_points(boundary)
+boundary_xy = frame.to_local(boundary)
+
 # Apply PCA
 pca = PCA(n_components=2)
-pca.fit(boundary)
-rotated = pca.transform(boundary)
+pca.fit(boundary_xy)
+rotated = pca.transform(boundary_xy)
 polygon_rotated = Polygon(rotated)
 
 # Create vertical zigzag in rotated space
-avg_lat = np.mean(boundary[:, 1])
-meter_to_deg_lon = 1 / (40075000 * np.cos(np.radians(avg_lat)) / 360)
 spacing_meters = 0.5
-step = spacing_meters * np.linalg.norm(pca.components_[0]) * meter_to_deg_lon
+step = spacing_meters
 
 # Simulate start in bottom-left (minimum x and y)
 minx, miny, maxx, maxy = polygon_rotated.bounds
-x = minx
-lines = []
-direction = True
-
-while x <= maxx:
-    line = LineString([(x, miny), (x, maxy)]) if direction else LineString([(x, maxy), (x, miny)])
-    clipped = line.intersection(polygon_rotated)
-    if not clipped.is_empty:
-        if isinstance(clipped, LineString):
-            lines.append(list(clipped.coords))
-        elif isinstance(clipped, MultiLineString):
-            for subline in clipped.geoms:
-                lines.append(list(subline.coords))
-    x += step
-    direction = not direction
+segments, _ = scanline_segments([rotated], stripe_positions(minx, maxx, step))
 
 # Inverse transform path
-rotated_path = [pt for segment in lines for pt in segment]
-path = pca.inverse_transform(rotated_path)
-path_np = np.array(path)
+rotated_path = segments.reshape(-1, 2)
+zigzag_np = pca.inverse_transform(rotated_path)
+segments_xy = zigzag_np.reshape(-1, 2, 2)
+
+# Time to mow: hard reversals, stopping and pivoting at every stripe end (MotorDriver.turn_left/right
+# pivot on one wheel at 0.1 duty, about 25 deg/s), against half circle turns with a velocity profile
+polygon = Polygon(boundary_xy)
+path_np = resample(stripe_turns(segments_xy, spacing_meters / 2, spacing_meters, polygon))
+for name, path in (("Zigzag", resample(zigzag_np)), ("Smooth turns", path_np)):
+    speeds = velocity_profile(path)
+    covered = LineString(path).buffer(spacing_meters / 2).intersection(polygon).area / polygon.area
+    print(f"{name}: {drive_time(path, speeds) / 60:.1f} min to mow, {LineString(path).length:.0f} m driven, "
+          f"{covered * 100:.1f}% covered")
 
 # Animate
 fig, ax = plt.subplots(figsize=(10, 8))
-ax.plot(boundary[:, 0], boundary[:, 1], 'k--', label='Lawn Boundary')
-ax.plot(path_np[:, 0], path_np[:, 1], 'b-', label='Zigzag Path')
+ax.plot(boundary_xy[:, 0], boundary_xy[:, 1], 'k--', label='Lawn Boundary')
+ax.plot(path_np[:, 0], path_np[:, 1], 'b-', label='Path with Turns')
 robot_dot, = ax.plot([], [], 'ro', label='Robot', markersize=8)
+# the resampled path has a point every 10 cm, the robot jumps ~2 m per frame so the gif stays short
+frames_np = np.vstack((path_np[::max(len(path_np) // 100, 1)], path_np[-1:]))
 
 ax.set_title("Animated Zigzag Path on Custom Lawn")
-ax.set_xlabel("Longitude")
-ax.set_ylabel("Latitude")
+ax.set_xlabel("East (m)")
+ax.set_ylabel("North (m)")
 ax.legend()
 ax.grid(True)
 ax.set_aspect('equal', adjustable='box')
@@ -76,11 +71,11 @@ def init():
     return robot_dot,
 
 def update(frame):
-    if frame < len(path_np):
-        robot_dot.set_data([path_np[frame][0]], [path_np[frame][1]])
+    if frame < len(frames_np):
+        robot_dot.set_data([frames_np[frame][0]], [frames_np[frame][1]])
     return robot_dot,
 
-ani = animation.FuncAnimation(fig, update, frames=len(path_np), init_func=init,
+ani = animation.FuncAnimation(fig, update, frames=len(frames_np), init_func=init,
                               interval=150, blit=True, repeat=False)
 ani.save("../assets/custom_zigzag_sim.gif", writer="pillow", fps=10)
 plt.show()
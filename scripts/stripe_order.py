@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def transit_length(segments, start=None):
+    """Distance driven between segments (blade idle), from start if given."""
+    if not len(segments):
+        return 0.0
+    gaps = np.hypot(*(segments[1:, 0] - segments[:-1, 1]).T).sum()
+    if start is not None:
+        gaps += np.hypot(*(segments[0, 0] - np.asarray(start, dtype=float)))
+    return float(gaps)
+
+
+def nearest_neighbor(segments, start):
+    """
+    Greedy tour: from the current position always mow the closest unvisited
+    segment next, entering it from whichever end is nearer.
+    Returns the order and a flag per visited segment that it is run backwards.
+    """
+    n = len(segments)
+    visited = np.zeros(n, dtype=bool)
+    order = np.empty(n, dtype=int)
+    flipped = np.empty(n, dtype=bool)
+    pos = np.asarray(start, dtype=float)
+
+    def build(remaining):
+        # endpoint j < len(remaining) is the start of a segment, the rest are ends
+        return cKDTree(np.vstack([segments[remaining, 0], segments[remaining, 1]])), remaining
+
+    tree, remaining = build(np.arange(n))
+    for step in range(n):
+        k = 8
+        while True:
+            m = len(remaining)
+            _, idx = tree.query(pos, k=min(k, 2 * m))
+            idx = np.atleast_1d(idx)
+            idx = idx[idx < 2 * m]
+            seg = remaining[idx % m]
+            free = np.flatnonzero(~visited[seg])
+            if len(free):
+                break
+            if k >= 64:
+                # the neighbourhood is used up, search only what is left from now on
+                tree, remaining = build(np.flatnonzero(~visited))
+                k = 8
+            else:
+                k *= 4
+        i = seg[free[0]]
+        flip = idx[free[0]] >= m
+        order[step] = i
+        flipped[step] = flip
+        visited[i] = True
+        pos = segments[i, 0] if flip else segments[i, 1]
+    return order, flipped
+
+
+def two_opt(tour, start, window=64, time_budget=2.0, ids=None):
+    """
+    Improves an oriented tour ((M, 2, 2) segments in driving order) with
+    2-opt moves: reversing a run of segments (and the direction of each)
+    whenever that shortens the two transits around it. Only runs up to
+    `window` segments long are tried, all of them for one i at a time in
+    NumPy, until nothing improves or time_budget seconds have passed.
+    ids (one int per segment, negative when it is run backwards) are
+    permuted and flipped along with the tour, both are returned.
+    """
+    tour = tour.copy()
+    ids = np.arange(1, len(tour) + 1) if ids is None else ids.copy()
+    n = len(tour)
+    start = np.asarray(start, dtype=float)
+    deadline = time.monotonic() + time_budget
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(n):
+            if time.monotonic() >= deadline:
+                break
+            prev_end = tour[i - 1, 1] if i > 0 else start
+            j = np.arange(i, min(i + window, n))
+            end_j = tour[j, 1]
+            start_i = tour[i, 0]
+            has_next = j + 1 < n
+            next_start = tour[np.minimum(j + 1, n - 1), 0]
+            # before: prev_end -> start_i ... end_j -> next_start
+            # after:  prev_end -> end_j ... start_i -> next_start (run reversed)
+            before = np.hypot(*(start_i - prev_end)) + np.where(has_next, np.hypot(*(next_start - end_j).T), 0.0)
+            after = np.hypot(*(end_j - prev_end).T) + np.where(has_next, np.hypot(*(next_start - start_i).T), 0.0)
+            gain = before - after
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-6:
+                k = j[best]
+                tour[i:k + 1] = tour[i:k + 1][::-1, ::-1]
+                ids[i:k + 1] = -ids[i:k + 1][::-1]
+                improved = True
+    return tour, ids
+
+
+def order_tour(segments, start, window=64, time_budget=2.0):
+    """
+    Orders mowing segments ((M, 2, 2) start/end points, local metres) to
+    keep the blade-idle driving between them short, starting at the
+    robot's position: nearest neighbour, then 2-opt.
+    Returns the visiting order, a flag per visit that the segment is run
+    backwards, and the transit length before (given order) and after.
+    """
+    segments = np.asarray(segments, dtype=float)
+    n = len(segments)
+    before = transit_length(segments, start)
+    if n < 2:
+        return np.arange(n), np.zeros(n, dtype=bool), before, before
+    order, flipped = nearest_neighbor(segments, start)
+    tour = segments[order]
+    tour[flipped] = tour[flipped, ::-1]
+    tour, ids = two_opt(tour, start, window, time_budget, np.where(flipped, -(order + 1), order + 1))
+    after = transit_length(tour, start)
+    if after > before:
+        # the given order was already better
+        return np.arange(n), np.zeros(n, dtype=bool), before, before
+    return np.abs(ids) - 1, ids < 0, before, after
+
+
+def order_segments(segments, start, window=64, time_budget=2.0):
+    """Same as order_tour but returns the oriented segments, and the transit before and after."""
+    segments = np.asarray(segments, dtype=float)
+    order, flipped, before, after = order_tour(segments, start, window, time_budget)
+    tour = segments[order]
+    tour[flipped] = tour[flipped, ::-1]
+    return tour, before, after
@@ -0,0 +1,105 @@
+import os
+import time
+from collections import namedtuple
+from multiprocessing import Pool
+from threading import Event
+
+import numpy as np
+
+from scanline import scanline_segments, stripe_positions
+from stripe_order import transit_length
+
+# angle is the direction the sweep steps across the lawn in degrees (the
+# stripes run perpendicular to it), time the estimated mowing time in seconds
+SweepPlan = namedtuple('SweepPlan', ['angle', 'segments', 'turns', 'mow_length', 'transit', 'time'])
+
+
+def rotation(angle):
+    a = np.radians(angle)
+    return np.array([[np.cos(a), -np.sin(a)], [np.sin(a), np.cos(a)]])
+
+
+def pca_angle(points):
+    """Sweep angle of the old planner: stepping along the first principal axis."""
+    points = np.asarray(points, dtype=float)
+    centred = points - points.mean(axis=0)
+    _, _, vt = np.linalg.svd(centred, full_matrices=False)
+    return float(np.degrees(np.arctan2(vt[0, 1], vt[0, 0])) % 180.0)
+
+
+def plan_sweep(rings, angle, spacing, speed=0.5, turn_time=3.0):
+    """
+    Zigzag over the polygon (rings in local metres) stepping along `angle`,
+    scored by the time it takes: mowing and transit at `speed` m/s plus
+    turn_time seconds for every turn.
+    """
+    r = rotation(angle)
+    rotated = [np.asarray(ring, dtype=float) @ r for ring in rings]  # x is now along angle
+    xs = rotated[0][:, 0]
+    segments, _ = scanline_segments(rotated, stripe_positions(xs.min(), xs.max(), spacing))
+    if len(segments):
+        segments = segments @ r.T
+    mow = float(np.hypot(*(segments[:, 1] - segments[:, 0]).T).sum()) if len(segments) else 0.0
+    transit = transit_length(segments)
+    turns = max(len(segments) - 1, 0)
+    return SweepPlan(angle, segments, turns, mow, transit, (mow + transit) / speed + turns * turn_time)
+
+
+def _score(args):
+    rings, angle, spacing, speed, turn_time = args
+    plan = plan_sweep(rings, angle, spacing, speed, turn_time)
+    return plan._replace(segments=None)  # send back the score only, not the geometry
+
+
+def search_sweep_angles(rings, spacing, angles=None, step=5.0, workers=None, time_budget=5.0,
+                        speed=0.5, turn_time=3.0, verbose=True):
+    """
+    Evaluates candidate sweep angles in a process pool and returns the
+    fastest SweepPlan. The PCA angle is always scored first in this process
+    so there is a plan even if the time budget runs out; at the deadline the
+    pool is terminated, candidates still running are dropped instead of
+    keeping every core busy while the robot drives.
+    """
+    rings = [np.asarray(ring, dtype=float) for ring in rings]
+    start = time.monotonic()
+    best = plan_sweep(rings, pca_angle(rings[0]), spacing, speed, turn_time)
+    baseline = best
+    if angles is None:
+        angles = np.arange(0.0, 180.0, step)
+    workers = workers or min(os.cpu_count() or 1, 4)
+    jobs = [(rings, float(a), spacing, speed, turn_time) for a in angles]
+
+    scored = []
+    if workers > 1:
+        finished = Event()
+        results = []
+
+        def collect(result):
+            # runs on the pool's result thread, errors count as finished too
+            results.append(result)
+            if len(results) == len(jobs):
+                finished.set()
+
+        pool = Pool(workers)
+        try:
+            for job in jobs:
+                pool.apply_async(_score, (job,), callback=collect, error_callback=collect)
+            finished.wait(max(time_budget - (time.monotonic() - start), 0))
+        finally:
+            pool.terminate()
+            pool.join()
+        scored = [r for r in list(results) if isinstance(r, SweepPlan)]
+    else:
+        for job in jobs:
+            if time.monotonic() - start > time_budget:
+                break
+            scored.append(_score(job))
+
+    fastest = min(scored, key=lambda p: p.time, default=None)
+    if fastest is not None and fastest.time < best.time:
+        best = plan_sweep(rings, fastest.angle, spacing, speed, turn_time)
+    if verbose:
+        print(f"Sweep search: {len(scored)}/{len(jobs)} angles in {time.monotonic() - start:.2f} s, "
+              f"best {best.angle:.0f} deg ({best.turns} turns, {best.time / 60:.1f} min) "
+              f"vs PCA {baseline.angle:.0f} deg ({baseline.turns} turns, {baseline.time / 60:.1f} min)")
+    return best
@@ -0,0 +1,195 @@
+import math
+import os
+import sys
+import time
+import urllib.request
+from threading import Lock
+
+import numpy as np
+
+from lawn_map import load_lawn_map
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "assets")
+TILE_DIR = os.path.join(ASSETS_DIR, "tiles")
+VENDOR_DIR = os.path.join(ASSETS_DIR, "live_map", "vendor")
+
+TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+TILE_MAX_ZOOM = 19  # deepest level OSM renders, Leaflet scales these up beyond it
+LEAFLET_URL = "https://unpkg.com/leaflet@1.9.4/dist/"
+LEAFLET_FILES = ("leaflet.js", "leaflet.css", "images/marker-icon.png", "images/marker-icon-2x.png",
+                 "images/marker-shadow.png", "images/layers.png", "images/layers-2x.png")
+# the OSM tile policy asks for an identifying User-Agent
+USER_AGENT = "GreenKeeper-Automower/1.0 (lawn robot, offline tile cache)"
+
+
+def lonlat_to_tile(lon, lat, zoom):
+    """Slippy map tile (x, y) containing the point at zoom."""
+    n = 2 ** zoom
+    lat = np.clip(lat, -85.0511, 85.0511)
+    x = (np.asarray(lon) + 180.0) / 360.0 * n
+    y = (1.0 - np.arcsinh(np.tan(np.radians(lat))) / math.pi) / 2.0 * n
+    return np.clip(np.floor(x), 0, n - 1).astype(int), np.clip(np.floor(y), 0, n - 1).astype(int)
+
+
+def tiles_for_bounds(min_lon, min_lat, max_lon, max_lat, zooms):
+    """Every (z, x, y) tile covering the lon/lat box at each zoom level."""
+    tiles = []
+    for z in zooms:
+        x0, y0 = lonlat_to_tile(min_lon, max_lat, z)  # tile y grows southwards
+        x1, y1 = lonlat_to_tile(max_lon, min_lat, z)
+        tiles += [(z, x, y) for x in range(int(x0), int(x1) + 1) for y in range(int(y0), int(y1) + 1)]
+    return tiles
+
+
+def map_tiles(map_file, min_zoom=15, max_zoom=TILE_MAX_ZOOM, margin=50.0):
+    """The tile pyramid over a map file's boundary, padded by margin metres."""
+    lawn = load_lawn_map(map_file)
+    points = np.array(lawn.boundary + [p for ring in lawn.holes + lawn.exclusions for p in ring])
+    (min_lon, min_lat), (max_lon, max_lat) = points.min(axis=0), points.max(axis=0)
+    dlat = margin / 111320.0
+    dlon = dlat / max(math.cos(math.radians((min_lat + max_lat) / 2)), 1e-6)
+    return tiles_for_bounds(min_lon - dlon, min_lat - dlat, max_lon + dlon, max_lat + dlat,
+                            range(min_zoom, max_zoom + 1))
+
+
+def download(url, timeout=10.0):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+class TileCache:
+    """
+    Map tiles on disk as <directory>/<z>/<x>/<y>.png. A tile that is not
+    there yet is downloaded once when online and kept; every read marks it
+    as recently used and once the tiles take more than max_bytes the least
+    recently used ones are removed, like the path cache. After prefetch()
+    the live map needs no connection at all.
+    """
+    def __init__(self, directory=TILE_DIR, url=TILE_URL, max_bytes=256 * 1024 * 1024, offline=False):
+        self.directory = directory
+        self.url = url
+        self.max_bytes = max_bytes
+        self.offline = offline
+        os.makedirs(self.directory, exist_ok=True)
+        self.total = sum(os.path.getsize(path) for path in self.entries())
+        self.failed = {}  # url -> time of the last failed download, not retried for a while
+        self.lock = Lock()  # the live map server fetches tiles from several threads
+
+    def _path(self, z, x, y):
+        return os.path.join(self.directory, str(z), str(x), "%i.png" % y)
+
+    def get(self, z, x, y):
+        """The tile's PNG bytes, downloaded if needed; None when not cached and offline."""
+        path = self._path(z, x, y)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+            return data
+        except OSError:
+            pass
+        if self.offline or z > TILE_MAX_ZOOM:
+            return None
+        url = self.url.format(z=z, x=x, y=y)
+        if time.monotonic() - self.failed.get(url, -math.inf) < 60:
+            return None
+        try:
+            data = download(url)
+        except OSError as e:  # URLError is one too
+            self.failed[url] = time.monotonic()
+            print(f"Tile {z}/{x}/{y} not available: {e}")
+            return None
+        self.put(z, x, y, data)
+        return data
+
+    def has(self, z, x, y):
+        return os.path.exists(self._path(z, x, y))
+
+    def put(self, z, x, y, data):
+        path = self._path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock:
+            if os.path.exists(path):
+                self.total -= os.path.getsize(path)
+            tmp = path + ".tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self.total += len(data)
+            if self.max_bytes and self.total > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        return [os.path.join(root, f) for root, _, files in os.walk(self.directory)
+                for f in files if f.endswith('.png')]
+
+    def evict(self):
+        # down to 90% so this does not run again on the next tile
+        entries = sorted(self.entries(), key=os.path.getmtime, reverse=True)
+        total = 0
+        for entry in entries:
+            size = os.path.getsize(entry)
+            if total + size > 0.9 * self.max_bytes:
+                os.remove(entry)
+            else:
+                total += size
+        self.total = total
+
+    def prefetch(self, tiles, delay=0.1):
+        """Downloads the missing tiles, politely one at a time. Returns (downloaded, failed)."""
+        missing = [t for t in tiles if not self.has(*t)]
+        downloaded = failed = 0
+        for i, (z, x, y) in enumerate(missing):
+            if self.get(z, x, y) is None:
+                failed += 1
+            else:
+                downloaded += 1
+            if (i + 1) % 100 == 0:
+                print(f"{i + 1}/{len(missing)} tiles")
+            time.sleep(delay)
+        return downloaded, failed
+
+
+def vendor_asset(name, directory=VENDOR_DIR):
+    """Path of a Leaflet file in the local bundle, fetched from unpkg the first time."""
+    path = os.path.join(directory, "leaflet", name)
+    if not os.path.exists(path):
+        data = download(LEAFLET_URL + name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "%s.%i.tmp" % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return path
+
+
+def prefetch_assets(directory=VENDOR_DIR):
+    for name in LEAFLET_FILES:
+        try:
+            vendor_asset(name, directory)
+        except OSError as e:
+            print(f"Could not fetch {name}: {e}")
+            return False
+    return True
+
+
+def main():
+    map_file = "../assets/maps/" + sys.argv[1] + ".txt"
+    min_zoom = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    max_zoom = int(sys.argv[3]) if len(sys.argv) > 3 else TILE_MAX_ZOOM
+    if prefetch_assets():
+        print("Leaflet bundled in " + os.path.realpath(VENDOR_DIR))
+    tiles = map_tiles(map_file, min_zoom, min(max_zoom, TILE_MAX_ZOOM))
+    cache = TileCache()
+    print(f"{len(tiles)} tiles cover {map_file} at zoom {min_zoom}-{max_zoom}")
+    downloaded, failed = cache.prefetch(tiles)
+    print(f"Downloaded {downloaded}, {failed} failed, cache holds {cache.total / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python tile_cache.py <map name> [min_zoom] [max_zoom]")
+        sys.exit(1)
+
+    main()
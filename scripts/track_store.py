@@ -0,0 +1,112 @@
+import math
+import os
+
+import numpy as np
+
+from boundary_simplify import OnlineSimplifier
+from geodesy import LocalFrame
+
+# ground size of a web map pixel at zoom 0 on the equator, metres
+EQUATOR_PIXEL = 156543.03
+
+
+def pixel_size(zoom, lat):
+    """Metres per screen pixel at a web map zoom level."""
+    return EQUATOR_PIXEL * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+class TrackLevel:
+    """The track simplified for one zoom level, vertices as [lat, lon] ready for Leaflet."""
+    def __init__(self, zoom, tolerance):
+        self.zoom = zoom
+        self.tolerance = tolerance
+        self.simplifier = OnlineSimplifier(min_spacing=tolerance, tolerance=tolerance)
+        self.points = []
+
+
+class TrackStore:
+    """
+    A recorded track at several resolutions. Every fix is appended to
+    `path` on disk (float64 lon, lat pairs, see read()), the file is only
+    created with the first fix so a session without any leaves none behind.
+    In memory each zoom level only keeps the track simplified to about a
+    screen pixel (OnlineSimplifier), so what a browser draws does not depend
+    on how long the session has run. A level that still grows past max_points doubles
+    its tolerance and re-simplifies its own vertices.
+    """
+    def __init__(self, path=None, zooms=range(12, 23), max_points=2000, pixels=1.0):
+        self.path = path
+        self.zooms = list(zooms)
+        self.max_points = max_points
+        self.pixels = pixels
+        self.levels = None  # created with the frame at the first fix
+        self.frame = None
+        self.count = 0
+        self.file = None
+        self.closed = False
+
+    def append(self, lons, lats):
+        """
+        Adds fixes, returns {zoom: (points, reset)} for the levels that
+        changed: the new vertices, or all of them when the level was rebuilt.
+        """
+        lonlat = np.column_stack((lons, lats)).astype(float)
+        if not len(lonlat):
+            return {}
+        if self.path and self.file is None and not self.closed:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.file = open(self.path, 'ab')
+        if self.file:
+            self.file.write(lonlat.tobytes())
+            self.file.flush()
+        self.count += len(lonlat)
+        if self.frame is None:
+            self.frame = LocalFrame(lonlat[0, 0], lonlat[0, 1])
+            self.levels = [TrackLevel(z, self.pixels * pixel_size(z, lonlat[0, 1])) for z in self.zooms]
+        xy = self.frame.to_local(lonlat)
+        changes = {}
+        for level in self.levels:
+            committed = []
+            for p in xy:
+                committed += level.simplifier.add(p)
+            if not committed:
+                continue
+            new = self._lat_lon(committed)
+            level.points += new
+            if len(level.points) > self.max_points:
+                self._rebuild(level)
+                changes[level.zoom] = (level.points, True)
+            else:
+                changes[level.zoom] = (new, False)
+        return changes
+
+    def _rebuild(self, level):
+        while len(level.points) > self.max_points // 2:
+            level.tolerance *= 2
+            level.simplifier.coarsen(level.tolerance)
+            level.points = self._lat_lon(level.simplifier.vertices)
+        print(f"Track level {level.zoom} at {level.tolerance:.2f} m, {len(level.points)} points")
+
+    def _lat_lon(self, xy):
+        lonlat = np.round(self.frame.to_lonlat(np.asarray(xy)), 7)
+        return [[lat, lon] for lon, lat in lonlat.tolist()]
+
+    def level_for(self, zoom):
+        """The stored zoom level closest to a browser zoom."""
+        return min(self.zooms, key=lambda z: abs(z - zoom))
+
+    def points(self, zoom):
+        if self.levels is None:
+            return []
+        return list(self.levels[self.zooms.index(self.level_for(zoom))].points)
+
+    def close(self):
+        self.closed = True
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    @staticmethod
+    def read(path):
+        """The full resolution track of a session as (N, 2) lon, lat."""
+        return np.fromfile(path, dtype=np.float64).reshape(-1, 2)
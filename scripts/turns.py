@@ -0,0 +1,198 @@
+import math
+
+import numpy as np
+
+from shapely.geometry import LineString
+from shapely.prepared import prep
+
+from geodesy import distance
+
+
+def _arc(center, radius, start_angle, sweep, step):
+    n = max(int(math.ceil(abs(sweep) * radius / step)), 1)
+    a = start_angle + np.linspace(0.0, sweep, n + 1)[1:]
+    return center + radius * np.column_stack((np.cos(a), np.sin(a)))
+
+
+def _line(a, b, step):
+    n = max(int(math.ceil(distance(a, b) / step)), 1)
+    return a + np.outer(np.arange(1, n + 1) / n, b - a)
+
+
+def _clockwise(start, end):
+    """Sweep (negative, radians) turning clockwise from angle start to angle end."""
+    sweep = (start - end) % (2 * math.pi)
+    return 0.0 if sweep > 2 * math.pi - 1e-9 else -sweep
+
+
+def u_turn(offset, along, radius, step=0.1):
+    """
+    Turn from heading +y at the origin onto the reverse heading at
+    (offset, along), in that frame (offset > 0 is to the right). Stripes at
+    least two radii apart get a Dubins turn: an arc, a straight and an arc,
+    both arcs of `radius` and turning the same way. Closer ones get a bulb
+    turn: a short arc away from the next stripe, a long arc round towards
+    it and a short arc back, with a straight before or after it for along.
+    Returns the points after the origin.
+    """
+    side = 1.0 if offset >= 0 else -1.0
+    d = abs(offset)
+    if d >= 2 * radius - 1e-9:
+        c1 = np.array([radius, 0.0])
+        c2 = np.array([d - radius, along])
+        gap = c2 - c1
+        length = np.hypot(*gap)
+        if length < 1e-9:
+            points = _arc(c1, radius, math.pi, -math.pi, step)
+        else:
+            t = gap / length
+            left = np.array([-t[1], t[0]])  # turning clockwise the robot is left of the centre's heading
+            t1, t2 = c1 + radius * left, c2 + radius * left
+            a1 = math.atan2(*(t1 - c1)[::-1])
+            a2 = math.atan2(*(t2 - c2)[::-1])
+            points = np.vstack((_arc(c1, radius, math.pi, _clockwise(math.pi, a1), step),
+                                _line(t1, t2, step),
+                                _arc(c2, radius, a2, _clockwise(a2, 0.0), step)))
+    else:
+        beta = math.acos((d + 2 * radius) / (4 * radius))
+        c1 = np.array([-radius, 0.0])
+        c2 = np.array([-radius + 2 * radius * math.cos(beta), 2 * radius * math.sin(beta)])
+        c3 = np.array([d + radius, 0.0])
+        points = np.vstack((_arc(c1, radius, 0.0, beta, step),
+                            _arc(c2, radius, math.pi + beta, -(math.pi + 2 * beta), step),
+                            _arc(c3, radius, math.pi - beta, beta, step)))
+        if along > 0:
+            points = np.vstack(([[0.0, along]], points + [0.0, along]))
+        elif along < 0:
+            points = np.vstack((points, [[d, along]]))
+    points[:, 0] *= side
+    return points
+
+
+def stripe_turns(segments, radius, spacing, area=None, overrun=None, step=0.1, parallel_tolerance=5.0,
+                 obstacles=None, route=None):
+    """
+    The ordered stripes ((M, 2, 2) local metres) as one path with
+    curvature bounded turns between neighbouring antiparallel stripes
+    (at most 1.5 spacings apart). A turn may leave the lawn (area, a
+    shapely geometry) by `overrun` metres, by default half a spacing, which
+    is how far the mower already hangs over the edge at a stripe end;
+    otherwise it starts earlier, shortening both stripes. It never enters
+    obstacles (holes and no-go zones, a shapely geometry). Without area
+    the turn stays within overrun of both stripe ends. Where the stripes
+    are too short for a turn the straight connection stays. Transits that
+    are not a stripe change (between cells, or across a hole) go through
+    route(a, b), e.g. LawnArea.route, when it is given.
+    """
+    if not len(segments):
+        return np.empty((0, 2))
+    if overrun is None:
+        overrun = spacing / 2
+    allowed = None
+    if area is not None:
+        allowed = area.buffer(overrun)
+        if obstacles is not None and not obstacles.is_empty:
+            allowed = allowed.difference(obstacles)
+        allowed = prep(allowed)
+    path = [segments[0, 0], segments[0, 1]]
+    for prev, nxt in zip(segments[:-1], segments[1:]):
+        u = prev[1] - prev[0]
+        v = nxt[1] - nxt[0]
+        lu, lv = np.hypot(*u), np.hypot(*v)
+        turn = None
+        if lu > 0 and lv > 0:
+            u, v = u / lu, v / lv
+            right = np.array([u[1], -u[0]])
+            gap = nxt[0] - prev[1]
+            offset, along = gap @ right, gap @ u
+            if u @ v < -math.cos(math.radians(parallel_tolerance)) and 1e-6 < abs(offset) <= 1.5 * spacing:
+                rotation = np.column_stack((right, u))  # turn frame: x to the right, y ahead
+                turn = prev[1] + u_turn(offset, along, radius, step) @ rotation.T
+                if allowed is None:
+                    back = max(float((turn - prev[1]) @ u).max() - min(along, 0.0) - overrun, 0.0)
+                else:
+                    back = 0.0
+                    while back < min(lu, lv) and not allowed.covers(LineString(turn - back * u)):
+                        back += step
+                # the turn is moved back along both stripes, it has to fit on them
+                if back >= lu or back >= lv:
+                    turn = None
+        if turn is None:
+            path += list(route(path[-1], nxt[0])) if route else [nxt[0]]
+            path.append(nxt[1])
+            continue
+        path[-1] = prev[1] - back * u
+        path += list(turn - back * u)
+        path.append(nxt[1])
+    points = np.array(path)
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    return points[np.concatenate(([True], steps > 1e-6))]
+
+
+def resample(points, step=0.1):
+    """The polyline with extra vertices so no segment is longer than step (the original vertices stay)."""
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return points
+    return np.vstack([points[:1]] + [_line(a, b, step) for a, b in zip(points[:-1], points[1:])])
+
+
+def curvature(points):
+    """Curvature (1/m) at every vertex of a polyline, from the circle through it and its neighbours."""
+    k = np.zeros(len(points))
+    if len(points) < 3:
+        return k
+    a, b, c = points[:-2], points[1:-1], points[2:]
+    ab, bc, ca = distance(a, b), distance(b, c), distance(c, a)
+    cross = (b - a)[:, 0] * (c - a)[:, 1] - (b - a)[:, 1] * (c - a)[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k[1:-1] = np.where(ab * bc * ca > 0, 2 * np.abs(cross) / (ab * bc * ca), np.inf)
+    return k
+
+
+def velocity_profile(points, max_speed=0.5, min_speed=0.1, max_accel=0.3, max_lateral=0.2,
+                     start_speed=0.0, end_speed=0.0, corner_angle=60.0):
+    """
+    Speed (m/s) at every vertex: max_speed on straights, limited through
+    turns so the lateral acceleration stays under max_lateral, and ramps
+    between them of at most max_accel. Vertices where the path turns
+    more than corner_angle degrees at once are corners the robot has to
+    stop and pivot at (speed 0). Resample the path first, the ramps are
+    only as fine as its vertices.
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if n == 0:
+        return np.empty(0)
+    with np.errstate(divide='ignore'):
+        v = np.clip(np.sqrt(max_lateral / curvature(points)), min_speed, max_speed)
+    if n >= 3:
+        d1, d2 = points[1:-1] - points[:-2], points[2:] - points[1:-1]
+        turn = np.degrees(np.abs(np.arctan2(d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0], (d1 * d2).sum(axis=1))))
+        v[1:-1][turn > corner_angle] = 0.0
+    v[0] = min(v[0], start_speed)
+    v[-1] = min(v[-1], end_speed)
+    ds = distance(points[:-1], points[1:])
+    for i in range(n - 1):
+        v[i + 1] = min(v[i + 1], math.sqrt(v[i] ** 2 + 2 * max_accel * ds[i]))
+    for i in range(n - 2, -1, -1):
+        v[i] = min(v[i], math.sqrt(v[i + 1] ** 2 + 2 * max_accel * ds[i]))
+    return v
+
+
+def drive_time(points, speeds, pivot_rate=25.0):
+    """
+    Seconds to drive the path at the profile's speeds (constant
+    acceleration between vertices), plus pivoting in place at pivot_rate
+    degrees per second wherever the speed drops to 0.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 2:
+        return 0.0
+    ds = distance(points[:-1], points[1:])
+    mean = (speeds[:-1] + speeds[1:]) / 2
+    with np.errstate(divide='ignore'):
+        total = float(np.where(ds > 0, ds / np.maximum(mean, 1e-3), 0.0).sum())
+    d1, d2 = points[1:-1] - points[:-2], points[2:] - points[1:-1]
+    turn = np.degrees(np.abs(np.arctan2(d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0], (d1 * d2).sum(axis=1))))
+    return total + float(turn[speeds[1:-1] == 0].sum()) / pivot_rate
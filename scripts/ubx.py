@@ -0,0 +1,141 @@
+import struct
+
+from fix_bus import Fix
+
+# UBX frame: 0xB5 0x62 | class | id | U2 length | payload | CK_A CK_B
+SYNC = b'\xb5\x62'
+HEADER_LEN = 6
+CHECKSUM_LEN = 2
+
+NAV_PVT = (0x01, 0x07)
+CFG_MSG = (0x06, 0x01)
+CFG_RATE = (0x06, 0x08)
+
+# first 78 bytes of the 92 byte NAV-PVT payload: iTOW, date/time, valid, tAcc,
+# nano, fixType, flags, flags2, numSV, lon, lat, height, hMSL, hAcc, vAcc,
+# velN, velE, velD, gSpeed, headMot, sAcc, headAcc, pDOP
+NAV_PVT_STRUCT = struct.Struct('<IHBBBBBBIiBBBBiiiiIIiiiiiIIH')
+NAV_PVT_LEN = 92
+NAV_PVT_FRAME_LEN = HEADER_LEN + NAV_PVT_LEN + CHECKSUM_LEN
+
+
+def checksum(data):
+    """8-bit Fletcher checksum over class, id, length and payload."""
+    ck_a = 0
+    ck_b = 0
+    for b in data:
+        ck_a = (ck_a + b) & 0xFF
+        ck_b = (ck_b + ck_a) & 0xFF
+    return ck_a, ck_b
+
+
+def build_message(msg_class, msg_id, payload=b''):
+    body = struct.pack('<BBH', msg_class, msg_id, len(payload)) + payload
+    return SYNC + body + bytes(checksum(body))
+
+
+def cfg_rate_message(hz):
+    """CFG-RATE: measurement rate in Hz, one navigation solution per measurement, GPS time."""
+    return build_message(*CFG_RATE, struct.pack('<HHH', int(round(1000 / hz)), 1, 1))
+
+
+def cfg_msg_message(msg_class, msg_id, rate=1):
+    """CFG-MSG: output msg_class/msg_id on the current port every `rate` solutions."""
+    return build_message(*CFG_MSG, struct.pack('<BBB', msg_class, msg_id, rate))
+
+
+def parse_nav_pvt(buf, offset=0):
+    """Builds a Fix straight from a NAV-PVT payload inside buf (no copy)."""
+    (itow, year, month, day, hour, minute, second, valid, t_acc, nano, fix_type, flags, flags2,
+     num_sv, lon, lat, height, h_msl, h_acc, v_acc, vel_n, vel_e, vel_d, g_speed, head_mot,
+     s_acc, head_acc, p_dop) = NAV_PVT_STRUCT.unpack_from(buf, offset)
+
+    carrier = (flags >> 6) & 0x03  # 0 none, 1 float, 2 fixed
+    if not flags & 0x01 or fix_type < 2:
+        quality = 0
+    elif carrier == 2:
+        quality = 4
+    elif carrier == 1:
+        quality = 5
+    elif flags & 0x02:
+        quality = 2  # differential
+    else:
+        quality = 1
+    # NAV-PVT has no HDOP, pDOP is the closest it offers
+    return Fix(hour * 3600 + minute * 60 + second + nano * 1e-9,
+               lon * 1e-7,
+               lat * 1e-7,
+               quality,
+               num_sv,
+               p_dop * 0.01,
+               h_msl / 1000.0,
+               g_speed / 1000.0,
+               head_mot * 1e-5)
+
+
+def build_nav_pvt(fix, itow=0):
+    """NAV-PVT frame for a Fix, the inverse of parse_nav_pvt (used by the simulators and benchmarks)."""
+    t = fix.time % 86400.0
+    second = int(t)
+    carrier = {4: 2, 5: 1}.get(fix.quality, 0)
+    flags = (0x01 if fix.quality else 0) | (0x02 if fix.quality == 2 else 0) | carrier << 6
+    speed = 0.0 if fix.speed != fix.speed else fix.speed
+    heading = 0.0 if fix.heading != fix.heading else fix.heading
+    body = NAV_PVT_STRUCT.pack(itow, 2024, 1, 1, second // 3600, second % 3600 // 60, second % 60, 0x07,
+                               50, int(round((t - second) * 1e9)), 3 if fix.quality else 0, flags, 0,
+                               fix.satellites, int(round(fix.lon * 1e7)), int(round(fix.lat * 1e7)),
+                               int(fix.altitude * 1000), int(fix.altitude * 1000), 14, 10,
+                               0, 0, 0, int(speed * 1000), int(heading * 1e5), 20, 100000,
+                               int(fix.hdop * 100))
+    return build_message(*NAV_PVT, body + bytes(NAV_PVT_LEN - NAV_PVT_STRUCT.size))
+
+
+class UBXReader:
+    """
+    Streaming UBX decoder for rtk_coords.py. Bytes that are not UBX (NMEA
+    the receiver still prints, line noise) are skipped, frames with a bad
+    checksum are dropped, and NAV-PVT solutions are decoded in place from
+    the receive buffer.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self.counts = {}  # (class, id) -> frames seen
+        self.checksum_errors = 0
+        self.skipped_bytes = 0
+
+    def feed(self, data):
+        """Adds bytes from the receiver, returns the fixes of all complete NAV-PVT frames."""
+        self.buffer += data
+        buf = self.buffer
+        fixes = []
+        i = 0
+        while True:
+            j = buf.find(SYNC, i)
+            if j < 0:
+                # keep a trailing 0xB5, it may be the start of the next sync
+                end = len(buf) - 1 if buf[-1:] == SYNC[:1] else len(buf)
+                self.skipped_bytes += max(end - i, 0)
+                i = max(end, i)
+                break
+            self.skipped_bytes += j - i
+            i = j
+            if len(buf) - i < HEADER_LEN:
+                break
+            msg_class, msg_id, length = struct.unpack_from('<BBH', buf, i + 2)
+            end = i + HEADER_LEN + length + CHECKSUM_LEN
+            if end > len(buf):
+                break
+            with memoryview(buf) as view:
+                ok = tuple(view[end - CHECKSUM_LEN:end]) == checksum(view[i + 2:end - CHECKSUM_LEN])
+                if ok and (msg_class, msg_id) == NAV_PVT and length == NAV_PVT_LEN:
+                    fixes.append(parse_nav_pvt(view, i + HEADER_LEN))
+            if not ok:
+                self.checksum_errors += 1
+                self.skipped_bytes += 1
+                i += 1
+                continue
+            key = (msg_class, msg_id)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            i = end
+        del buf[:i]
+        return fixes